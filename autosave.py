@@ -0,0 +1,288 @@
+"""Autosave: an append-only journal of edits next to a project file.
+
+While an Autosave runs, every edit of the model (node added, moved or
+deleted, connection made or removed, socket value changed, graph
+cleared) becomes one line of compact JSON, appended to
+``<project>.journal`` by a background thread. The project file itself
+is a snapshot; the graph is the snapshot with its journal replayed on
+top, which is what savesystem.load_model_from_file returns, so after a
+crash the latest edits are recovered by opening the file again.
+
+When the journal grows past `Autosave.compact_bytes` the thread folds
+it into a new snapshot: it renames the journal to
+``<project>.journal.old`` (new edits go to a fresh journal), rebuilds
+the graph from the snapshot and that journal, writes it next to the
+project file and renames it over it, then deletes the old journal.
+
+Every record sets something to a value: a node with a uid exists or
+doesn't, has a position, a port has a value, a connection between two
+ports exists or doesn't. Replaying a journal over a graph that already
+contains it changes nothing, so a crash between replacing the snapshot
+and deleting the old journal loses nothing and duplicates nothing.
+"""
+import json
+import logging
+import os
+import threading
+
+from types_classes.graph_model import GraphModel
+
+JOURNAL_SUFFIX = '.journal'
+# journal being folded into the snapshot
+COMPACTING_SUFFIX = '.journal.old'
+
+_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+
+def journal_paths(path):
+    """Journals of project file `path`, in the order they are replayed."""
+    return [path + COMPACTING_SUFFIX, path + JOURNAL_SUFFIX]
+
+
+def has_journal(path):
+    return any(os.path.exists(journal) for journal in journal_paths(path))
+
+
+def discard_journals(path):
+    """Delete the journals of `path`, e.g. after saving a full snapshot over it."""
+    for journal in journal_paths(path):
+        try:
+            os.remove(journal)
+        except FileNotFoundError:
+            pass
+
+
+def _find_connection(model, entry, ids):
+    start = ids.get(entry.get('start_node_id'))
+    end = ids.get(entry.get('end_node_id'))
+    if start is None or end is None:
+        return None
+    for conn in model.port_connections(start.id, entry.get('start_socket_index')):
+        if conn.start_node == start.id and conn.end_node == end.id and conn.end_port == entry.get('end_socket_index'):
+            return conn
+    return None
+
+
+def apply(model, record, ids):
+    """Apply one journal record to `model`; `ids` maps node uids to records and is kept up to date."""
+    op = record.get('op')
+    if op == 'add':
+        entry = record['node']
+        if entry.get('id') not in ids:
+            node = model.adopt(GraphModel.node_record(entry))
+            ids[node.uid] = node
+    elif op == 'move':
+        node = ids.get(record['id'])
+        if node is not None:
+            x, y = record['pos']
+            model.move_node(node.id, x, y)
+    elif op == 'delete':
+        node = ids.pop(record['id'], None)
+        if node is not None:
+            model.remove_node(node.id)
+    elif op == 'connect':
+        if _find_connection(model, record['edge'], ids) is None:
+            model.connect_entry(record['edge'], ids)
+    elif op == 'disconnect':
+        conn = _find_connection(model, record['edge'], ids)
+        if conn is not None:
+            model.disconnect(conn.id)
+    elif op == 'value':
+        node = ids.get(record['id'])
+        port = record['port']
+        if node is not None and 0 <= port < node.n_inputs:
+            model.set_value(node.ports[port], record['value'])
+    elif op == 'clear':
+        model.clear()
+        ids.clear()
+
+
+def replay(model, journal):
+    """Apply the records of journal file `journal` to `model`; returns how many were read.
+
+    Reading stops at the first line that isn't a whole record, which is
+    where a crash cut the journal short.
+    """
+    model.load_all()
+    ids = {node.uid: node for node in model.nodes.values()}
+    count = 0
+    with open(journal, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            try:
+                apply(model, record, ids)
+            except (KeyError, TypeError, ValueError):
+                logging.warning('Skipped a bad journal record in %s: %s', journal, line.strip())
+            count += 1
+    return count
+
+
+def replay_journals(model, path):
+    """Replay the journals of project file `path` onto the model read from it; returns the record count."""
+    count = 0
+    for journal in journal_paths(path):
+        if os.path.exists(journal):
+            count += replay(model, journal)
+    if count:
+        logging.info('Replayed %d journal records of %s', count, path)
+    return count
+
+
+class Autosave:
+    """Journal the edits of `model` next to project file `path` on a background thread.
+
+    start() begins listening to the model, stop() writes what is pending
+    and ends the thread. flush() writes pending records right away and is
+    all a Save needs to do. Records are encoded when the edit happens, on
+    the caller's thread; the thread only writes and compacts files and
+    never touches the model.
+    """
+
+    # seconds between writes of pending records
+    interval = 1.0
+    # journal size that makes the thread fold it into a new snapshot
+    compact_bytes = 1024 * 1024
+
+    def __init__(self, model, path):
+        self.model = model
+        self.path = path
+        self.journal = path + JOURNAL_SUFFIX
+        self.compacting = path + COMPACTING_SUFFIX
+        # encoded records not written yet
+        self._pending = []
+        # uid -> position of nodes moved since the last other record; a
+        # drag moves a node many times but only its last position is written
+        self._moves = {}
+        self._lock = threading.Lock()
+        # held while writing or renaming journal files, so records are
+        # written in order and never into a journal being compacted
+        self._file_lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        self.model.listeners.append(self)
+        self._thread = threading.Thread(target=self._run, name='autosave', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop listening, write the pending records and end the thread."""
+        if self in self.model.listeners:
+            self.model.listeners.remove(self)
+        if self._thread is not None:
+            with self._wake:
+                self._stopping = True
+                self._wake.notify()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._wake:
+                self._wake.wait_for(lambda: self._stopping, self.interval)
+                stopping = self._stopping
+            try:
+                self.flush()
+                if not stopping and self.journal_size() >= self.compact_bytes:
+                    self.compact()
+            except Exception:
+                logging.exception('Autosave of %s failed', self.path)
+            if stopping:
+                return
+
+    def journal_size(self):
+        try:
+            return os.path.getsize(self.journal)
+        except OSError:
+            return 0
+
+    def flush(self):
+        """Append the pending records to the journal and sync it to disk."""
+        with self._file_lock:
+            with self._lock:
+                self._take_moves()
+                lines, self._pending = self._pending, []
+            if not lines:
+                return
+            with open(self.journal, 'a', encoding='utf-8') as f:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def compact(self):
+        """Fold the journal into a new snapshot of the project file.
+
+        Nothing happens while the model is still loading tiles of the
+        project file (see vpb.TileLoader): the file is open then, and
+        can't be replaced on Windows. The journal is folded in by the
+        first compaction after the last tile is loaded.
+        """
+        from savesystem import read_snapshot, write_snapshot
+        if self.model.loader is not None:
+            return
+        with self._file_lock:
+            # an old journal left by an interrupted compaction is folded in first
+            if os.path.exists(self.journal) and not os.path.exists(self.compacting):
+                os.replace(self.journal, self.compacting)
+        if not os.path.exists(self.compacting):
+            return
+        model = read_snapshot(self.path) if os.path.exists(self.path) else GraphModel()
+        replay(model, self.compacting)
+        write_snapshot(model, self.path)
+        os.remove(self.compacting)
+
+    # recording edits
+
+    def _record(self, record):
+        line = _ENCODER.encode(record) + '\n'
+        with self._lock:
+            self._take_moves()
+            self._pending.append(line)
+
+    def _take_moves(self):
+        # caller holds self._lock
+        for uid, pos in self._moves.items():
+            self._pending.append(_ENCODER.encode({'op': 'move', 'id': uid, 'pos': pos}) + '\n')
+        self._moves.clear()
+
+    def _edge(self, connection):
+        nodes = self.model.nodes
+        if connection.start_node in nodes and connection.end_node in nodes:
+            return self.model.connection_data(connection)
+        return None
+
+    # GraphModel listener
+
+    def node_added(self, record):
+        self._record({'op': 'add', 'node': self.model.node_data(record)})
+
+    def node_moved(self, record):
+        with self._lock:
+            self._moves[record.uid] = [record.x, record.y]
+
+    def value_changed(self, port):
+        if port.node is not None:
+            self._record({'op': 'value', 'id': port.node.uid, 'port': port.index, 'value': port.value})
+
+    def connected(self, connection):
+        self._record({'op': 'connect', 'edge': self.model.connection_data(connection)})
+
+    def disconnected(self, connection):
+        edge = self._edge(connection)
+        # connections of a deleted node go with its 'delete' record
+        if edge is not None:
+            self._record({'op': 'disconnect', 'edge': edge})
+
+    def node_removed(self, record):
+        self._record({'op': 'delete', 'id': record.uid})
+
+    def cleared(self):
+        self._record({'op': 'clear'})
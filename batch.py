@@ -0,0 +1,336 @@
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+
+from compiler import variable_name
+from optimizer import DEFAULTS
+from savesystem import load_model_from_file
+
+EXEC = "Exec"
+
+
+class BatchError(Exception):
+    """The graph or the input columns can't be batch evaluated; `node_uid` names the node, if any."""
+
+    def __init__(self, message, node_uid=None):
+        super().__init__(message)
+        self.node_uid = node_uid
+
+
+def _char_add(a, b):
+    return np.char.add(np.asarray(a), np.asarray(b))
+
+
+def _add(a, b):
+    # + concatenates strings, like the generated code does
+    if np.asarray(a).dtype.kind == "U" or np.asarray(b).dtype.kind == "U":
+        return _char_add(a, b)
+    return np.add(a, b)
+
+
+def _to_bool(a):
+    a = np.asarray(a)
+    if a.dtype.kind == "U":
+        # bool('0') is True: only empty strings are false
+        return np.char.str_len(a) > 0
+    return a.astype(bool)
+
+
+def _to_str(a):
+    a = np.asarray(a)
+    if a.dtype.kind in "UO":
+        return a
+    # formatting numbers is per element either way; Python's str() is the
+    # fastest (and exact) way, and an object array avoids copying into
+    # fixed-width unicode
+    out = np.empty(a.shape, dtype=object)
+    out.ravel()[:] = [str(v) for v in a.ravel().tolist()]
+    return out
+
+
+def _to_int(a):
+    a = np.asarray(a)
+    if a.dtype.kind == "f":
+        return np.trunc(a).astype(np.int64)
+    return a.astype(np.int64)
+
+
+def _equal(a, b):
+    """np.equal, except a string never equals a number (np.equal raises on that)."""
+    a, b = np.asarray(a), np.asarray(b)
+    if a.dtype.kind != b.dtype.kind and not (a.dtype.kind in "biuf" and b.dtype.kind in "biuf"):
+        # compare row by row, the way == on the Python values does
+        return np.equal(a.astype(object), b.astype(object)).astype(bool)
+    return np.equal(a, b)
+
+
+def _pick(condition, a, b):
+    """np.where, keeping each row's own type when the operands differ in kind."""
+    a, b = np.asarray(a), np.asarray(b)
+    if a.dtype.kind != b.dtype.kind:
+        a, b = a.astype(object), b.astype(object)
+    return np.where(condition, a, b)
+
+
+# node type -> elementwise function of the inputs (in port order), with the
+# same result as the node's python_template on each row
+OPERATIONS = {
+    "Add": _add,
+    "Subtract": np.subtract,
+    "Multiply": np.multiply,
+    "Divide": np.true_divide,
+    "Equals": _equal,
+    "Greater Than": np.greater,
+    # `a and b` / `a or b` give one of the operands, not a bool
+    "And": lambda a, b: _pick(_to_bool(a), b, a),
+    "Or": lambda a, b: _pick(_to_bool(a), a, b),
+    "Not": lambda a: np.logical_not(_to_bool(a)),
+    "Cast to String": _to_str,
+    "Cast to Bool": _to_bool,
+    "Cast to Integer": _to_int,
+    "Cast to Float": lambda a: np.asarray(a).astype(np.float64),
+}
+
+# node types that read a column when one with their name is given
+LEAVES = ("Text Value", "Get Variable")
+
+
+def _is_statement(record):
+    return any(port.type_name == EXEC for port in record.ports)
+
+
+class BatchEvaluator:
+    """Evaluate the pure part of a graph over whole columns with NumPy.
+
+    Leaves are Text Value nodes (named by their title) and Get Variable
+    nodes (named by their variable); a leaf reads the input column of the
+    same name, or keeps its value from the graph when there is none.
+    Outputs are the pure nodes whose result goes to a statement or
+    nowhere, unless `outputs` names them by title. Every operation runs
+    once over all rows. Division by zero and the like give inf/nan
+    instead of stopping the batch.
+
+    The graph is planned once; evaluate() can then be called for any
+    number of column sets.
+    """
+
+    def __init__(self, model, outputs=None):
+        model.load_all()
+        self.model = model
+        # output name -> node id
+        self.outputs = {}
+        # leaf name -> node ids reading that column
+        self.inputs = {}
+        # (node id, function, input refs) in evaluation order; an input ref
+        # is ("node", id) or ("value", constant). Leaves have no function
+        # and (column name, own value or None) instead of refs.
+        self._steps = []
+        self._plan(outputs)
+
+    def _source(self, record, port):
+        for conn in self.model.port_connections(record.id, port.index):
+            if conn.start_node == record.id and conn.start_port == port.index:
+                other, index = conn.end_node, conn.end_port
+            else:
+                other, index = conn.start_node, conn.start_port
+            other_record = self.model.nodes[other]
+            if not other_record.ports[index].is_input:
+                return other_record
+        return None
+
+    def _default_outputs(self):
+        chosen = []
+        for record in self.model.nodes.values():
+            if _is_statement(record) or record.node_type in LEAVES:
+                continue
+            consumers = []
+            for conn in self.model.node_connections(record.id):
+                if conn.start_node == record.id:
+                    port, other = conn.start_port, conn.end_node
+                else:
+                    port, other = conn.end_port, conn.start_node
+                if not record.ports[port].is_input:
+                    consumers.append(self.model.nodes[other])
+            if not consumers or any(_is_statement(other) for other in consumers):
+                chosen.append(record)
+        return chosen
+
+    def _plan(self, outputs):
+        model = self.model
+        if outputs is None:
+            targets = self._default_outputs()
+        else:
+            by_title = {}
+            for record in model.nodes.values():
+                by_title.setdefault(record.title, record)
+            targets = []
+            for title in outputs:
+                if title not in by_title:
+                    raise BatchError("no node titled %r" % title)
+                targets.append(by_title[title])
+        for record in targets:
+            name = record.title
+            if name in self.outputs:
+                name = "%s %d" % (record.title, record.id)
+            self.outputs[name] = record.id
+
+        # iterative post-order walk, so deep graphs don't hit the recursion limit
+        planned = set()
+        visiting = set()
+        for target in targets:
+            stack = [(target, False)]
+            while stack:
+                record, expanded = stack.pop()
+                if record.id in planned:
+                    continue
+                if expanded:
+                    visiting.discard(record.id)
+                    planned.add(record.id)
+                    self._steps.append(self._step(record))
+                    continue
+                if record.id in visiting:
+                    raise BatchError("data inputs of %r form a cycle" % record.title, record.uid)
+                if _is_statement(record):
+                    raise BatchError("%r runs as a statement and can't be batch evaluated" % record.title, record.uid)
+                visiting.add(record.id)
+                stack.append((record, True))
+                if record.node_type in LEAVES:
+                    continue
+                for port in record.inputs():
+                    source = self._source(record, port)
+                    if source is not None and source.id not in planned:
+                        stack.append((source, False))
+
+    def _leaf_name(self, record):
+        if record.node_type == "Get Variable":
+            return variable_name(self.model, record)
+        return record.title
+
+    def _step(self, record):
+        if record.node_type in LEAVES:
+            name = self._leaf_name(record)
+            self.inputs.setdefault(name, []).append(record.id)
+            own = (record.ports[0].value or "") if record.node_type == "Text Value" else None
+            return record.id, None, (name, own)
+        function = OPERATIONS.get(record.node_type)
+        if function is None:
+            raise BatchError("%r nodes can't be batch evaluated" % record.node_type, record.uid)
+        refs = []
+        for port in record.inputs():
+            source = self._source(record, port)
+            if source is not None:
+                refs.append(("node", source.id))
+            elif port.shape == "TextInput":
+                refs.append(("value", port.value or ""))
+            elif port.shape == "EvalInput":
+                raise BatchError("%r has an unconnected expression input" % record.title, record.uid)
+            else:
+                refs.append(("value", DEFAULTS.get(port.type_name)))
+        return record.id, function, refs
+
+    def evaluate(self, columns):
+        """Dict of output name -> array, one element per input row."""
+        columns = {name: np.asarray(values) for name, values in columns.items()}
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise BatchError("input columns have different lengths: %s" % sorted(lengths))
+        rows = lengths.pop() if lengths else 1
+
+        values = {}
+        with np.errstate(all="ignore"):
+            for node_id, function, refs in self._steps:
+                if function is None:
+                    name, own = refs
+                    if name in columns:
+                        values[node_id] = columns[name]
+                    elif own is not None:
+                        values[node_id] = np.asarray(own)
+                    else:
+                        raise BatchError("no input column named %r" % name)
+                    continue
+                args = [values[ref] if kind == "node" else np.asarray(ref) for kind, ref in refs]
+                try:
+                    values[node_id] = function(*args)
+                except (TypeError, ValueError) as e:
+                    record = self.model.nodes[node_id]
+                    raise BatchError("%r failed: %s" % (record.title, e), record.uid)
+        return {name: np.broadcast_to(values[node_id], (rows,)) for name, node_id in self.outputs.items()}
+
+
+def load_columns(path):
+    """Input columns from a CSV file (with a header row), an .npz file or a structured .npy array.
+
+    CSV cells are kept as strings, like the Text Values they stand in for.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            data = list(zip(*reader)) or [() for _ in header]
+        return {name: np.array(column, dtype=str) for name, column in zip(header, data)}
+    if ext == ".npz":
+        with np.load(path, allow_pickle=False) as archive:
+            return {name: archive[name] for name in archive.files}
+    if ext == ".npy":
+        array = np.load(path, allow_pickle=False)
+        if array.dtype.names:
+            return {name: array[name] for name in array.dtype.names}
+        if array.ndim == 1:
+            return {os.path.splitext(os.path.basename(path))[0]: array}
+        raise BatchError("%s: a .npy input must be a structured or 1-D array" % path)
+    raise BatchError("unsupported input file %r (use .csv, .npy or .npz)" % path)
+
+
+def save_columns(path, columns):
+    """Write result columns as CSV, .npz, or a structured .npy array."""
+    ext = os.path.splitext(path)[1].lower()
+    names = list(columns)
+    if ext == ".csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(names)
+            writer.writerows(zip(*(columns[name].tolist() for name in names)))
+    elif ext == ".npz":
+        np.savez(path, **{name: c.astype(str) if c.dtype.kind == "O" else c for name, c in columns.items()})
+    elif ext == ".npy":
+        rows = len(next(iter(columns.values()))) if columns else 0
+        # object (string) columns are stored as fixed-width unicode
+        columns = {name: c.astype(str) if c.dtype.kind == "O" else c for name, c in columns.items()}
+        array = np.empty(rows, dtype=[(name, columns[name].dtype) for name in names])
+        for name in names:
+            array[name] = columns[name]
+        np.save(path, array)
+    else:
+        raise BatchError("unsupported output file %r (use .csv, .npy or .npz)" % path)
+
+
+def evaluate_file(graph_path, input_path, output_path, outputs=None):
+    """Batch evaluate a saved graph over an input file and write the results; returns the row count."""
+    model = load_model_from_file(graph_path)
+    results = BatchEvaluator(model, outputs).evaluate(load_columns(input_path))
+    save_columns(output_path, results)
+    return len(next(iter(results.values()))) if results else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the pure part of a vispy graph over columns of data.")
+    parser.add_argument("graph", help="saved graph file")
+    parser.add_argument("input", help="input columns (.csv, .npy or .npz)")
+    parser.add_argument("-o", "--output", required=True, help="result file (.csv, .npy or .npz)")
+    parser.add_argument("--outputs", nargs="+", help="titles of the nodes to output (default: final results)")
+    args = parser.parse_args(argv)
+    try:
+        rows = evaluate_file(args.graph, args.input, args.output, args.outputs)
+    except BatchError as e:
+        print("error: %s" % e, file=sys.stderr)
+        return 1
+    print("%d rows written to %s" % (rows, args.output), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
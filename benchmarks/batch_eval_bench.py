@@ -0,0 +1,105 @@
+"""Throughput of batch.BatchEvaluator against the generated scalar code.
+
+Builds a small pure graph over two variables, x and y:
+
+    fx, fy  = float(x), float(y)
+    score   = fx * fy + fx - fy / (fy + 1.0)
+    big     = (score > float('10')) and not (x == y)
+
+and evaluates `score` and `big` for N rows: once by calling the compiled
+program's start function per row (the variables set as globals, print()
+collecting the results), and once with BatchEvaluator over whole
+columns. Times are the best of three runs.
+
+Run from the repository root:
+
+    python benchmarks/batch_eval_bench.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from batch import BatchEvaluator
+from compiler import Compiler
+from types_classes.graph_model import GraphModel
+
+ROWS = [10_000, 100_000, 1_000_000]
+
+
+def build_model():
+    model = GraphModel()
+
+    def node(node_type, *inputs, title=None):
+        record = model.add_node(node_type, title=title)
+        for port, (source, index) in enumerate(inputs):
+            model.connect(source.id, index, record.id, port)
+        return record
+
+    x = node('Get Variable', title='Get x')
+    y = node('Get Variable', title='Get y')
+    ten = node('Text Value')
+    ten.ports[0].value = '10'
+    fx = node('Cast to Float', (x, 1))
+    fy = node('Cast to Float', (y, 1))
+    one = node('Text Value')
+    one.ports[0].value = '1'
+    plus_one = node('Add', (fy, 1), (node('Cast to Float', (one, 1)), 1))
+    score = node('Subtract',
+                 (node('Add', (node('Multiply', (fx, 1), (fy, 1)), 2), (fx, 1)), 2),
+                 (node('Divide', (fy, 1), (plus_one, 2)), 2),
+                 title='score')
+    greater = node('Greater Than', (score, 2), (node('Cast to Float', (ten, 1)), 1))
+    different = node('Not', (node('Equals', (x, 1), (y, 1)), 2))
+    big = node('And', (greater, 2), (different, 1), title='big')
+
+    start = node('Start')
+    show_score = node('Print', (start, 0), (score, 2))
+    node('Print', (show_score, 2), (big, 2))
+    return model
+
+
+def scalar(model, xs, ys):
+    results = []
+    namespace = {'__name__': 'bench', 'print': results.append}
+    exec(Compiler().compile(model), namespace)
+    start = namespace['start_1']
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        namespace['x'] = x
+        namespace['y'] = y
+        start()
+    return results
+
+
+def best_of(run, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        value = run()
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+
+def main():
+    model = build_model()
+    evaluator = BatchEvaluator(model)
+    rng = np.random.default_rng(1)
+    print('%10s %12s %12s %8s' % ('rows', 'scalar', 'numpy', 'speedup'))
+    for rows in ROWS:
+        xs = rng.integers(0, 10, rows).astype(float)
+        ys = rng.integers(0, 10, rows).astype(float)
+
+        scalar_time, expected = best_of(lambda: scalar(model, xs, ys))
+        batch_time, result = best_of(lambda: evaluator.evaluate({'x': xs, 'y': ys}))
+
+        assert result['score'].tolist() == expected[0::2]
+        assert result['big'].tolist() == expected[1::2]
+        print('%10d %10.3f s %10.3f s %7.1fx' % (rows, scalar_time, batch_time, scalar_time / batch_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Frame-time benchmark for GraphicsScene.drawBackground.
+
+Renders a full 1920x1080 viewport of the grid at several zoom levels while
+panning, once with the original per-line implementation and once with the
+tile-cached GridBackground, and prints the mean time per frame.
+
+Run from the repository root:
+
+    python benchmarks/grid_background_bench.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PySide6.QtWidgets import QApplication, QGraphicsScene
+from PySide6.QtGui import QImage, QPainter, QPen, QColor, QTransform
+from PySide6.QtCore import QLineF, QRectF
+
+from widgets_elements.vispyWindowLib import GraphicsScene
+
+WIDTH, HEIGHT = 1920, 1080
+ZOOM_LEVELS = [0.4, 0.6, 1.0, 1.5, 2.0]
+FRAMES = 60
+
+
+class LegacyScene(QGraphicsScene):
+    """The previous drawBackground: a QLineF list rebuilt on every repaint."""
+
+    def drawBackground(self, painter, rect):
+        super().drawBackground(painter, rect)
+
+        grid = 20
+
+        left = int(rect.left()) - (int(rect.left()) % grid)
+        top = int(rect.top()) - (int(rect.top()) % grid)
+
+        lines = []
+
+        for x in range(left, int(rect.right()), grid):
+            lines.append(QLineF(x, rect.top(), x, rect.bottom()))
+
+        for y in range(top, int(rect.bottom()), grid):
+            lines.append(QLineF(rect.left(), y, rect.right(), y))
+
+        painter.setPen(QPen(QColor(60, 60, 60), 1))
+        painter.drawLines(lines)
+
+
+def time_frames(scene, scale):
+    image = QImage(WIDTH, HEIGHT, QImage.Format_ARGB32_Premultiplied)
+    total = 0.0
+    for frame in range(FRAMES):
+        # pan a little every frame so every repaint exposes a new rect
+        dx = frame * 37.0
+        dy = frame * 11.0
+        image.fill(0xFF202020)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setTransform(QTransform().scale(scale, scale).translate(-dx, -dy))
+        exposed = QRectF(dx, dy, WIDTH / scale, HEIGHT / scale)
+        start = time.perf_counter()
+        scene.drawBackground(painter, exposed)
+        total += time.perf_counter() - start
+        painter.end()
+    return total / FRAMES * 1000.0
+
+
+def main():
+    legacy = LegacyScene()
+    cached = GraphicsScene()
+
+    print(f"{'zoom':>6} {'legacy ms':>10} {'cached ms':>10} {'speedup':>8}")
+    for scale in ZOOM_LEVELS:
+        old = time_frames(legacy, scale)
+        new = time_frames(cached, scale)
+        print(f"{scale:>6.2f} {old:>10.3f} {new:>10.3f} {old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    app = QApplication.instance() or QApplication(sys.argv)
+    main()
@@ -0,0 +1,83 @@
+"""Save time and peak memory of savesystem for large synthetic graphs.
+
+Generates graphs of 1k, 10k and 100k nodes (rows of Text Value -> Cast to
+Float -> Add chains, every node connected) and saves each one twice:
+with the streamed compact writer (savesystem.save_model_to_file) and
+the way it used to be done, json.dump of the whole to_data() dict with
+indent=2. Peak memory is what tracemalloc sees allocated during the
+save; times are the best of three runs, measured without tracemalloc.
+
+Run from the repository root:
+
+    python benchmarks/save_bench.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from savesystem import save_model_to_file
+from types_classes.graph_model import GraphModel
+
+SIZES = [1_000, 10_000, 100_000]
+# nodes per chain: Text Value, Cast to Float, then Adds
+CHAIN = 10
+
+
+def build_model(size):
+    model = GraphModel()
+    for n in range(0, size, CHAIN):
+        x, y = (n // 500) * 2000.0, (n % 500) * 12.0
+        text = model.add_node('Text Value', x=x, y=y)
+        text.ports[0].value = str(n)
+        cast = model.add_node('Cast to Float', x=x + 200, y=y)
+        model.connect(text.id, 1, cast.id, 0)
+        previous, port = cast, 1
+        for i in range(min(CHAIN, size - n) - 2):
+            add = model.add_node('Add', x=x + 400 + 200 * i, y=y)
+            model.connect(previous.id, port, add.id, 0)
+            model.connect(cast.id, 1, add.id, 1)
+            previous, port = add, 2
+    return model
+
+
+def indented(model, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(model.to_data(), f, indent=2)
+
+
+def measure(save, model, path):
+    best = None
+    for _ in range(3):
+        t = time.perf_counter()
+        save(model, path)
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    save(model, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, os.path.getsize(path)
+
+
+def main():
+    print('%8s %8s  %22s  %22s' % ('nodes', 'edges', 'streamed compact', 'json.dump indent=2'))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'graph.vp')
+        for size in SIZES:
+            model = build_model(size)
+            row = [size, len(model.connections)]
+            for save in (save_model_to_file, indented):
+                elapsed, peak, nbytes = measure(save, model, path)
+                assert len(GraphModel.from_data(json.load(open(path, encoding='utf-8')))) == size
+                row.append('%6.3f s %5.1f MB %4.0f MB' % (elapsed, peak / 2 ** 20, nbytes / 2 ** 20))
+            print('%8d %8d  %s  %s' % tuple(row))
+    print('(time, peak traced memory, file size)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""File size and load time of the binary .vpb format against compact JSON.
+
+Uses the graphs of save_bench.py. Load times are the best of three runs
+of savesystem.load_model_from_file, which builds the same GraphModel
+from either file. "Open view" is the time to open the .vpb file on
+demand (vpb.open_model) and load the tiles under a window-sized area at
+the origin, as a virtualized scene does when it shows the file.
+
+Run from the repository root:
+
+    python benchmarks/vpb_bench.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from save_bench import SIZES, build_model
+from savesystem import load_model_from_file, save_model_to_file
+from vpb import open_model
+
+# scene rect of a 1200x900 window at the smallest zoom, plus the Virtualizer's margin
+VIEW = (-400, -400, 3400, 2650)
+
+
+def best_of_three(function, *args):
+    best = None
+    for _ in range(3):
+        t = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def open_view(path):
+    model = open_model(path)
+    return len(list(model.nodes_in_rect(*VIEW)))
+
+
+def main():
+    print('%8s  %22s  %22s  %9s' % ('nodes', 'JSON (.vp)', 'binary (.vpb)', 'open view'))
+    with tempfile.TemporaryDirectory() as directory:
+        for size in SIZES:
+            model = build_model(size)
+            row = [size]
+            for name in ('graph.vp', 'graph.vpb'):
+                path = os.path.join(directory, name)
+                save_model_to_file(model, path)
+                assert len(load_model_from_file(path)) == size
+                elapsed = best_of_three(load_model_from_file, path)
+                row.append('%6.3f s %7.2f MB' % (elapsed, os.path.getsize(path) / 2 ** 20))
+            row.append('%7.3f s' % best_of_three(open_view, path))
+            print('%8d  %s  %s  %s' % tuple(row))
+    print('(load time, file size)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+import hashlib
+import importlib.util
+import json
+import logging
+import marshal
+import os
+import struct
+import sys
+import tempfile
+
+from about import about
+
+# bump when the compiler's output for the same graph changes
+FORMAT = 6
+
+FILENAME = "<vispy>"
+
+_MAGIC = b"VPCACHE1"
+# magic, source length, code length, sha256 of source + code
+_HEADER = struct.Struct("<8sII32s")
+_SUFFIX = ".vpc"
+
+
+def default_directory():
+    """Cache directory: $VISPY_CACHE_DIR, else the user's cache dir."""
+    directory = os.environ.get("VISPY_CACHE_DIR")
+    if directory:
+        return directory
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "vispy", "compiled")
+
+
+def _digest(options):
+    """sha256 seeded with what makes an entry unusable when it changes."""
+    digest = hashlib.sha256()
+    header = [FORMAT, about.version, sys.implementation.cache_tag, importlib.util.MAGIC_NUMBER.hex(), options]
+    digest.update(json.dumps(header).encode("utf-8"))
+    return digest
+
+
+def graph_key(model, options=None):
+    """Stable hex key of everything in `model` the compiled program depends on.
+
+    Positions and uids don't change the program, so they are left out;
+    node ids are kept because generated variable names and the order of
+    the start functions follow them. The vispy version, the cache format
+    and the Python bytecode version are mixed in, so entries written by a
+    different node library or interpreter are never used, and so are
+    `options`, the Compiler.options the program is compiled with (those
+    of a default Compiler if None).
+    """
+    if options is None:
+        from compiler import Compiler
+        options = Compiler().options
+    model.load_all()
+    digest = _digest(options)
+    encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+    for record_id in sorted(model.nodes):
+        record = model.nodes[record_id]
+        ports = [(p.name, p.type_name, p.shape, p.is_input, p.value) for p in record.ports]
+        digest.update(encode((record_id, record.node_type, record.title, ports)).encode("utf-8"))
+        digest.update(b"\n")
+    # the direction a connection was dragged in doesn't matter to the compiler
+    edges = sorted(
+        tuple(sorted(((c.start_node, c.start_port), (c.end_node, c.end_port))))
+        for c in model.connections.values()
+    )
+    digest.update(encode(edges).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class CompileCache:
+    """Generated source and marshalled code objects on disk, keyed by graph_key().
+
+    Each entry is one file holding both, with a checksum; an entry that
+    fails to read back is deleted and treated as a miss. Reading an entry
+    touches its mtime, and after every store the least recently used
+    entries are removed until the directory is under `max_bytes` and
+    `max_entries`.
+    """
+
+    def __init__(self, directory=None, max_bytes=64 * 1024 * 1024, max_entries=256):
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key):
+        """(source, code object) stored under `key`, or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self.stats["misses"] += 1
+            return None
+        try:
+            magic, source_size, code_size, checksum = _HEADER.unpack_from(data)
+            payload = data[_HEADER.size:]
+            if magic != _MAGIC or len(payload) != source_size + code_size or hashlib.sha256(payload).digest() != checksum:
+                raise ValueError("bad cache entry")
+            source = payload[:source_size].decode("utf-8")
+            code = marshal.loads(payload[source_size:])
+        except (ValueError, EOFError, TypeError, struct.error, UnicodeDecodeError):
+            logging.warning(f"Discarding corrupt compile cache entry: {path}")
+            self._remove(path)
+            self.stats["misses"] += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.stats["hits"] += 1
+        return source, code
+
+    def put(self, key, source, code):
+        """Store an entry (atomically, so readers never see half a file) and evict old ones."""
+        source_bytes = source.encode("utf-8")
+        code_bytes = marshal.dumps(code)
+        payload = source_bytes + code_bytes
+        header = _HEADER.pack(_MAGIC, len(source_bytes), len(code_bytes), hashlib.sha256(payload).digest())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(header)
+                    f.write(payload)
+                os.replace(tmp, self._path(key))
+            except BaseException:
+                self._remove(tmp)
+                raise
+        except OSError:
+            # a read-only or full cache dir only costs the cache
+            logging.exception("Could not write compile cache entry")
+            return
+        self.evict()
+
+    def compile(self, model, compiler=None):
+        """(source, code object) for `model`, compiling only on a cache miss."""
+        if compiler is None:
+            from compiler import Compiler
+            compiler = Compiler()
+        key = graph_key(model, compiler.options)
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+        source = compiler.compile(model)
+        code = compile(source, FILENAME, "exec")
+        self.put(key, source, code)
+        return source, code
+
+    def compile_file(self, path, compiler=None):
+        """(source, code object) for a saved graph file.
+
+        The file's bytes, and those of its autosave journals, are hashed
+        first, so running an unchanged file again doesn't even parse it.
+        Otherwise the graph is loaded and looked up by graph_key(), which
+        still hits when only positions changed.
+        """
+        import autosave
+        if compiler is None:
+            from compiler import Compiler
+            compiler = Compiler()
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = _digest(compiler.options)
+        digest.update(data)
+        journals = [journal for journal in autosave.journal_paths(path) if os.path.exists(journal)]
+        for journal in journals:
+            with open(journal, "rb") as f:
+                digest.update(b"\0journal\0" + f.read())
+        file_key = "file-" + digest.hexdigest()
+        entry = self.get(file_key)
+        if entry is not None:
+            return entry
+        from types_classes.graph_model import GraphModel
+        import vpb
+        if path.lower().endswith(vpb.EXTENSION):
+            model = vpb.BinaryGraph(data).to_model()
+        else:
+            model = GraphModel.from_data(json.loads(data.decode("utf-8")))
+        for journal in journals:
+            autosave.replay(model, journal)
+        source, code = self.compile(model, compiler)
+        self.put(file_key, source, code)
+        return source, code
+
+    def evict(self):
+        """Remove least recently used entries until the cache is within its limits."""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        for mtime, size, path in entries:
+            if total <= self.max_bytes and count <= self.max_entries:
+                break
+            self._remove(path)
+            total -= size
+            count -= 1
+
+    def clear(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(_SUFFIX):
+                self._remove(os.path.join(self.directory, name))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,542 @@
+import ast
+import re
+import sys
+import keyword
+import argparse
+
+from about import about
+from compile_cache import CompileCache, FILENAME
+from optimizer import DEFAULTS, optimize
+from savesystem import load_model_from_file
+from types_classes.node_registry import node_spec
+
+EXEC = "Exec"
+INDENT = "    "
+
+# {placeholder} in a python_template
+_PLACEHOLDER = re.compile(r"\{([^{}]*)\}")
+
+# expressions that bind tighter than any operator a template puts around them
+_ATOMS = (ast.Name, ast.Constant, ast.Call, ast.Attribute, ast.Subscript, ast.List, ast.Dict, ast.Set)
+
+# node type -> input evaluated only sometimes (the right side of and/or)
+_SHORT_CIRCUIT = {"And": "b", "Or": "b"}
+
+
+def _is_atom(text, kinds=_ATOMS):
+    try:
+        return isinstance(ast.parse(text, mode="eval").body, kinds)
+    except SyntaxError:
+        return False
+
+
+def _operand(text):
+    """`text` ready to be pasted into a template: in parentheses unless it is atomic.
+
+    Templates like "not {value}" or "{a} == {b}" would otherwise change
+    the meaning of an inlined sub-expression (not x == y is not (x == y)).
+    """
+    if _is_atom(text):
+        return text
+    if text.startswith("(") and text.endswith(")"):
+        # already wrapped, if what is inside stands on its own
+        try:
+            ast.parse(text[1:-1], mode="eval")
+            return text
+        except SyntaxError:
+            pass
+    return "(%s)" % text
+
+
+def _values(inputs):
+    # placeholder values of (port, (key, expression)) inputs; an EvalInput
+    # holds an operator, which is pasted as it is
+    return {port.name: expr if key[0] == "eval" else _operand(expr) for port, (key, expr) in inputs}
+
+
+class CompileError(Exception):
+    """The graph can't be turned into Python; `node_uid` names the offending node, if any."""
+
+    def __init__(self, message, node_uid=None):
+        super().__init__(message)
+        self.node_uid = node_uid
+
+
+def _identifier(text, fallback):
+    name = re.sub(r"\W", "_", text.strip())
+    if not name or name[0].isdigit():
+        name = "_" + name
+    if keyword.iskeyword(name):
+        name += "_"
+    return name if name.strip("_") else fallback
+
+
+def variable_name(model, record):
+    """Identifier a Get/Set Variable node refers to.
+
+    That is the text of a Text Value connected to its name input, or else
+    its title without the "Get "/"Set " prefix.
+    """
+    for port in record.inputs():
+        if port.name != "name":
+            continue
+        for conn in model.port_connections(record.id, port.index):
+            other = conn.end_node if conn.start_node == record.id and conn.start_port == port.index else conn.start_node
+            source = model.nodes[other]
+            if source.node_type == "Text Value":
+                return _identifier(source.ports[0].value or "", "variable")
+    title = record.title
+    for prefix in ("Get ", "Set "):
+        if title.startswith(prefix):
+            title = title[len(prefix):]
+    return _identifier(title, "variable")
+
+
+class Compiler:
+    """Turn a GraphModel into a Python module by filling in NodeData.python_template.
+
+    Each Start node becomes a function whose body follows the exec chain
+    from it. Pure nodes (no exec ports) are inlined into the expressions
+    that use them; statement nodes with a connected value output store it
+    in a variable. Output placeholders in a template ({loop}/{exit} of
+    While) are replaced by the indented block connected to that output,
+    and a header template ending in ':' (Selection) gets its first exec
+    output as the body and the second as an else block.
+
+    Unless `optimize` is False, the graph first goes through
+    optimizer.optimize(): constant pure nodes are emitted as literals,
+    duplicate pure nodes as the node they duplicate, and variables are
+    only declared for Set Variable nodes that end up in the program. A
+    pure node a statement's inputs use more than once (after merging) is
+    computed once into a local variable just before the statement.
+    `report` describes what that removed in the last compile.
+
+    Fragments are memoized by a small key describing the node and the
+    keys of everything it depends on, so compiling again after an edit
+    only rebuilds the fragments (and functions) that changed. Keep one
+    Compiler around to benefit; `stats` counts rebuilt and reused
+    fragments of the last compile.
+    """
+
+    def __init__(self, optimize=True):
+        self.optimize = optimize
+        self.report = None
+        self._plan = None
+        # key -> small int, so keys of dependants stay constant size
+        self._key_ids = {}
+        # key id -> fragment (str for expressions, list of lines for statements/functions)
+        self._fragments = {}
+        self._next_id = 1
+        # node type -> parsed template layout, see _layout()
+        self._layouts = {}
+        self.stats = {"built": 0, "reused": 0}
+
+    @property
+    def options(self):
+        """Settings that change the generated source, for the compile cache's keys."""
+        return {"optimize": self.optimize}
+
+    def compile(self, model):
+        """Return the source of a module running every Start chain of `model`."""
+        model.load_all()
+        self._model = model
+        # record id -> (key, expression) of pure nodes, for this compile
+        self._exprs = {}
+        # record id -> local variable holding it, while inputs of a statement are built
+        self._temps = {}
+        self._used = {}
+        self._visiting = set()
+        self.stats = {"built": 0, "reused": 0}
+        try:
+            self._plan = optimize(model) if self.optimize else None
+            self.report = self._plan.report if self._plan is not None else None
+            starts = []
+            assigned = set()
+            for record in model.nodes.values():
+                if record.node_type == "Start":
+                    starts.append(record)
+                elif record.node_type == "Set Variable" and (self._plan is None or record.id in self._plan.live):
+                    assigned.add(self._variable_name(record))
+            starts.sort(key=lambda r: r.id)
+            self._globals = tuple(sorted(assigned))
+            functions = []
+            for number, record in enumerate(starts, 1):
+                functions.append(self._function("start_%d" % number, record))
+        except RecursionError:
+            raise CompileError("graph is nested too deeply to compile")
+        finally:
+            # keep only what this compile used, so the memo tracks the graph
+            kept = self._used
+            self._fragments = {kid: self._fragments[kid] for kid in kept.values() if kid in self._fragments}
+            self._key_ids = dict(kept)
+            self._model = None
+            self._plan = None
+
+        out = ["# Generated by vispy %s from %d nodes; edits will be overwritten." % (about.version, len(model)), ""]
+        for lines in functions:
+            out.append("")
+            out.extend(lines)
+            out.append("")
+        out.append("")
+        out.append("def main():")
+        if starts:
+            out.extend(INDENT + "start_%d()" % number for number in range(1, len(starts) + 1))
+        else:
+            out.append(INDENT + "pass")
+        out.extend(["", "", 'if __name__ == "__main__":', INDENT + "main()", ""])
+        return "\n".join(out)
+
+    # memo
+
+    def _memo(self, key, build):
+        kid = self._key_ids.get(key)
+        if kid is None:
+            kid = self._next_id
+            self._next_id += 1
+            self._key_ids[key] = kid
+        self._used[key] = kid
+        fragment = self._fragments.get(kid)
+        if fragment is None:
+            fragment = build()
+            self._fragments[kid] = fragment
+            self.stats["built"] += 1
+        else:
+            self.stats["reused"] += 1
+        return kid, fragment
+
+    # graph helpers
+
+    def _spec(self, record):
+        spec = node_spec(record.node_type)
+        if spec is None:
+            raise CompileError("unknown node type %r" % record.node_type, record.uid)
+        return spec
+
+    def _linked(self, record, port):
+        """(record, port) pairs connected to a port."""
+        model = self._model
+        linked = []
+        for conn in model.port_connections(record.id, port.index):
+            if conn.start_node == record.id and conn.start_port == port.index:
+                other, index = conn.end_node, conn.end_port
+            else:
+                other, index = conn.start_node, conn.start_port
+            other_record = model.nodes[other]
+            linked.append((other_record, other_record.ports[index]))
+        return linked
+
+    def _source(self, record, port):
+        """The output port feeding an input port, or None."""
+        for other, other_port in self._linked(record, port):
+            if not other_port.is_input:
+                return other, other_port
+        return None
+
+    def _next(self, record, port):
+        """The node an exec output leads to, or None."""
+        for other, other_port in self._linked(record, port):
+            if other_port.is_input and other_port.type_name == EXEC:
+                return other
+        return None
+
+    @staticmethod
+    def _is_statement(record):
+        return any(port.type_name == EXEC for port in record.ports)
+
+    @staticmethod
+    def _variable(record):
+        return "_%s_%d" % (_identifier(record.node_type.lower(), "node"), record.id)
+
+    def _variable_name(self, record):
+        return variable_name(self._model, record)
+
+    # expressions
+
+    def _input(self, record, port):
+        """(key, expression) for a data input."""
+        source = self._source(record, port)
+        if source is not None:
+            return self._output(*source)
+        if port.shape == "TextInput":
+            return ("text", port.value), repr(port.value or "")
+        if port.shape == "EvalInput":
+            return ("eval", port.value), port.value
+        default = DEFAULTS.get(port.type_name)
+        return ("default", port.type_name), repr(default)
+
+    def _output(self, record, port):
+        """(key, expression) for a data output."""
+        plan = self._plan
+        if plan is not None and not self._is_statement(record):
+            canonical = plan.aliases.get(record.id)
+            if canonical is not None:
+                record = self._model.nodes[canonical]
+            if record.id in plan.constants:
+                text = repr(plan.constants[record.id])
+                return ("const", text), text
+            if record.id in self._temps:
+                return ("temp", record.id), self._temps[record.id]
+        if self._is_statement(record):
+            # computed by the statement, which stores it in a variable
+            return ("var", record.id), self._variable(record)
+        return self._expression(record)
+
+    def _expression(self, record):
+        cached = self._exprs.get(record.id)
+        if cached is not None:
+            return cached
+        if record.id in self._visiting:
+            raise CompileError("data inputs of %r form a cycle" % record.title, record.uid)
+        self._visiting.add(record.id)
+        try:
+            spec = self._spec(record)
+            inputs = [(port, self._input(record, port)) for port in record.inputs()]
+            name = self._variable_name(record) if record.node_type in ("Get Variable", "Set Variable") else None
+            key = ("expr", record.node_type, name, tuple(k for _, (k, _) in inputs))
+
+            def build():
+                values = _values(inputs)
+                if name is not None:
+                    values["name"] = name
+                if not spec.python_template:
+                    # value nodes (Text Value) just pass their single input through
+                    return next(iter(values.values()), "None")
+                return _PLACEHOLDER.sub(lambda m: values.get(m.group(1), m.group(0)), spec.python_template)
+
+            kid, text = self._memo(key, build)
+            result = (("frag", kid), text)
+            self._exprs[record.id] = result
+            return result
+        finally:
+            self._visiting.discard(record.id)
+
+    # statements
+
+    def _block(self, record, port):
+        """(key, lines) of the exec chain leaving `record` through `port`."""
+        keys = []
+        fragments = []
+        node = self._next(record, port)
+        chain = set()
+        while node is not None:
+            if node.id in chain or node.id in self._visiting:
+                raise CompileError("exec chain loops back to %r" % node.title, node.uid)
+            chain.add(node.id)
+            key, lines, continuation = self._statement(node)
+            keys.append(key)
+            fragments.append(lines)
+            node = self._next(node, continuation) if continuation is not None else None
+        lines = [line for fragment in fragments for line in fragment]
+        return tuple(keys), lines
+
+    def _layout(self, record):
+        """(template, embedded, branch and continuation exec outputs) of a statement node."""
+        layout = self._layouts.get(record.node_type)
+        if layout is None:
+            template = self._spec(record).python_template
+            placeholders = set(_PLACEHOLDER.findall(template))
+            outputs = [i for i, p in enumerate(record.ports) if not p.is_input and p.type_name == EXEC]
+            embedded = [i for i in outputs if record.ports[i].name in placeholders]
+            branches = [] if embedded else outputs
+            continuation = None
+            if not embedded and not template.strip().endswith(":") and len(outputs) == 1:
+                continuation = outputs[0]
+                branches = []
+            layout = (template, embedded, branches, continuation)
+            self._layouts[record.node_type] = layout
+        template, embedded, branches, continuation = layout
+        ports = record.ports
+        return (
+            template,
+            [ports[i] for i in embedded],
+            [ports[i] for i in branches],
+            None if continuation is None else ports[continuation],
+        )
+
+    def _statement(self, record):
+        """(key, lines, exec output to continue from) for one statement node."""
+        template, embedded, branches, continuation = self._layout(record)
+
+        self._visiting.add(record.id)
+        try:
+            temps, inputs = self._inputs(record, template)
+            blocks = {p.name: self._block(record, p) for p in embedded}
+            branch_blocks = [self._block(record, p) for p in branches]
+        finally:
+            self._visiting.discard(record.id)
+
+        name = self._variable_name(record) if record.node_type in ("Get Variable", "Set Variable") else None
+        stored = None
+        for port in record.outputs():
+            if port.type_name != EXEC and self._model.is_connected(record.id, port.index):
+                stored = self._variable(record)
+                break
+        key = (
+            "stmt", record.node_type, name, stored,
+            tuple((n, k) for n, k, _ in temps),
+            tuple(k for _, (k, _) in inputs),
+            tuple((n, k) for n, (k, _) in sorted(blocks.items())),
+            tuple(k for k, _ in branch_blocks),
+        )
+
+        def build():
+            values = _values(inputs)
+            if name is not None:
+                values["name"] = name
+            lines = self._render(template, values, {n: lines for n, (_, lines) in blocks.items()},
+                                 [lines for _, lines in branch_blocks], stored)
+            return ["%s = %s" % (n, text) for n, _, text in temps] + lines
+
+        kid, lines = self._memo(key, build)
+        return ("frag", kid), lines, continuation
+
+    def _inputs(self, record, template):
+        """(temporaries, inputs) of statement `record`.
+
+        Temporaries are (variable, key, expression) of shared pure nodes,
+        assigned before the statement; inputs are (port, (key, expression))
+        of its data inputs, using those variables. A loop header evaluates
+        its inputs on every pass, so it gets none.
+        """
+        temps = []
+        outer = self._exprs
+        try:
+            if self._plan is not None and not template.lstrip().startswith("while "):
+                # expressions cached so far spell the shared nodes out
+                self._exprs = {}
+                for node in self._shared(record):
+                    key, text = self._expression(node)
+                    if not _is_atom(text, (ast.Name, ast.Constant)):
+                        temps.append((self._variable(node), key, text))
+                        self._temps[node.id] = self._variable(node)
+            inputs = [(port, self._input(record, port)) for port in record.inputs() if port.type_name != EXEC]
+        finally:
+            self._exprs = outer
+            self._temps = {}
+        return temps, inputs
+
+    def _shared(self, record):
+        """Pure nodes the inputs of statement `record` use more than once, dependencies first.
+
+        Only nodes evaluated whatever happens are returned; one used only
+        on the lazy side of and/or stays inline.
+        """
+        plan = self._plan
+        nodes = self._model.nodes
+
+        def sources(node):
+            for port in node.inputs():
+                source = self._source(node, port) if port.type_name != EXEC else None
+                if source is None or self._is_statement(source[0]):
+                    continue
+                other = nodes[plan.aliases.get(source[0].id, source[0].id)]
+                if other.id not in plan.constants:
+                    yield port, other
+
+        uses = {}
+        order = []
+
+        def count(node):
+            for _, other in sources(node):
+                uses[other.id] = uses.get(other.id, 0) + 1
+                if uses[other.id] == 1:
+                    count(other)
+                    order.append(other)
+
+        eager = set()
+
+        def reach(node):
+            lazy = _SHORT_CIRCUIT.get(node.node_type)
+            for port, other in sources(node):
+                if port.name != lazy and other.id not in eager:
+                    eager.add(other.id)
+                    reach(other)
+
+        count(record)
+        reach(record)
+        return [node for node in order if uses[node.id] > 1 and node.id in eager]
+
+    @staticmethod
+    def _render(template, values, blocks, branches, stored):
+        lines = []
+        source = template.strip("\n").splitlines() if template.strip() else []
+        for line in source:
+            stripped = line.strip()
+            indent = line[:len(line) - len(line.lstrip())]
+            if stripped.startswith("{") and stripped.endswith("}") and stripped[1:-1] in blocks:
+                # a line holding only an exec output: splice its block in here
+                block = blocks[stripped[1:-1]]
+                if block:
+                    lines.extend(indent + l for l in block)
+                elif indent:
+                    lines.append(indent + "pass")
+                continue
+            lines.append(_PLACEHOLDER.sub(lambda m: values.get(m.group(1), m.group(0)), line))
+        if stored is not None and lines:
+            lines[0] = "%s = %s" % (stored, lines[0])
+        if branches:
+            # header statement (Selection): first output is the body, second the else block
+            lines.extend(INDENT + l for l in (branches[0] or ["pass"]))
+            for block in branches[1:2]:
+                if block:
+                    lines.append("else:")
+                    lines.extend(INDENT + l for l in block)
+        return lines
+
+    def _function(self, name, start):
+        exec_outputs = [p for p in start.outputs() if p.type_name == EXEC]
+        keys, body = self._block(start, exec_outputs[0]) if exec_outputs else ((), [])
+        assigned = self._globals
+        key = ("func", name, keys, assigned)
+
+        def build():
+            lines = ["def %s():" % name]
+            if assigned:
+                # variables are shared between Start chains
+                lines.append(INDENT + "global " + ", ".join(assigned))
+            lines.extend(INDENT + line for line in body or ["pass"])
+            return lines
+
+        return self._memo(key, build)[1]
+
+
+def compile_graph(model):
+    """Compile `model` into Python source with a fresh Compiler."""
+    return Compiler().compile(model)
+
+
+def main(argv=None):
+    """Command line: compile a saved graph, print or write the program, or run it."""
+    parser = argparse.ArgumentParser(description="Compile a vispy graph (.vp) to Python.")
+    parser.add_argument("graph", help="saved graph file")
+    parser.add_argument("-o", "--output", help="write the program here instead of stdout")
+    parser.add_argument("--run", action="store_true", help="run the program instead of printing it")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the compile cache")
+    parser.add_argument("--report", action="store_true", help="print what the optimizer removed to stderr")
+    args = parser.parse_args(argv)
+
+    compiler = Compiler()
+    try:
+        if args.no_cache:
+            source = compiler.compile(load_model_from_file(args.graph))
+            code = compile(source, FILENAME, "exec") if args.run else None
+        else:
+            source, code = CompileCache().compile_file(args.graph, compiler)
+    except CompileError as e:
+        print("error: %s" % e, file=sys.stderr)
+        return 1
+    if args.report:
+        print(compiler.report or "loaded from the compile cache", file=sys.stderr)
+
+    if args.run:
+        exec(code, {"__name__": "__main__"})
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(source)
+    else:
+        sys.stdout.write(source)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+from optimizer import DEFAULTS, FOLDABLE, _PLACEHOLDER, _FOLD_BUILTINS
+from types_classes.node_registry import node_spec
+
+EXEC = "Exec"
+
+# longest string a preview may build (e.g. 'ab' * n while n is being typed)
+MAX_LENGTH = 10000
+
+
+class Unavailable:
+    """A value only known while the program runs (Get Variable, Input, ...)."""
+
+    def __repr__(self):
+        return "Unavailable"
+
+
+UNAVAILABLE = Unavailable()
+
+
+class EvalError:
+    """Evaluating a node raised; `message` says what, `node_id` where it started."""
+
+    def __init__(self, message, node_id):
+        self.message = message
+        self.node_id = node_id
+
+    def __repr__(self):
+        return "EvalError(%r)" % self.message
+
+
+def _is_statement(record):
+    return any(port.type_name == EXEC for port in record.ports)
+
+
+def _too_long(a, b):
+    """True if a * b repeats a string past MAX_LENGTH."""
+    if isinstance(a, str):
+        a, b = b, a
+    return isinstance(b, str) and isinstance(a, int) and a * len(b) > MAX_LENGTH
+
+
+class LiveEvaluator:
+    """Values of the pure nodes of a GraphModel, kept up to date as it is edited.
+
+    Results are cached per output socket. An edit (a port value set through
+    GraphModel.set_value, a connection added or removed) marks the edited
+    node and everything downstream of it dirty; marking stops at nodes that
+    are already dirty, so a burst of edits only walks the cone once.
+    Nothing is evaluated until value() asks for it, and then only the
+    dirty nodes upstream of the requested socket are recomputed.
+
+    Nodes are evaluated with their python_template, like the optimizer's
+    constant folding, so a preview shows what the program would compute.
+    Values that depend on running the program are UNAVAILABLE, and a node
+    that raises gives an EvalError, which its consumers pass on.
+    """
+
+    def __init__(self, model):
+        # values depend on upstream nodes anywhere in the graph
+        model.load_all()
+        self.model = model
+        # (node id, port index) -> value of an output socket
+        self._values = {}
+        # node ids whose cached outputs are current
+        self._clean = set()
+        # node type -> its python_template as a function of the inputs, or None
+        self._functions = {}
+        self.stats = {"evaluated": 0}
+        model.listeners.append(self)
+
+    def detach(self):
+        if self in self.model.listeners:
+            self.model.listeners.remove(self)
+
+    # dirty propagation
+
+    def invalidate(self, node_id):
+        """Mark a node and its downstream cone dirty."""
+        clean = self._clean
+        if node_id not in clean:
+            return
+        stack = [node_id]
+        clean.discard(node_id)
+        nodes = self.model.nodes
+        while stack:
+            current = stack.pop()
+            if current not in nodes:
+                continue
+            for consumer in self.model.consumers(current):
+                if consumer in clean:
+                    clean.discard(consumer)
+                    stack.append(consumer)
+
+    def is_dirty(self, node_id):
+        return node_id not in self._clean
+
+    # GraphModel listener
+
+    def node_added(self, record):
+        pass
+
+    def node_moved(self, record):
+        pass
+
+    def value_changed(self, port):
+        if port.node is not None and port.node.id is not None:
+            self.invalidate(port.node.id)
+
+    def connected(self, connection):
+        self.invalidate(connection.start_node)
+        self.invalidate(connection.end_node)
+
+    def disconnected(self, connection):
+        self.invalidate(connection.start_node)
+        self.invalidate(connection.end_node)
+
+    def node_removed(self, record):
+        self._clean.discard(record.id)
+        for port in record.ports:
+            self._values.pop((record.id, port.index), None)
+
+    def cleared(self):
+        self._values.clear()
+        self._clean.clear()
+
+    # evaluation
+
+    def value(self, node_id, port):
+        """Current value of output `port` of a node, evaluating what is dirty."""
+        if node_id not in self._clean:
+            self._evaluate(node_id)
+        return self._values.get((node_id, port), UNAVAILABLE)
+
+    def _evaluate(self, node_id):
+        # iterative post-order over dirty upstream nodes, so long chains
+        # don't hit the recursion limit
+        model = self.model
+        clean = self._clean
+        visiting = set()
+        stack = [(node_id, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if current in clean:
+                continue
+            record = model.nodes[current]
+            if expanded:
+                visiting.discard(current)
+                self._compute(record)
+                clean.add(current)
+                continue
+            if current in visiting:
+                # reached again before finishing: a data cycle
+                self._set_outputs(record, EvalError("inputs form a cycle", current))
+                clean.add(current)
+                continue
+            visiting.add(current)
+            stack.append((current, True))
+            if _is_statement(record):
+                continue
+            for port in record.inputs():
+                source = model.source(current, port.index)
+                if source is not None and source[0].id not in clean:
+                    stack.append((source[0].id, False))
+
+    def _set_outputs(self, record, value):
+        for port in record.outputs():
+            self._values[(record.id, port.index)] = value
+
+    def _input(self, record, port):
+        source = self.model.source(record.id, port.index)
+        if source is not None:
+            other, other_port = source
+            return self._values.get((other.id, other_port.index), UNAVAILABLE)
+        if port.shape == "TextInput":
+            return port.value or ""
+        if port.shape == "EvalInput":
+            return UNAVAILABLE
+        return DEFAULTS.get(port.type_name)
+
+    def _function(self, node_type):
+        entry = self._functions.get(node_type)
+        if entry is None and node_type not in self._functions:
+            spec = node_spec(node_type)
+            if spec is not None and spec.python_template:
+                names = list(spec.inputs)
+                args = ", ".join("_%d" % i for i in range(len(names)))
+                body = _PLACEHOLDER.sub(
+                    lambda m: "_%d" % names.index(m.group(1)) if m.group(1) in names else m.group(0),
+                    spec.python_template,
+                )
+                code = "lambda %s: %s" % (args, body)
+                entry = eval(code, {"__builtins__": _FOLD_BUILTINS})
+            self._functions[node_type] = entry
+        return entry
+
+    def _compute(self, record):
+        self.stats["evaluated"] += 1
+        if _is_statement(record) or record.node_type not in FOLDABLE:
+            self._set_outputs(record, UNAVAILABLE)
+            return
+        args = [self._input(record, port) for port in record.inputs()]
+        for arg in args:
+            if arg is UNAVAILABLE or isinstance(arg, EvalError):
+                self._set_outputs(record, arg)
+                return
+        if record.node_type == "Text Value":
+            self._set_outputs(record, args[0] if args else "")
+            return
+        if record.node_type == "Multiply" and _too_long(*args):
+            self._set_outputs(record, EvalError("result too large to preview", record.id))
+            return
+        function = self._function(record.node_type)
+        if function is None:
+            self._set_outputs(record, UNAVAILABLE)
+            return
+        try:
+            value = function(*args)
+        except Exception as e:
+            value = EvalError("%s: %s" % (type(e).__name__, e), record.id)
+        self._set_outputs(record, value)
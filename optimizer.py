@@ -0,0 +1,251 @@
+import math
+import re
+from dataclasses import dataclass, field
+
+from types_classes.node_registry import node_spec
+from types_classes.vispyDataTypes import TypeProfile, types
+
+EXEC = "Exec"
+
+# {placeholder} in a python_template
+_PLACEHOLDER = re.compile(r"\{([^{}]*)\}")
+
+# type name -> default value used for unconnected inputs
+DEFAULTS = {
+    profile.name: profile.default
+    for profile in vars(types).values()
+    if isinstance(profile, TypeProfile)
+}
+
+# pure node types whose result only depends on their inputs, so they can
+# be computed at compile time when every input is a constant
+FOLDABLE = frozenset({
+    "Text Value",
+    "Add", "Subtract", "Multiply", "Divide",
+    "Equals", "Greater Than", "And", "Or", "Not",
+    "Cast to String", "Cast to Bool", "Cast to Integer", "Cast to Float",
+})
+
+# names a folded template may use
+_FOLD_BUILTINS = {"str": str, "int": int, "float": float, "bool": bool}
+
+# folded values with a longer repr stay in the program as expressions
+FOLD_LIMIT = 200
+
+_NOT_CONSTANT = object()
+
+
+@dataclass
+class OptimizeReport:
+    """What optimize() changed, by node uid."""
+    # uid -> value the node was replaced by
+    folded: dict = field(default_factory=dict)
+    # uid -> uid of the identical node used instead
+    merged: dict = field(default_factory=dict)
+    # uids of nodes no exec path or consumed output reaches
+    dead: list = field(default_factory=list)
+
+    def __str__(self):
+        return "folded %d constant nodes, merged %d duplicate nodes, removed %d dead nodes" % (
+            len(self.folded), len(self.merged), len(self.dead))
+
+
+@dataclass
+class Optimization:
+    """Result of optimize(), read by the Compiler while generating code."""
+    # node id -> constant value of its output
+    constants: dict = field(default_factory=dict)
+    # node id -> id of an identical pure node to emit instead
+    aliases: dict = field(default_factory=dict)
+    # ids of nodes that end up in the program
+    live: set = field(default_factory=set)
+    report: OptimizeReport = field(default_factory=OptimizeReport)
+
+
+def _is_statement(record):
+    return any(port.type_name == EXEC for port in record.ports)
+
+
+def _literal(value):
+    """True if repr(value) is a short Python literal that evaluates back to value."""
+    if isinstance(value, bool) or value is None:
+        return True
+    if isinstance(value, float):
+        return math.isfinite(value)
+    if isinstance(value, (int, str)):
+        return len(repr(value)) <= FOLD_LIMIT
+    return False
+
+
+class _Pass:
+    def __init__(self, model):
+        self.model = model
+        self.result = Optimization()
+        # node id -> (id of the node emitted for it, constant or _NOT_CONSTANT)
+        self._info = {}
+        self._visiting = set()
+        # signature -> first node id with it
+        self._canonical = {}
+
+    def _linked(self, record, port):
+        model = self.model
+        for conn in model.port_connections(record.id, port.index):
+            if conn.start_node == record.id and conn.start_port == port.index:
+                other, index = conn.end_node, conn.end_port
+            else:
+                other, index = conn.start_node, conn.start_port
+            other_record = model.nodes[other]
+            yield other_record, other_record.ports[index]
+
+    def _source(self, record, port):
+        for other, other_port in self._linked(record, port):
+            if not other_port.is_input:
+                return other, other_port
+        return None
+
+    # liveness
+
+    def reachable(self):
+        """Ids of statements on an exec path from a Start node and the pure nodes feeding them."""
+        reached = set()
+        statements = [r for r in self.model.nodes.values() if r.node_type == "Start"]
+        reached.update(r.id for r in statements)
+        pure = []
+        while statements:
+            record = statements.pop()
+            for port in record.ports:
+                if port.type_name != EXEC:
+                    pure.append((record, port))
+                elif not port.is_input:
+                    for other, other_port in self._linked(record, port):
+                        if other_port.is_input and other.id not in reached:
+                            reached.add(other.id)
+                            statements.append(other)
+        while pure:
+            record, port = pure.pop()
+            source = self._source(record, port) if port.is_input else None
+            # statement outputs are variables; the statement itself is
+            # reached only through an exec path
+            if source is None or source[0].id in reached or _is_statement(source[0]):
+                continue
+            reached.add(source[0].id)
+            pure.extend((source[0], p) for p in source[0].inputs())
+        return reached
+
+    def emitted(self, reached):
+        """Ids of nodes the program will contain once constants and duplicates are used."""
+        constants, aliases = self.result.constants, self.result.aliases
+        emitted = {node_id for node_id in reached if _is_statement(self.model.nodes[node_id])}
+        stack = list(emitted)
+        while stack:
+            record = self.model.nodes[stack.pop()]
+            for port in record.inputs():
+                source = self._source(record, port) if port.type_name != EXEC else None
+                if source is None:
+                    continue
+                other_id = aliases.get(source[0].id, source[0].id)
+                if other_id in emitted:
+                    continue
+                emitted.add(other_id)
+                # a constant is emitted as a literal, without its inputs
+                if other_id not in constants and not _is_statement(self.model.nodes[other_id]):
+                    stack.append(other_id)
+        return emitted
+
+    # folding and deduplication
+
+    def _input(self, record, port):
+        """(signature, constant) of what feeds a data input."""
+        source = self._source(record, port)
+        if source is not None:
+            other, other_port = source
+            if _is_statement(other):
+                return ("var", other.id), _NOT_CONSTANT
+            canonical, constant = self.visit(other)
+            return ("node", canonical, other_port.index), constant
+        if port.shape == "TextInput":
+            return ("text", port.value), port.value or ""
+        if port.shape == "EvalInput":
+            return ("eval", port.value), _NOT_CONSTANT
+        return ("default", port.type_name), DEFAULTS.get(port.type_name)
+
+    def visit(self, record):
+        info = self._info.get(record.id)
+        if info is not None:
+            return info
+        if record.id in self._visiting:
+            # a data cycle; the compiler reports it, just don't merge or fold
+            return record.id, _NOT_CONSTANT
+        self._visiting.add(record.id)
+        try:
+            inputs = [self._input(record, port) for port in record.inputs()]
+        finally:
+            self._visiting.discard(record.id)
+
+        # inputs refer to the node emitted for their source, so equal
+        # subexpressions get equal (and flat) signatures; variables are
+        # looked up by title, so it is part of what they compute
+        title = record.title if record.node_type in ("Get Variable", "Set Variable") else None
+        signature = (record.node_type, title, tuple(s for s, _ in inputs))
+        canonical = self._canonical.setdefault(signature, record.id)
+        if canonical != record.id:
+            self.result.aliases[record.id] = canonical
+            self.result.report.merged[record.uid] = self.model.nodes[canonical].uid
+
+        constant = _NOT_CONSTANT
+        if record.node_type in FOLDABLE and all(c is not _NOT_CONSTANT for _, c in inputs):
+            constant = self._fold(record, [port.name for port in record.inputs()], [c for _, c in inputs])
+        if constant is not _NOT_CONSTANT:
+            self.result.constants[record.id] = constant
+            if record.node_type != "Text Value" and canonical == record.id:
+                self.result.report.folded[record.uid] = constant
+
+        info = (canonical, constant)
+        self._info[record.id] = info
+        return info
+
+    def _fold(self, record, names, values):
+        if record.node_type == "Text Value":
+            return values[0] if values else ""
+        if record.node_type == "Multiply" and any(isinstance(v, str) for v in values):
+            # 'x' * n can be arbitrarily large; leave it to run time
+            return _NOT_CONSTANT
+        if not all(_literal(v) for v in values):
+            return _NOT_CONSTANT
+        spec = node_spec(record.node_type)
+        if spec is None or not spec.python_template:
+            return _NOT_CONSTANT
+        reprs = {name: repr(value) for name, value in zip(names, values)}
+        expression = _PLACEHOLDER.sub(lambda m: reprs.get(m.group(1), m.group(0)), spec.python_template)
+        try:
+            # the template itself, so the folded value is exactly what the program would compute
+            value = eval(expression, {"__builtins__": _FOLD_BUILTINS})
+        except Exception:
+            # e.g. division by zero: keep the node so the error happens at run time
+            return _NOT_CONSTANT
+        return value if _literal(value) else _NOT_CONSTANT
+
+
+def optimize(model):
+    """Analyse `model` for the Compiler: constants, duplicates and dead nodes.
+
+    The model itself isn't changed. Pure nodes on an exec path are folded
+    to a constant when all their inputs are constants, and a pure node
+    computing the same thing as an earlier one is emitted as that node.
+    Nodes outside `live` don't appear in the program; besides unreachable
+    nodes that includes inputs only used by folded nodes.
+    """
+    opt = _Pass(model)
+    reached = opt.reachable()
+    for node_id in sorted(reached):
+        record = model.nodes[node_id]
+        if not _is_statement(record):
+            opt.visit(record)
+    result = opt.result
+    result.live = opt.emitted(reached)
+    result.report.dead = [
+        record.uid for record in model.nodes.values()
+        if record.id not in result.live and record.id not in result.aliases
+        and record.uid not in result.report.folded
+    ]
+    return result
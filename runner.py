@@ -0,0 +1,301 @@
+import base64
+import codecs
+import marshal
+import sys
+
+from PySide6.QtCore import QObject, QProcess, QProcessEnvironment, QTimer, Signal
+
+# Marks worker protocol lines. Jobs arrive on stdin as a header line
+# "<MAGIC>run <n>" followed by n characters of source, or "<MAGIC>code <n>"
+# followed by a base64 marshalled code object; after a job the worker
+# writes "<MAGIC>done <exit code>" to both stdout and stderr.
+MAGIC = "\x00vispy-"
+_DONE = MAGIC + "done "
+
+# Program run by each worker process. Lines on stdin that aren't job
+# headers (input a finished program didn't read) are skipped.
+WORKER_SOURCE = r'''
+import sys, traceback, base64, marshal
+MAGIC = "\x00vispy-"
+out, err = sys.stdout, sys.stderr
+while True:
+    line = sys.stdin.readline()
+    if not line:
+        break
+    if not line.startswith(MAGIC):
+        continue
+    kind, _, size = line[len(MAGIC):].partition(" ")
+    if kind not in ("run", "code"):
+        continue
+    payload = sys.stdin.read(int(size))
+    code = 0
+    try:
+        if kind == "code":
+            program = marshal.loads(base64.b64decode(payload))
+        else:
+            program = compile(payload, "<vispy>", "exec")
+        exec(program, {"__name__": "__main__"})
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    sys.stdout, sys.stderr = out, err
+    for stream in (out, err):
+        stream.flush()
+        stream.write(MAGIC + "done %d\n" % code)
+        stream.flush()
+'''
+
+
+class _StreamReader:
+    """Decode one pipe incrementally and split off the worker's done marker."""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._tail = ""
+
+    def feed(self, data):
+        """Return (text for the user, exit code or None if the marker hasn't arrived)."""
+        text = self._tail + self._decoder.decode(bytes(data))
+        self._tail = ""
+        index = text.find(_DONE)
+        if index >= 0:
+            end = text.find("\n", index)
+            if end < 0:
+                self._tail = text[index:]
+                return text[:index], None
+            try:
+                code = int(text[index + len(_DONE):end])
+            except ValueError:
+                code = 1
+            return text[:index], code
+        # hold back anything that could be the start of a marker
+        for size in range(min(len(_DONE) - 1, len(text)), 0, -1):
+            if _DONE.startswith(text[-size:]):
+                self._tail = text[-size:]
+                return text[:-size], None
+        return text, None
+
+
+class Worker(QObject):
+    """One warm Python subprocess that runs jobs one after another."""
+
+    stdout = Signal(str)
+    stderr = Signal(str)
+    # exit code of the job, after all of its output was emitted
+    done = Signal(int)
+    # the process went away (killed, crashed or shut down)
+    died = Signal()
+
+    def __init__(self, parent=None, python=None):
+        super().__init__(parent)
+        self.busy = False
+        self._pending = None
+        self._codes = {}
+
+        self.process = QProcess(self)
+        env = QProcessEnvironment.systemEnvironment()
+        env.insert("PYTHONIOENCODING", "utf-8")
+        env.insert("PYTHONUNBUFFERED", "1")
+        self.process.setProcessEnvironment(env)
+        self.process.readyReadStandardOutput.connect(self._read_stdout)
+        self.process.readyReadStandardError.connect(self._read_stderr)
+        self.process.started.connect(self._send_pending)
+        self.process.finished.connect(self._on_finished)
+        self.process.errorOccurred.connect(self._on_error)
+        self._readers = {"out": _StreamReader(), "err": _StreamReader()}
+        self.python = python or sys.executable
+        self.process.start(self.python, ["-u", "-c", WORKER_SOURCE])
+
+    def alive(self):
+        return self.process.state() != QProcess.NotRunning
+
+    def submit(self, source, code=None):
+        """Run `source`, or the code object compiled from it if given.
+
+        The job is sent as soon as the process has started.
+        """
+        self.busy = True
+        self._codes = {}
+        self._readers = {"out": _StreamReader(), "err": _StreamReader()}
+        if code is not None and self.python == sys.executable:
+            # marshal data only loads in the same interpreter version
+            payload = base64.b64encode(marshal.dumps(code)).decode("ascii")
+            self._pending = "%scode %d\n%s" % (MAGIC, len(payload), payload)
+        else:
+            self._pending = "%srun %d\n%s" % (MAGIC, len(source), source)
+        if self.process.state() == QProcess.Running:
+            self._send_pending()
+
+    def write_input(self, text):
+        """Send text to the running program's stdin."""
+        if self._pending is not None:
+            # the job itself hasn't been sent yet; input has to follow it
+            self._pending += text
+        elif self.alive():
+            self.process.write(text.encode("utf-8"))
+
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+            # reap it now; after SIGKILL this returns almost immediately
+            self.process.waitForFinished(1000)
+
+    def shutdown(self, wait=0):
+        """Close stdin so an idle worker exits on its own, waiting up to `wait` ms."""
+        if self.alive():
+            self.process.closeWriteChannel()
+            if wait and not self.process.waitForFinished(wait):
+                self.process.kill()
+
+    def _send_pending(self):
+        if self._pending is not None:
+            self.process.write(self._pending.encode("utf-8"))
+            self._pending = None
+
+    def _read(self, stream, data, signal):
+        text, code = self._readers[stream].feed(data)
+        if text:
+            signal.emit(text)
+        if code is not None:
+            self._codes[stream] = code
+            if len(self._codes) == 2 and self.busy:
+                self.busy = False
+                self.done.emit(self._codes["out"])
+
+    def _read_stdout(self):
+        self._read("out", self.process.readAllStandardOutput(), self.stdout)
+
+    def _read_stderr(self):
+        self._read("err", self.process.readAllStandardError(), self.stderr)
+
+    def _on_finished(self, *args):
+        self.busy = False
+        self.died.emit()
+
+    def _on_error(self, error):
+        if error == QProcess.FailedToStart:
+            self.busy = False
+            self.died.emit()
+
+
+class Run(QObject):
+    """One execution of a program on a pool worker.
+
+    `status` ends up as 'ok', 'error' (non-zero exit), 'cancelled',
+    'timeout' or 'crashed' and is passed along with the exit code in
+    `finished`.
+    """
+
+    stdout = Signal(str)
+    stderr = Signal(str)
+    finished = Signal(int, str)
+
+    def __init__(self, pool, worker, source, timeout=None, code=None):
+        super().__init__(pool)
+        self._pool = pool
+        self.worker = worker
+        self.status = None
+        self.exit_code = None
+
+        worker.stdout.connect(self.stdout)
+        worker.stderr.connect(self.stderr)
+        worker.done.connect(self._on_done)
+        worker.died.connect(self._on_died)
+
+        self._timer = None
+        if timeout:
+            self._timer = QTimer(self)
+            self._timer.setSingleShot(True)
+            self._timer.timeout.connect(lambda: self._stop("timeout"))
+            self._timer.start(int(timeout * 1000))
+
+        worker.submit(source, code)
+
+    def running(self):
+        return self.status is None
+
+    def write_input(self, text):
+        if self.running():
+            self.worker.write_input(text)
+
+    def cancel(self):
+        self._stop("cancelled")
+
+    def _stop(self, status):
+        if self.running():
+            # the worker's state is unknown mid-program, so it isn't reused
+            self._finish(-1, status)
+            self.worker.kill()
+
+    def _on_done(self, code):
+        if self.running():
+            self._finish(code, "ok" if code == 0 else "error")
+
+    def _on_died(self):
+        if self.running():
+            self._finish(-1, "crashed")
+
+    def _finish(self, code, status):
+        self.exit_code = code
+        self.status = status
+        if self._timer is not None:
+            self._timer.stop()
+        for signal, slot in ((self.worker.stdout, self.stdout), (self.worker.stderr, self.stderr),
+                             (self.worker.done, self._on_done), (self.worker.died, self._on_died)):
+            try:
+                signal.disconnect(slot)
+            except (RuntimeError, TypeError):
+                pass
+        self._pool._release(self.worker, reuse=status in ("ok", "error"))
+        self.finished.emit(code, status)
+
+
+class WorkerPool(QObject):
+    """Keeps `size` started worker processes ready so a run doesn't wait for Python to boot."""
+
+    def __init__(self, size=1, parent=None, python=None):
+        super().__init__(parent)
+        self.size = size
+        self._python = python
+        self._idle = []
+
+    def warm(self):
+        """Start workers until `size` are idle."""
+        self._idle = [w for w in self._idle if w.alive()]
+        while len(self._idle) < self.size:
+            self._idle.append(Worker(self, self._python))
+
+    def run(self, source, timeout=None, code=None):
+        """Start running `source` and return its Run.
+
+        `code` may be the code object of `source` (e.g. from the compile
+        cache), which saves the worker compiling it again.
+        """
+        worker = None
+        while self._idle:
+            candidate = self._idle.pop()
+            if candidate.alive():
+                worker = candidate
+                break
+        if worker is None:
+            worker = Worker(self, self._python)
+        return Run(self, worker, source, timeout, code)
+
+    def shutdown(self, wait=500):
+        """Stop the idle workers (a running one should be cancelled first)."""
+        for worker in self._idle:
+            worker.shutdown(wait)
+        self._idle = []
+
+    def _release(self, worker, reuse):
+        if reuse and worker.alive() and len(self._idle) < self.size:
+            self._idle.append(worker)
+            return
+        if reuse:
+            # the pool is already full; an idle worker exits as soon as stdin closes
+            worker.shutdown(wait=500)
+        else:
+            # a killed worker is replaced in the background, ready for the next run
+            QTimer.singleShot(0, self.warm)
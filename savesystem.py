@@ -1,130 +1,134 @@
 import json
 import os
 import logging
+import tempfile
 
-from widgets_elements.vispyNodeLib import Node, Socket, Edge
+import autosave
+import vpb
+from types_classes.graph_model import GraphModel
 
+# file dialog filter for every format save and load understand
+FILE_FILTER = 'Vispy Files (*.vp *.json *.vpb);;Vispy Binary Files (*.vpb);;All Files (*)'
 
-def _socket_value(socket):
-	try:
-		# text input
-		if getattr(socket, 'type', None) and getattr(socket.type, 'shape', None) == 'TextInput':
-			return socket.get_text_value()
-		# eval/dropdown input
-		if getattr(socket, 'type', None) and getattr(socket.type, 'shape', None) == 'EvalInput':
-			return socket.get_eval_value()
-	except Exception:
-		logging.exception('Error reading socket value')
-	return None
 
+# compact separators for the default, streamed format
+_ENCODER = json.JSONEncoder(separators=(',', ':'))
 
-def save_scene_to_file(scene, path):
-	"""Serialize the given QGraphicsScene to a JSON file.
+# entries encoded before each write to the file
+_BATCH = 1000
 
-	The format contains a `nodes` list and an `edges` list. Nodes include
-	id, type, title, position, inputs and outputs. Inputs that are text
-	or eval widgets will include their current value.
+
+def _write_entries(f, entries, encode):
+	batch = []
+	separator = ''
+	for entry in entries:
+		batch.append(encode(entry))
+		if len(batch) == _BATCH:
+			f.write(separator)
+			f.write(','.join(batch))
+			separator = ','
+			batch.clear()
+	if batch:
+		f.write(separator)
+		f.write(','.join(batch))
+
+
+def write_model(model, f, indent=None):
+	"""Write a GraphModel to the text file `f` in the saved-file format.
+
+	By default the JSON is compact and written a batch of nodes or edges
+	at a time, straight from the model's records, so the whole document
+	never exists in memory. With `indent` the dict is built and
+	pretty-printed by json.dump instead.
 	"""
-	data = {"nodes": [], "edges": []}
+	if indent is not None:
+		json.dump(model.to_data(), f, indent=indent)
+		return
+	model.load_all()
+	encode = _ENCODER.encode
+	f.write('{"nodes":[')
+	_write_entries(f, map(model.node_data, model.nodes.values()), encode)
+	f.write('],"edges":[')
+	_write_entries(f, map(model.connection_data, model.connections.values()), encode)
+	f.write(']}')
 
-	# Collect nodes first
-	for item in list(scene.items()):
-		try:
-			if isinstance(item, Node):
-				node = item
-				node_id = getattr(getattr(node, 'data', None), 'id', None)
-				node_type = getattr(getattr(node, 'data', None), 'node_type', getattr(node, 'title', None))
-				node_dict = {
-					'id': node_id,
-					'type': node_type,
-					'title': getattr(node, 'title', ''),
-					'pos': [node.pos().x(), node.pos().y()],
-					'inputs': [],
-					'outputs': []
-				}
-
-				# sockets are stored on the node as a list
-				for idx, sock in enumerate(getattr(node, 'sockets', []) or []):
-					try:
-						sock_info = {
-							'name': getattr(sock, 'name', ''),
-							'index': idx,
-							'type': getattr(getattr(sock, 'type', None), 'name', None),
-							'shape': getattr(getattr(sock, 'type', None), 'shape', None)
-						}
-						if sock.pos().x() <= 0:
-							# input socket
-							sock_info['value'] = _socket_value(sock)
-							node_dict['inputs'].append(sock_info)
-						else:
-							node_dict['outputs'].append(sock_info)
-					except Exception:
-						logging.exception('Error serializing socket')
-
-				data['nodes'].append(node_dict)
-		except Exception:
-			logging.exception('Error serializing node')
 
-	# Collect edges (only fully connected edges saved)
-	for item in list(scene.items()):
-		try:
-			if isinstance(item, Edge):
-				edge = item
-				# only save edges connected to two sockets
-				if not isinstance(edge.start, Socket) or not isinstance(edge.end, Socket):
-					continue
-
-				# find parent nodes for sockets
-				start_parent = getattr(edge.start, 'parentItem', lambda: None)()
-				end_parent = getattr(edge.end, 'parentItem', lambda: None)()
-
-				start_node_id = getattr(getattr(start_parent, 'data', None), 'id', None)
-				end_node_id = getattr(getattr(end_parent, 'data', None), 'id', None)
-
-				# socket indices within their parent node
-				start_index = None
-				end_index = None
-				try:
-					if hasattr(start_parent, 'sockets'):
-						for i, s in enumerate(start_parent.sockets):
-							if s is edge.start:
-								start_index = i
-								break
-					if hasattr(end_parent, 'sockets'):
-						for i, s in enumerate(end_parent.sockets):
-							if s is edge.end:
-								end_index = i
-								break
-				except Exception:
-					logging.exception('Error locating socket index')
-
-				edge_dict = {
-					'start_node_id': start_node_id,
-					'start_socket_index': start_index,
-					'end_node_id': end_node_id,
-					'end_socket_index': end_index,
-					'type': getattr(getattr(edge, 'type', None), 'name', None)
-				}
-				data['edges'].append(edge_dict)
-		except Exception:
-			logging.exception('Error serializing edge')
+def _is_binary(path):
+	return path.lower().endswith(vpb.EXTENSION)
+
 
-	# Ensure directory exists
+# mode of a new file: the usual 0666 & ~umask. os.umask() can only be read
+# by setting it, which affects files other threads create meanwhile (the
+# autosave thread writes snapshots), so it is read once, at import
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_NEW_FILE_MODE = 0o666 & ~_UMASK
+
+
+def _file_mode(path):
+	# keep an existing file's permissions
 	try:
-		os.makedirs(os.path.dirname(path), exist_ok=True)
-	except Exception:
-		pass
+		return os.stat(path).st_mode & 0o777
+	except OSError:
+		return _NEW_FILE_MODE
+
+
+def write_snapshot(model, path, indent=None):
+	"""Write a GraphModel to `path`: binary for a .vpb path (see vpb), else JSON (see write_model).
+
+	The file is written next to `path` and renamed over it when complete,
+	so a failed save leaves the previous file intact. Journals of `path`
+	are left alone (see save_model_to_file).
+	"""
+	directory = os.path.dirname(os.path.abspath(path))
+	os.makedirs(directory, exist_ok=True)
+	fd, tmp = tempfile.mkstemp(dir=directory, prefix='.save-', suffix='.tmp')
+	try:
+		if _is_binary(path):
+			with os.fdopen(fd, 'wb') as f:
+				vpb.write_model(model, f)
+		else:
+			with os.fdopen(fd, 'w', encoding='utf-8') as f:
+				write_model(model, f, indent)
+		os.chmod(tmp, _file_mode(path))
+		os.replace(tmp, path)
+	except BaseException:
+		try:
+			os.remove(tmp)
+		except OSError:
+			pass
+		raise
 
-	# Write JSON to file
-	with open(path, 'w', encoding='utf-8') as f:
-		json.dump(data, f, indent=2)
+
+def save_model_to_file(model, path, indent=None):
+	"""Save a GraphModel to `path` (see write_snapshot).
+
+	The file then holds the whole graph, so any autosave journals of an
+	earlier version of it are deleted.
+	"""
+	write_snapshot(model, path, indent)
+	autosave.discard_journals(path)
+
+
+def save_scene_to_file(scene, path, indent=None):
+	"""Serialize the graph of the given scene to a JSON file.
+
+	The format contains a `nodes` list and an `edges` list. Nodes include
+	id, type, title, position, inputs and outputs. Inputs that are text
+	or eval widgets will include their current value.
+
+	The data comes from the scene's GraphModel, so saving doesn't touch any
+	Qt items and takes time proportional to nodes + edges. The JSON is
+	compact unless `indent` is given.
+	"""
+	save_model_to_file(scene.model, path, indent)
 
 
 def save_scene_via_dialog(parent_window, scene):
 	"""Convenience: show a Save dialog and save the scene if a path chosen."""
 	from PySide6.QtWidgets import QFileDialog, QMessageBox
 
-	path, _ = QFileDialog.getSaveFileName(parent_window, 'Save File', '', 'Vispy Files (*.vp *.json);;All Files (*)')
+	path, _ = QFileDialog.getSaveFileName(parent_window, 'Save File', '', FILE_FILTER)
 	if not path:
 		return False
 	try:
@@ -143,149 +147,49 @@ def save_scene_via_dialog(parent_window, scene):
 		return False
 
 
+def read_snapshot(path):
+	"""Read the graph saved in `path`, JSON or binary (.vpb), without its journals."""
+	if _is_binary(path):
+		return vpb.load_model(path)
+	with open(path, 'r', encoding='utf-8') as f:
+		return GraphModel.from_data(json.load(f))
+
+
+def load_model_from_file(path):
+	"""Read a saved graph, JSON or binary (.vpb), into a new GraphModel.
+
+	Edits an autosave journaled since the file was written are replayed
+	on top (see autosave).
+	"""
+	model = read_snapshot(path)
+	autosave.replay_journals(model, path)
+	return model
+
+
 def load_scene_from_file(scene, path):
-	"""Load a scene JSON file and reconstruct nodes and edges in the provided QGraphicsScene.
+	"""Load a scene file (JSON or .vpb) into a new GraphModel and show it in the provided scene.
 
-	This will remove existing Node and Edge items from the scene before loading.
+	This replaces the scene's Node and Edge items with views of the loaded graph.
+	A .vpb file shown in a virtualized scene is loaded a tile at a time:
+	the tiles around the view now, the others as the view reaches them
+	or when something needs the whole graph (see vpb.TileLoader), unless
+	it has journals to replay.
 	"""
 	try:
-		with open(path, 'r', encoding='utf-8') as f:
-			data = json.load(f)
+		if _is_binary(path) and scene.virtualizer is not None and not autosave.has_journal(path):
+			model = vpb.open_model(path)
+		else:
+			model = load_model_from_file(path)
 	except Exception:
 		logging.exception('Failed to read scene file')
 		raise
 
-	# remove existing Node and Edge items
-	try:
-		items = list(scene.items())
-		for it in items:
-			try:
-				if isinstance(it, Edge) or isinstance(it, Node):
-					scene.removeItem(it)
-			except Exception:
-				pass
-	except Exception:
-		logging.exception('Error clearing scene')
-
-	# mapping from saved node id to Node instance
-	node_map = {}
-
-	# helper to find type profile by name if needed
-	def _type_from_name(name):
-		try:
-			from types_classes.vispyDataTypes import types as _types_module
-			for attr in dir(_types_module):
-				val = getattr(_types_module, attr)
-				if getattr(val, 'name', None) == name:
-					return val
-		except Exception:
-			pass
-		return None
-
-	# Recreate nodes
-	for node_entry in data.get('nodes', []):
-		try:
-			node_type = node_entry.get('type')
-			# try to create NodeData using node_library makers when available
-			from types_classes import node_library as nl
-			node_data = None
-			# find a maker that creates this type
-			for attr in dir(nl):
-				if attr.startswith('make_') and attr.endswith('_node'):
-					try:
-						func = getattr(nl, attr)
-						nd = func()
-						if getattr(nd, 'node_type', None) == node_type:
-							node_data = nd
-							break
-					except Exception:
-						continue
-
-			# fallback: construct a minimal NodeData-like object
-			if node_data is None:
-				from types_classes.node_data import NodeData
-				node_data = NodeData(node_type=node_type)
-
-			# override id if present in file
-			sid = node_entry.get('id')
-			if sid and hasattr(node_data, 'id'):
-				try:
-					node_data.id = sid
-				except Exception:
-					pass
-
-			# create Node
-			from widgets_elements.vispyNodeLib import Node as NodeClass
-			node = NodeClass(node_data)
-			node.title = node_entry.get('title', node.title)
-			pos = node_entry.get('pos', [0, 0])
-			try:
-				node.setPos(pos[0], pos[1])
-			except Exception:
-				pass
-
-			scene.addItem(node)
-			node_map[node_data.id] = node
-
-			# restore input values for sockets
-			inputs = node_entry.get('inputs', [])
-			outputs = node_entry.get('outputs', [])
-
-			# sockets on Node are listed inputs then outputs
-			for sock_info in inputs:
-				try:
-					idx = sock_info.get('index')
-					if idx is None:
-						continue
-					sock = node.sockets[idx]
-					val = sock_info.get('value')
-					if val is not None:
-						if getattr(sock, 'type', None) and getattr(sock.type, 'shape', None) == 'TextInput':
-							sock.set_text_value(val)
-						elif getattr(sock, 'type', None) and getattr(sock.type, 'shape', None) == 'EvalInput':
-							sock.set_eval_value(val)
-				except Exception:
-					logging.exception('Error restoring socket input')
-
-			# outputs currently have no widget values to restore
-		except Exception:
-			logging.exception('Error recreating node')
-
-	# Recreate edges
-	for edge_entry in data.get('edges', []):
-		try:
-			s_nid = edge_entry.get('start_node_id')
-			e_nid = edge_entry.get('end_node_id')
-			s_idx = edge_entry.get('start_socket_index')
-			e_idx = edge_entry.get('end_socket_index')
-
-			start_node = node_map.get(s_nid)
-			end_node = node_map.get(e_nid)
-			if not start_node or not end_node:
-				continue
-
-			if s_idx is None or e_idx is None:
-				continue
-
-			try:
-				start_socket = start_node.sockets[s_idx]
-				end_socket = end_node.sockets[e_idx]
-			except Exception:
-				continue
-
-			# determine type profile to pass to Edge constructor; prefer start socket type
-			etype = getattr(start_socket, 'type', None) or getattr(end_socket, 'type', None)
-			# create Edge
-			from widgets_elements.vispyNodeLib import Edge as EdgeClass
-			edge = EdgeClass(start_socket, end_socket, etype)
-			scene.addItem(edge)
-		except Exception:
-			logging.exception('Error recreating edge')
+	scene.set_model(model)
 
 
 def load_scene_via_dialog(parent_window, scene):
 	from PySide6.QtWidgets import QFileDialog, QMessageBox
-	path, _ = QFileDialog.getOpenFileName(parent_window, 'Open File', '', 'Vispy Files (*.vp *.json);;All Files (*)')
+	path, _ = QFileDialog.getOpenFileName(parent_window, 'Open File', '', FILE_FILTER)
 	if not path:
 		return False
 	try:
@@ -0,0 +1,128 @@
+import json
+import os
+import tempfile
+
+import autosave
+import savesystem
+import vpb
+from types_classes.graph_model import GraphModel
+
+
+def canonical(model):
+    data = model.to_data()
+    key = lambda item: json.dumps(item, sort_keys=True)
+    return sorted(data['nodes'], key=key), sorted(data['edges'], key=key)
+
+
+def edit(model):
+    start = model.add_node('Start', x=-200, y=0)
+    text = model.add_node('Text Value', x=0, y=0)
+    printer = model.add_node('Print', x=200, y=0)
+    model.connect(start.id, 0, printer.id, 0, 'Exec')
+    conn = model.connect(text.id, 1, printer.id, 1, 'String')
+    model.set_value(text.ports[0], 'hello')
+    # a drag: many moves, one record
+    for x in range(0, 100, 10):
+        model.move_node(printer.id, 200 + x, 0)
+    model.disconnect(conn.id)
+    extra = model.add_node('Text Value', x=0, y=100)
+    model.connect(extra.id, 1, printer.id, 1, 'String')
+    model.remove_node(text.id)
+
+
+def test_journal_replay():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'graph.vp')
+        model = GraphModel()
+        model.add_node('Text Value', x=500, y=500)
+        savesystem.save_model_to_file(model, path)
+
+        saver = autosave.Autosave(model, path)
+        saver.interval = 60
+        saver.start()
+        edit(model)
+        saver.flush()
+        with open(path + autosave.JOURNAL_SUFFIX, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        assert sum(r['op'] == 'move' for r in records) == 1
+        # what a crash leaves: the snapshot and the journal
+        assert canonical(savesystem.load_model_from_file(path)) == canonical(model)
+
+        # a record cut short by the crash is ignored
+        with open(path + autosave.JOURNAL_SUFFIX, 'a', encoding='utf-8') as f:
+            f.write('{"op":"delete","id":')
+        assert canonical(savesystem.load_model_from_file(path)) == canonical(model)
+
+        # replaying a journal the graph already contains changes nothing
+        again = savesystem.load_model_from_file(path)
+        autosave.replay(again, path + autosave.JOURNAL_SUFFIX)
+        assert canonical(again) == canonical(model)
+        saver.stop()
+
+
+def test_compaction():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'graph.vpb')
+        model = GraphModel()
+        savesystem.save_model_to_file(model, path)
+        saver = autosave.Autosave(model, path)
+        saver.interval = 0.01
+        saver.compact_bytes = 1
+        saver.start()
+        edit(model)
+        saver.stop()
+        # stop() flushes after the thread's last compaction
+        saver.compact()
+        assert not autosave.has_journal(path)
+        assert canonical(savesystem.read_snapshot(path)) == canonical(model)
+
+        # a full save supersedes the journals
+        saver = autosave.Autosave(model, path)
+        saver.interval = 60
+        saver.start()
+        model.add_node('Print')
+        saver.flush()
+        assert autosave.has_journal(path)
+        savesystem.save_model_to_file(model, path)
+        assert not autosave.has_journal(path)
+        saver.stop()
+        assert canonical(savesystem.load_model_from_file(path)) == canonical(model)
+
+
+def test_no_compaction_while_tiles_load():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'graph.vpb')
+        model = GraphModel()
+        for i in range(4):
+            model.add_node('Text Value', x=i * 3 * vpb.TILE_SIZE, y=0)
+        savesystem.save_model_to_file(model, path)
+        with open(path, 'rb') as f:
+            snapshot = f.read()
+
+        opened = vpb.open_model(path)
+        list(opened.nodes_in_rect(-100, -100, 100, 100))
+        assert len(opened) == 1 and opened.loader is not None
+        saver = autosave.Autosave(opened, path)
+        saver.interval = 60
+        saver.compact_bytes = 1
+        saver.start()
+        opened.add_node('Print', x=50, y=50)
+        saver.flush()
+        # the loader still reads the snapshot: it is left alone
+        saver.compact()
+        with open(path, 'rb') as f:
+            assert f.read() == snapshot
+        assert autosave.has_journal(path) and opened.loader is not None
+
+        opened.load_all()
+        saver.compact()
+        saver.stop()
+        assert not autosave.has_journal(path)
+        assert canonical(savesystem.read_snapshot(path)) == canonical(opened) and len(opened) == 5
+
+
+if __name__ == '__main__':
+    test_journal_replay()
+    test_compaction()
+    test_no_compaction_while_tiles_load()
+    print('OK')
@@ -0,0 +1,111 @@
+import os
+import tempfile
+
+import numpy as np
+
+from batch import BatchEvaluator, BatchError, load_columns, save_columns
+from compiler import Compiler
+from types_classes.graph_model import GraphModel
+
+
+def build_model():
+    # label = str(float(a) * 2.0) + unit; check = a_text and (not b_text)
+    model = GraphModel()
+
+    def node(node_type, *inputs, title=None):
+        record = model.add_node(node_type, title=title)
+        for port, (source, index) in enumerate(inputs):
+            model.connect(source.id, index, record.id, port)
+        return record
+
+    a = node('Text Value', title='a')
+    b = node('Text Value', title='b')
+    unit = node('Text Value', title='unit')
+    unit.ports[0].value = ' kg'
+    two = node('Text Value')
+    two.ports[0].value = '2'
+    doubled = node('Multiply', (node('Cast to Float', (a, 1)), 1), (node('Cast to Float', (two, 1)), 1))
+    label = node('Add', (node('Cast to String', (doubled, 2)), 1), (unit, 1), title='label')
+    check = node('And', (a, 1), (node('Not', (b, 1)), 1), title='check')
+
+    start = node('Start')
+    show = node('Print', (start, 0), (label, 2))
+    node('Print', (show, 2), (check, 2))
+    return model
+
+
+def scalar_rows(model, rows):
+    """Run the generated program once per row, with the leaf values replaced."""
+    results = []
+    for values in rows:
+        for record in model.nodes.values():
+            if record.title in values:
+                record.ports[0].value = values[record.title]
+        namespace = {'__name__': 'test', 'print': results.append}
+        exec(Compiler(optimize=False).compile(model), namespace)
+        namespace['start_1']()
+    return results
+
+
+def test_matches_generated_code():
+    model = build_model()
+    a = ['1', '2.5', '-3', '0']
+    b = ['', 'x', '', 'y']
+    result = BatchEvaluator(model).evaluate({'a': np.array(a), 'b': np.array(b)})
+    expected = scalar_rows(model, [{'a': x, 'b': y} for x, y in zip(a, b)])
+    assert result['label'].tolist() == expected[0::2]
+    assert result['check'].tolist() == expected[1::2]
+
+
+def test_file_round_trip():
+    model = build_model()
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'in.csv')
+        with open(source, 'w') as f:
+            f.write('a,b\n1,\n4,no\n')
+        result = BatchEvaluator(model).evaluate(load_columns(source))
+        for ext in ('.csv', '.npy', '.npz'):
+            path = os.path.join(directory, 'out' + ext)
+            save_columns(path, result)
+            loaded = load_columns(path)
+            assert loaded['label'].tolist() == ['2.0 kg', '8.0 kg']
+
+
+def test_equals_mixed_types():
+    # a == float(a) is False on every row: a string never equals a number
+    model = GraphModel()
+    a = model.add_node('Text Value', title='a')
+    number = model.add_node('Cast to Float')
+    model.connect(a.id, 1, number.id, 0)
+    same = model.add_node('Equals', title='same')
+    model.connect(a.id, 1, same.id, 0)
+    model.connect(number.id, 1, same.id, 1)
+    start = model.add_node('Start')
+    show = model.add_node('Print')
+    model.connect(start.id, 0, show.id, 0)
+    model.connect(same.id, 2, show.id, 1)
+
+    a = ['1', '2.5']
+    result = BatchEvaluator(model).evaluate({'a': np.array(a)})
+    assert result['same'].tolist() == scalar_rows(model, [{'a': x} for x in a]) == [False, False]
+
+
+def test_statements_are_rejected():
+    model = GraphModel()
+    ask = model.add_node('Input')
+    upper = model.add_node('Cast to Bool', title='answered')
+    model.connect(ask.id, 3, upper.id, 0)
+    try:
+        BatchEvaluator(model, outputs=['answered'])
+    except BatchError as e:
+        assert e.node_uid == ask.uid
+    else:
+        raise AssertionError('statement was batch evaluated')
+
+
+if __name__ == '__main__':
+    test_matches_generated_code()
+    test_file_round_trip()
+    test_equals_mixed_types()
+    test_statements_are_rejected()
+    print('OK')
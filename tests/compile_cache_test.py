@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import time
+
+from compile_cache import CompileCache, graph_key
+from compiler import Compiler
+from types_classes.graph_model import GraphModel
+
+
+class CountingCompiler(Compiler):
+    def __init__(self, optimize=True):
+        super().__init__(optimize)
+        self.calls = 0
+
+    def compile(self, model):
+        self.calls += 1
+        return super().compile(model)
+
+
+def hello_model(text='hello', cast=False):
+    # print(text), or print(str(text)), which the optimizer folds to print(text)
+    model = GraphModel()
+    start = model.add_node('Start')
+    value = model.add_node('Text Value')
+    value.ports[0].value = text
+    printer = model.add_node('Print')
+    model.connect(start.id, 0, printer.id, 0)
+    if cast:
+        string = model.add_node('Cast to String')
+        model.connect(value.id, 1, string.id, 0)
+        value = string
+    model.connect(value.id, 1, printer.id, 1)
+    return model
+
+
+def test_key_ignores_layout():
+    model = hello_model()
+    key = graph_key(model)
+    model.move_node(1, 500, 500)
+    assert graph_key(model) == key
+    assert graph_key(hello_model('bye')) != key
+
+
+def test_second_run_skips_compile():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'hello.vp')
+        with open(path, 'w') as f:
+            json.dump(hello_model().to_data(), f)
+
+        compiler = CountingCompiler()
+        cache = CompileCache(os.path.join(directory, 'cache'))
+        source, code = cache.compile_file(path, compiler)
+        again, code_again = CompileCache(cache.directory).compile_file(path, compiler)
+        assert compiler.calls == 1
+        assert again == source and code_again == code
+
+        # a damaged entry is dropped and rebuilt
+        for name in os.listdir(cache.directory):
+            with open(os.path.join(cache.directory, name), 'r+b') as f:
+                f.seek(-3, os.SEEK_END)
+                f.write(b'xyz')
+        assert cache.compile_file(path, compiler)[0] == source
+        assert compiler.calls == 2
+
+
+def test_options_are_part_of_the_key():
+    model = hello_model(cast=True)
+    assert graph_key(model, Compiler(optimize=False).options) != graph_key(model)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'hello.vp')
+        with open(path, 'w') as f:
+            json.dump(model.to_data(), f)
+        cache = CompileCache(os.path.join(directory, 'cache'))
+        sources = {True: [], False: []}
+        for optimize, calls in ((True, 1), (False, 1), (True, 0), (False, 0)):
+            compiler = CountingCompiler(optimize)
+            sources[optimize].append(cache.compile_file(path, compiler)[0])
+            sources[optimize].append(cache.compile(model, compiler)[0])
+            assert compiler.calls == calls
+        assert "str(" not in sources[True][0] and "str(" in sources[False][0]
+        assert sources[True] == [Compiler().compile(model)] * 4
+        assert sources[False] == [Compiler(optimize=False).compile(model)] * 4
+
+
+def test_lru_eviction():
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompileCache(directory, max_entries=2)
+        keys = []
+        for number in range(3):
+            model = hello_model('text %d' % number)
+            keys.append(graph_key(model))
+            cache.compile(model)
+            if number == 1:
+                # make entry 0 the most recently used
+                time.sleep(0.05)
+                assert cache.get(keys[0]) is not None
+            time.sleep(0.05)
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[2]) is not None
+
+
+if __name__ == '__main__':
+    test_key_ignores_layout()
+    test_second_run_skips_compile()
+    test_options_are_part_of_the_key()
+    test_lru_eviction()
+    print('OK')
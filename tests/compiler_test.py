@@ -0,0 +1,128 @@
+import subprocess
+import sys
+
+from compiler import Compiler, CompileError
+from types_classes.graph_model import GraphModel
+
+
+def text(model, value):
+    record = model.add_node('Text Value')
+    record.ports[0].value = value
+    return record
+
+
+def build_model():
+    # Start -> Input -> Selection(input == 'bob') -> Print 'hi' / Print input
+    model = GraphModel()
+    start = model.add_node('Start')
+    ask = model.add_node('Input')
+    model.connect(start.id, 0, ask.id, 0)
+    model.connect(text(model, 'name? ').id, 1, ask.id, 1)
+
+    select = model.add_node('Selection')
+    model.connect(ask.id, 2, select.id, 0)
+    equals = model.add_node('Equals')
+    model.connect(ask.id, 3, equals.id, 0)
+    model.connect(text(model, 'bob').id, 1, equals.id, 1)
+    model.connect(equals.id, 2, select.id, 1)
+
+    greet = model.add_node('Print')
+    model.connect(select.id, 2, greet.id, 0)
+    hello = text(model, 'hi bob')
+    model.connect(hello.id, 1, greet.id, 1)
+    echo = model.add_node('Print')
+    model.connect(select.id, 3, echo.id, 0)
+    model.connect(ask.id, 3, echo.id, 1)
+    return model, hello
+
+
+def run(source, stdin):
+    result = subprocess.run([sys.executable, '-c', source], input=stdin, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_compiled_program_runs():
+    model, hello = build_model()
+    source = Compiler().compile(model)
+    print(source)
+    assert run(source, 'bob\n').endswith('hi bob\n')
+    assert run(source, 'ann\n').endswith('ann\n')
+
+
+def test_recompile_reuses_fragments():
+    model, hello = build_model()
+    compiler = Compiler()
+    first = compiler.compile(model)
+    built = compiler.stats['built']
+    assert compiler.compile(model) == first and compiler.stats['built'] == 0
+
+    hello.ports[0].value = 'hello bob'
+    compiler.compile(model)
+    print('rebuilt after one edit:', compiler.stats)
+    assert 0 < compiler.stats['built'] < built
+
+
+def test_exec_cycle_is_an_error():
+    model = GraphModel()
+    start = model.add_node('Start')
+    a = model.add_node('Print')
+    b = model.add_node('Print')
+    model.connect(start.id, 0, a.id, 0)
+    model.connect(a.id, 2, b.id, 0)
+    model.connect(b.id, 2, a.id, 0)
+    try:
+        Compiler().compile(model)
+    except CompileError as e:
+        assert e.node_uid == a.uid
+    else:
+        raise AssertionError('cycle compiled')
+
+
+def node(model, node_type, *inputs):
+    """A pure node with its inputs 0, 1, ... fed by the first output of `inputs`."""
+    record = model.add_node(node_type)
+    for index, source in enumerate(inputs):
+        model.connect(source.id, source.n_inputs, record.id, index)
+    return record
+
+
+def test_precedence_matches_optimizer_off():
+    # Start -> Input, then print str(...) of expressions nesting Not, Add
+    # and Multiply under Equals; the answer must not depend on optimize
+    model = GraphModel()
+    start = model.add_node('Start')
+    ask = model.add_node('Input')
+    model.connect(start.id, 0, ask.id, 0)
+    answer = ask.ports[3]
+    model.connect(text(model, '').id, 1, ask.id, 1)
+
+    def read(node_type):
+        cast = model.add_node(node_type)
+        model.connect(ask.id, answer.index, cast.id, 0)
+        return cast
+
+    checks = [
+        node(model, 'Equals', node(model, 'Not', read('Cast to Bool')), text(model, 'x')),
+        node(model, 'Equals', node(model, 'Multiply', read('Cast to Integer'), read('Cast to Integer')), text(model, '1')),
+        node(model, 'Equals', node(model, 'Add', read('Cast to String'), text(model, 'b')), text(model, '1b')),
+        node(model, 'Not', node(model, 'Equals', read('Cast to String'), text(model, '1'))),
+    ]
+    previous, port = ask, 2
+    for check in checks:
+        show = model.add_node('Print')
+        model.connect(previous.id, port, show.id, 0)
+        model.connect(node(model, 'Cast to String', check).id, 1, show.id, 1)
+        previous, port = show, 2
+
+    outputs = [run(Compiler(optimize=flag).compile(model), '1\n') for flag in (True, False)]
+    assert outputs[0] == outputs[1]
+    assert outputs[0].split()[-4:] == ['False', 'False', 'True', 'False']
+
+
+if __name__ == '__main__':
+    test_compiled_program_runs()
+    test_recompile_reuses_fragments()
+    test_exec_cycle_is_an_error()
+    test_precedence_matches_optimizer_off()
+    print('OK')
@@ -0,0 +1,89 @@
+import sys
+
+from PySide6.QtCore import QPointF, QRectF, Qt
+from PySide6.QtGui import QImage, QPainter
+from PySide6.QtWidgets import QApplication
+
+import widgets_elements.vispyWindowLib as vwl
+from widgets_elements.vispyNodeLib import EdgeUpdateQueue
+from types_classes.graph_model import GraphModel
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def build_scene(n):
+    # a row of n + 1 nodes 200 apart, each connected to the next
+    model = GraphModel()
+    previous = model.add_node('Text Value')
+    for i in range(n):
+        cast = model.add_node('Cast to String', x=200 * (i + 1))
+        model.connect(previous.id, 1, cast.id, 0)
+        previous = cast
+    scene = vwl.GraphicsScene()
+    scene.set_edge_layer_enabled(True)
+    scene.set_model(model)
+    return scene
+
+
+def middle(edge):
+    return edge.compute_geometry()[0].pointAtPercent(0.5)
+
+
+def test_hit_and_rect_queries():
+    scene = build_scene(30)
+    layer = scene.edge_layer
+    edges = layer.edges()
+    assert len(edges) == 30
+    for edge in edges:
+        assert layer.edge_at(middle(edge)) is edge and layer.contains(middle(edge))
+    assert layer.edge_at(QPointF(-5000, -5000)) is None
+
+    edge = edges[10]
+    near = layer.edges_in_rect(QRectF(middle(edge), middle(edge)).adjusted(-1, -1, 1, 1))
+    assert edge in near and len(near) < 3
+
+    # moving an endpoint moves the edge's cells with it
+    node = edge.end.parentItem()
+    old = middle(edge)
+    node.setPos(node.pos() + QPointF(0, 3000))
+    EdgeUpdateQueue.flush_scene(scene)
+    assert layer.edge_at(middle(edge)) is edge and layer.edge_at(old) is not edge
+
+    layer.release(edge)
+    assert layer.edge_at(middle(edge)) is None and edge not in layer.edges_in_rect(layer.boundingRect())
+
+
+def test_release_refits_bounds_rarely():
+    scene = build_scene(64)
+    layer = scene.edge_layer
+    edges = layer.edges()
+    full = layer.boundingRect()
+    refits = []
+    recompute_bounds = layer._recompute_bounds
+    layer._recompute_bounds = lambda: refits.append(len(layer.edges())) or recompute_bounds()
+    for number, edge in enumerate(edges, 1):
+        layer.release(edge)
+        assert all(layer.boundingRect().contains(middle(other)) for other in edges[number:])
+        if number == 1:
+            assert layer.boundingRect() == full
+    print('bounds refitted with', refits, 'edges left')
+    assert refits == [31, 15, 7, 3, 1, 0]
+    assert layer.boundingRect().isEmpty()
+
+
+def test_paint_exposed_region():
+    scene = build_scene(10)
+    edge = scene.edge_layer.edges()[5]
+    point = middle(edge)
+    image = QImage(40, 40, QImage.Format_ARGB32)
+    image.fill(Qt.transparent)
+    painter = QPainter(image)
+    scene.render(painter, QRectF(0, 0, 40, 40), QRectF(point.x() - 20, point.y() - 20, 40, 40))
+    painter.end()
+    assert image.pixelColor(20, 20) == edge.pen().color()
+
+if __name__ == '__main__':
+    test_hit_and_rect_queries()
+    test_release_refits_bounds_rarely()
+    test_paint_exposed_region()
+    print('OK')
@@ -0,0 +1,45 @@
+import sys
+
+from PySide6.QtCore import QPointF
+from PySide6.QtWidgets import QApplication
+
+import widgets_elements.vispyWindowLib as vwl
+from widgets_elements.vispyNodeLib import Edge, EdgeUpdateQueue, Node
+from types_classes.graph_model import GraphModel
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def test_shared_edge_recomputed_once_per_flush():
+    # a -> b, both dragged together
+    model = GraphModel()
+    a = model.add_node('Text Value')
+    b = model.add_node('Cast to String', x=300)
+    model.connect(a.id, 1, b.id, 0)
+    scene = vwl.GraphicsScene()
+    scene.set_model(model)
+    nodes = {item.record.id: item for item in scene.items() if isinstance(item, Node)}
+    edge, = [item for item in scene.items() if isinstance(item, Edge)]
+
+    computed = []
+    compute_geometry = Edge.compute_geometry
+    Edge.compute_geometry = lambda self: computed.append(self) or compute_geometry(self)
+    try:
+        for step in range(1, 4):
+            for record in (a, b):
+                nodes[record.id].setPos(nodes[record.id].pos() + QPointF(40, 20))
+            # nothing is recomputed until the queue flushes
+            assert computed == [edge] * (step - 1)
+            EdgeUpdateQueue.flush_scene(scene)
+            assert computed == [edge] * step
+        EdgeUpdateQueue.flush_scene(scene)
+        assert len(computed) == 3
+    finally:
+        Edge.compute_geometry = compute_geometry
+    start = nodes[a.id].sockets[1].scenePos()
+    assert edge.path().elementAt(0).x == start.x() and edge.path().elementAt(0).y == start.y()
+
+
+if __name__ == '__main__':
+    test_shared_edge_recomputed_once_per_flush()
+    print('OK')
@@ -0,0 +1,133 @@
+import io
+import json
+import logging
+import os
+import tempfile
+
+import savesystem
+from types_classes.graph_model import GraphModel
+
+
+def build_model():
+    model = GraphModel()
+    start = model.add_node('Start', x=-200, y=0)
+    text = model.add_node('Text Value', title='greeting', x=0, y=0)
+    text.ports[0].value = 'hello'
+    printer = model.add_node('Print', x=200, y=0)
+    model.connect(start.id, 0, printer.id, 0, 'Exec')
+    model.connect(text.id, 1, printer.id, 1, 'String')
+    return model, text, printer
+
+
+def test_round_trip():
+    model, text, printer = build_model()
+    data = model.to_data()
+    print('saved nodes:', len(data['nodes']), 'edges:', len(data['edges']))
+
+    loaded = GraphModel.from_data(json.loads(json.dumps(data)))
+    assert loaded.to_data() == data
+
+    saved_text = next(n for n in data['nodes'] if n['title'] == 'greeting')
+    assert saved_text['inputs'][0]['value'] == 'hello'
+    # direction comes from the records, not from socket positions
+    saved_print = next(n for n in data['nodes'] if n['type'] == 'Print')
+    assert [p['index'] for p in saved_print['inputs']] == [0, 1]
+    assert [p['index'] for p in saved_print['outputs']] == [2]
+
+
+def test_streamed_save():
+    model, text, printer = build_model()
+    for extra in range(2 * savesystem._BATCH):
+        model.add_node('Text Value', x=extra, y=0)
+    f = io.StringIO()
+    savesystem.write_model(model, f)
+    assert '\n' not in f.getvalue()
+    assert json.loads(f.getvalue()) == model.to_data()
+
+
+def test_save_file_mode():
+    model, text, printer = build_model()
+    umask = os.umask
+    calls = []
+    # saving must not touch the process umask, other threads create files too
+    os.umask = lambda mask: calls.append(mask) or umask(mask)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'graph.vp')
+            savesystem.save_model_to_file(model, path)
+            if os.name == 'posix':
+                assert os.stat(path).st_mode & 0o777 == savesystem._NEW_FILE_MODE
+                # an existing file keeps its permissions
+                os.chmod(path, 0o600)
+                savesystem.save_model_to_file(model, path)
+                assert os.stat(path).st_mode & 0o777 == 0o600
+    finally:
+        os.umask = umask
+    assert calls == []
+
+
+def test_unconnectable_edges_are_reported():
+    # edges the editor once allowed: Start's Exec into an Any input, and output to output
+    model, text, printer = build_model()
+    cast = model.add_node('Cast to String').uid
+    start = next(r.uid for r in model.nodes.values() if r.node_type == 'Start')
+    data = model.to_data()
+    data['edges'] += [
+        {'start_node_id': start, 'start_socket_index': 0, 'end_node_id': cast, 'end_socket_index': 0},
+        {'start_node_id': text.uid, 'start_socket_index': 1, 'end_node_id': cast, 'end_socket_index': 1},
+    ]
+
+    class Records(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.messages = []
+
+        def emit(self, record):
+            self.messages.append(record.getMessage())
+
+    handler = Records()
+    logging.getLogger().addHandler(handler)
+    try:
+        loaded = GraphModel.from_data(data)
+    finally:
+        logging.getLogger().removeHandler(handler)
+    assert len(loaded.connections) == 2 and loaded.dropped_edges == 2
+    assert len(handler.messages) == 2 and all(cast in m for m in handler.messages)
+    assert start in handler.messages[0] and text.uid in handler.messages[1]
+
+
+def test_remove_node_drops_connections():
+    model, text, printer = build_model()
+    model.remove_node(printer.id)
+    assert printer.id not in model.nodes
+    assert not model.connections
+    assert model.node_connections(text.id) == []
+
+
+def test_port_index():
+    model, text, printer = build_model()
+    assert [c.end_node for c in model.port_connections(text.id, 1)] == [printer.id]
+    assert model.is_connected(printer.id, 1)
+    model.disconnect_many([c.id for c in model.node_connections(printer.id)])
+    assert not model.is_connected(printer.id, 1)
+    assert model.port_connections(text.id, 1) == []
+
+
+def test_nodes_in_rect():
+    model, text, printer = build_model()
+    found = {r.id for r in model.nodes_in_rect(-10, -10, 100, 100)}
+    assert text.id in found and printer.id not in found
+    model.move_node(printer.id, 50, 50)
+    found = {r.id for r in model.nodes_in_rect(-10, -10, 100, 100)}
+    assert printer.id in found
+
+
+if __name__ == '__main__':
+    test_round_trip()
+    test_streamed_save()
+    test_save_file_mode()
+    test_unconnectable_edges_are_reported()
+    test_remove_node_drops_connections()
+    test_port_index()
+    test_nodes_in_rect()
+    print('OK')
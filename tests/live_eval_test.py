@@ -0,0 +1,65 @@
+from evaluator import LiveEvaluator, EvalError, UNAVAILABLE
+from types_classes.graph_model import GraphModel
+
+
+def chain(model, source, length):
+    # source -> Cast to Integer -> (+ 1) -> (+ 1) ...
+    cast = model.add_node('Cast to Integer')
+    model.connect(source.id, 1, cast.id, 0)
+    one = model.add_node('Cast to Integer')
+    text = model.add_node('Text Value')
+    model.set_value(text.ports[0], '1')
+    model.connect(text.id, 1, one.id, 0)
+    nodes = [cast]
+    for _ in range(length):
+        add = model.add_node('Add')
+        model.connect(nodes[-1].id, 1 if len(nodes) == 1 else 2, add.id, 0)
+        model.connect(one.id, 1, add.id, 1)
+        nodes.append(add)
+    return nodes
+
+
+def test_only_the_cone_is_evaluated():
+    model = GraphModel()
+    a = model.add_node('Text Value')
+    b = model.add_node('Text Value')
+    model.set_value(a.ports[0], '10')
+    model.set_value(b.ports[0], '20')
+    left = chain(model, a, 100)
+    right = chain(model, b, 100)
+    evaluator = LiveEvaluator(model)
+    assert evaluator.value(left[-1].id, 2) == 110
+    assert evaluator.value(right[-1].id, 2) == 120
+
+    evaluator.stats['evaluated'] = 0
+    model.set_value(a.ports[0], '0')
+    assert not evaluator.is_dirty(right[-1].id)
+    # lazy: nothing runs until a value is asked for
+    assert evaluator.stats['evaluated'] == 0
+    assert evaluator.value(left[50].id, 2) == 50
+    assert evaluator.stats['evaluated'] == 52
+    assert evaluator.value(left[-1].id, 2) == 100
+    assert evaluator.stats['evaluated'] == 1 + len(left)
+    assert evaluator.value(right[-1].id, 2) == 120
+    assert evaluator.stats['evaluated'] == 1 + len(left)
+
+
+def test_errors_and_runtime_values():
+    model = GraphModel()
+    text = model.add_node('Text Value')
+    cast = model.add_node('Cast to Integer')
+    model.connect(text.id, 1, cast.id, 0)
+    model.set_value(text.ports[0], 'x')
+    evaluator = LiveEvaluator(model)
+    assert isinstance(evaluator.value(cast.id, 1), EvalError)
+
+    variable = model.add_node('Get Variable', title='Get i')
+    model.disconnect(next(iter(model.connections)))
+    model.connect(variable.id, 1, cast.id, 0)
+    assert evaluator.value(cast.id, 1) is UNAVAILABLE
+
+
+if __name__ == '__main__':
+    test_only_the_cone_is_evaluated()
+    test_errors_and_runtime_values()
+    print('OK')
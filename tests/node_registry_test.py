@@ -0,0 +1,36 @@
+import types_classes.node_library as nl
+from types_classes.graph_model import GraphModel
+from types_classes.node_registry import node_spec, node_type, node_types, register
+
+
+def test_every_maker_is_registered():
+    makers = [name for name in dir(nl) if name.startswith('make_') and name.endswith('_node')]
+    assert len(node_types()) == len(makers)
+    entry = node_type('Cast to Integer')
+    assert entry.factory is nl.make_cast_to_Int_node
+    assert entry.label == 'Cast To Int Node' and entry.category == 'Data Manipulation'
+    assert node_spec('Cast to Integer') is entry.spec
+    assert node_spec('No Such Node') is None
+    # registering a known type again keeps the first factory
+    assert register(nl.make_add_node) is node_type('Add')
+
+
+def test_load_does_not_call_factories():
+    model = GraphModel()
+    for _ in range(100):
+        model.add_node('Add')
+    data = model.to_data()
+    calls = []
+    original = nl.make_add_node
+    nl.make_add_node = lambda: calls.append(1) or original()
+    try:
+        assert len(GraphModel.from_data(data)) == 100
+    finally:
+        nl.make_add_node = original
+    assert not calls
+
+
+if __name__ == '__main__':
+    test_every_maker_is_registered()
+    test_load_does_not_call_factories()
+    print('OK')
@@ -0,0 +1,87 @@
+import sys
+
+from PySide6.QtCore import QPointF
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import QApplication, QGraphicsItem
+
+import widgets_elements.vispyWindowLib as vwl
+from widgets_elements.vispyNodeLib import Node
+from widgets_elements.vispyTheme import CATEGORY_COLORS, theme
+from types_classes.graph_model import GraphModel
+from types_classes.node_registry import node_spec
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def scene_with(*node_types):
+    model = GraphModel()
+    for i, node_type in enumerate(node_types):
+        model.add_node(node_type, x=200 * i)
+    scene = vwl.GraphicsScene()
+    scene.set_model(model)
+    return scene
+
+
+def nodes(scene):
+    return [item for item in scene.items() if isinstance(item, Node)]
+
+
+def test_node_caching_is_per_scene():
+    cached, plain = scene_with('Print'), scene_with('Print')
+    cached.set_node_caching(True)
+    assert all(n.cacheMode() == QGraphicsItem.DeviceCoordinateCache for n in nodes(cached))
+    assert all(s.cacheMode() == QGraphicsItem.DeviceCoordinateCache for n in nodes(cached) for s in n.sockets)
+    assert all(n.cacheMode() == QGraphicsItem.NoCache for n in nodes(plain))
+
+    # nodes added later take their scene's mode
+    for scene in (cached, plain):
+        scene.addItem(Node(node_spec('Text Value')))
+    assert len(nodes(cached)) == len(nodes(plain)) == 2
+    assert all(n.cacheMode() == QGraphicsItem.DeviceCoordinateCache for n in nodes(cached))
+    assert all(n.cacheMode() == QGraphicsItem.NoCache for n in nodes(plain))
+
+    cached.set_node_caching(False)
+    assert all(n.cacheMode() == QGraphicsItem.NoCache for n in nodes(cached))
+
+
+def test_theme_changes_reach_live_nodes():
+    scene = scene_with('Print')
+    scene.set_node_caching(True)
+    view = vwl.GraphicsView(scene)
+    view.resize(400, 300)
+    node, = nodes(scene)
+    node.title = 'a title far too long to fit in the header of a node'
+    header = QPointF(node.width / 2, 3)
+
+    def header_color():
+        image = view.grab().toImage()
+        return image.pixelColor(view.mapFromScene(node.mapToScene(header)))
+
+    th = theme()
+    category = node.data.category
+    color, size = CATEGORY_COLORS.get(category), th.font.pointSizeF()
+    try:
+        assert header_color() == th.category_style(category).color
+        th.set_category_color(category, QColor(255, 0, 0))
+        # the cached pixmap of the node was painted with the old color
+        assert header_color() == QColor(255, 0, 0)
+
+        title = node._title_text
+        label = node.sockets[1]._label_rect
+        th.font.setPointSizeF(size * 2)
+        th.invalidate()
+        view.grab()
+        assert len(node._title_text) < len(title) and node.sockets[1]._label_rect.width() > label.width()
+    finally:
+        if color is None:
+            CATEGORY_COLORS.pop(category, None)
+        else:
+            CATEGORY_COLORS[category] = color
+        th.font.setPointSizeF(size)
+        th.invalidate()
+
+
+if __name__ == '__main__':
+    test_node_caching_is_per_scene()
+    test_theme_changes_reach_live_nodes()
+    print('OK')
@@ -0,0 +1,131 @@
+import subprocess
+import sys
+
+from compiler import Compiler
+from optimizer import optimize
+from types_classes.graph_model import GraphModel
+
+
+def text(model, value):
+    record = model.add_node('Text Value')
+    record.ports[0].value = value
+    return record
+
+
+def number(model, value):
+    cast = model.add_node('Cast to Integer')
+    model.connect(text(model, value).id, 1, cast.id, 0)
+    return cast
+
+
+def build_model(limit='20000'):
+    # i = 0; while float(limit) > i: i = i + int('2') * int('3') - int('5'); print(i)
+    model = GraphModel()
+    start = model.add_node('Start')
+    init = model.add_node('Set Variable', title='Set i')
+    model.connect(start.id, 0, init.id, 0)
+    model.connect(number(model, '0').id, 1, init.id, 2)
+
+    loop = model.add_node('While')
+    model.connect(init.id, 3, loop.id, 0)
+    bound = model.add_node('Cast to Float')
+    model.connect(text(model, limit).id, 1, bound.id, 0)
+    compare = model.add_node('Greater Than')
+    model.connect(bound.id, 1, compare.id, 0)
+    model.connect(model.add_node('Get Variable', title='Get i').id, 1, compare.id, 1)
+    model.connect(compare.id, 2, loop.id, 1)
+
+    step = model.add_node('Multiply')
+    model.connect(number(model, '2').id, 1, step.id, 0)
+    model.connect(number(model, '3').id, 1, step.id, 1)
+    step = (step, model.add_node('Subtract'))
+    model.connect(step[0].id, 2, step[1].id, 0)
+    model.connect(number(model, '5').id, 1, step[1].id, 1)
+    increment = model.add_node('Add')
+    model.connect(model.add_node('Get Variable', title='Get i').id, 1, increment.id, 0)
+    model.connect(step[1].id, 2, increment.id, 1)
+    update = model.add_node('Set Variable', title='Set i')
+    model.connect(loop.id, 2, update.id, 0)
+    model.connect(increment.id, 2, update.id, 2)
+
+    show = model.add_node('Print')
+    model.connect(loop.id, 3, show.id, 0)
+    model.connect(model.add_node('Get Variable', title='Get i').id, 1, show.id, 1)
+
+    # nothing consumes this
+    orphan = model.add_node('Add')
+    model.connect(number(model, '7').id, 1, orphan.id, 0)
+    return model, orphan
+
+
+def run(source):
+    result = subprocess.run([sys.executable, '-c', source], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_fold_merge_and_dead():
+    model, orphan = build_model()
+    plan = optimize(model)
+    print(plan.report)
+    folded = set(plan.report.folded.values())
+    assert 1 in folded and 20000.0 in folded
+    # three 'Get i' nodes compute the same thing
+    assert len(plan.report.merged) == 2
+    assert orphan.uid in plan.report.dead and orphan.id not in plan.live
+
+    optimized = Compiler().compile(model)
+    plain = Compiler(optimize=False).compile(model)
+    print(optimized)
+    assert "int('" not in optimized and len(optimized) < len(plain)
+    assert run(optimized) == run(plain) == '20000\n'
+
+
+def test_runtime_errors_are_not_folded():
+    model = GraphModel()
+    start = model.add_node('Start')
+    show = model.add_node('Print')
+    divide = model.add_node('Divide')
+    model.connect(start.id, 0, show.id, 0)
+    model.connect(number(model, '1').id, 1, divide.id, 0)
+    model.connect(number(model, '0').id, 1, divide.id, 1)
+    model.connect(divide.id, 2, show.id, 1)
+    assert divide.id not in optimize(model).constants
+    assert '(1 / 0)' in Compiler().compile(model)
+
+
+def test_merged_nodes_are_computed_once():
+    # x = input(); print(str(float(x) * float(x) + float(x) * float(x))), with
+    # each cast and multiply a node of its own; input() keeps them from folding
+    model = GraphModel()
+    start = model.add_node('Start')
+    ask = model.add_node('Input')
+    model.connect(start.id, 0, ask.id, 0)
+    model.connect(text(model, '').id, 1, ask.id, 1)
+    total = model.add_node('Add')
+    for index in range(2):
+        square = model.add_node('Multiply')
+        for side in range(2):
+            cast = model.add_node('Cast to Float')
+            model.connect(ask.id, 3, cast.id, 0)
+            model.connect(cast.id, 1, square.id, side)
+        model.connect(square.id, 2, total.id, index)
+    show = model.add_node('Print')
+    model.connect(ask.id, 2, show.id, 0)
+    string = model.add_node('Cast to String')
+    model.connect(total.id, 2, string.id, 0)
+    model.connect(string.id, 1, show.id, 1)
+
+    source = Compiler().compile(model)
+    print(source)
+    assert source.count('float(') == 1 and source.count(' * ') == 1
+    result = subprocess.run([sys.executable, '-c', source], input='1.5\n', capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-1] == '4.5'
+
+
+if __name__ == '__main__':
+    test_fold_merge_and_dead()
+    test_runtime_errors_are_not_folded()
+    test_merged_nodes_are_computed_once()
+    print('OK')
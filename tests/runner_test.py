@@ -0,0 +1,74 @@
+import time
+
+from PySide6.QtCore import QCoreApplication
+
+from runner import WorkerPool, _StreamReader, MAGIC
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+def wait_for(run, seconds=20):
+    deadline = time.monotonic() + seconds
+    while run.running() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    assert not run.running(), 'run did not finish'
+
+
+def collect(run):
+    out, err = [], []
+    run.stdout.connect(out.append)
+    run.stderr.connect(err.append)
+    return out, err
+
+
+def test_marker_split_across_chunks():
+    reader = _StreamReader()
+    marker = (MAGIC + 'done 3\n').encode()
+    assert reader.feed(b'hi' + marker[:4]) == ('hi', None)
+    assert reader.feed(marker[4:]) == ('', 3)
+
+
+def test_output_input_and_reuse():
+    pool = WorkerPool(size=1)
+    pool.warm()
+    run = pool.run('name = input()\nprint("hello", name)\nimport sys\nprint("oops", file=sys.stderr)\n')
+    out, err = collect(run)
+    run.write_input('vispy\n')
+    wait_for(run)
+    assert run.status == 'ok'
+    assert ''.join(out) == 'hello vispy\n'
+    assert ''.join(err) == 'oops\n'
+    worker = run.worker
+
+    # the finished worker goes back to the pool and runs the next program
+    source = 'raise SystemExit(4)'
+    run = pool.run(source, code=compile(source, '<vispy>', 'exec'))
+    wait_for(run)
+    assert run.worker is worker
+    assert (run.status, run.exit_code) == ('error', 4)
+    pool.shutdown()
+
+
+def test_timeout_and_cancel():
+    pool = WorkerPool(size=1)
+    run = pool.run('while True:\n    pass\n', timeout=0.3)
+    wait_for(run)
+    assert run.status == 'timeout'
+
+    run = pool.run('import time\ntime.sleep(30)\n')
+    run.cancel()
+    assert run.status == 'cancelled'
+    # the pool replaced the killed worker
+    run = pool.run('print(1 + 1)')
+    out, err = collect(run)
+    wait_for(run)
+    assert run.status == 'ok' and ''.join(out) == '2\n'
+    pool.shutdown()
+
+
+if __name__ == '__main__':
+    test_marker_split_across_chunks()
+    test_output_input_and_reuse()
+    test_timeout_and_cancel()
+    print('OK')
@@ -0,0 +1,40 @@
+import sys
+
+from PySide6.QtWidgets import QApplication, QGraphicsScene
+
+import widgets_elements.vispyWindowLib as vwl
+from widgets_elements.vispyNodeLib import Edge
+from types_classes.graph_model import GraphModel
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def build_model(n):
+    model = GraphModel()
+    previous = model.add_node('Text Value')
+    for i in range(n):
+        cast = model.add_node('Cast to String', x=200 * (i + 1))
+        model.connect(previous.id, 1, cast.id, 0)
+        previous = cast
+    return model
+
+
+def test_set_model_defers_edge_paths():
+    scene = vwl.GraphicsScene()
+    view = vwl.GraphicsView(scene)
+    scene.set_model(build_model(5))
+    with scene.bulk_update():
+        assert scene.itemIndexMethod() == QGraphicsScene.NoIndex and not view.updatesEnabled()
+        scene.set_model(build_model(50))
+        assert scene.populating
+        edges = [item for item in scene.items() if isinstance(item, Edge)]
+        assert len(edges) == 50 and all(edge.path().isEmpty() for edge in edges)
+    assert scene.itemIndexMethod() == QGraphicsScene.BspTreeIndex and view.updatesEnabled()
+    assert not any(edge.path().isEmpty() for edge in edges)
+    # the old items went with the old model
+    assert len([item for item in scene.items() if isinstance(item, Edge)]) == 50
+
+
+if __name__ == '__main__':
+    test_set_model_defers_edge_paths()
+    print('OK')
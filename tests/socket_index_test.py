@@ -0,0 +1,62 @@
+import sys
+
+from PySide6.QtCore import QPointF
+from PySide6.QtWidgets import QApplication
+
+import widgets_elements.vispyWindowLib as vwl
+from widgets_elements.vispyNodeLib import Node
+from widgets_elements.vispySocketIndex import SocketIndex
+from types_classes.graph_model import GraphModel
+
+app = QApplication.instance() or QApplication(sys.argv)
+
+
+def build_scene():
+    # a Text Value whose string output is dragged toward Print, Not and Equals
+    model = GraphModel()
+    model.add_node('Text Value')
+    model.add_node('Print', x=300)
+    model.add_node('Not', x=300, y=300)
+    model.add_node('Equals', x=600)
+    scene = vwl.GraphicsScene()
+    scene.set_model(model)
+    nodes = {item.record.node_type: item for item in scene.items() if isinstance(item, Node)}
+    return scene, nodes
+
+
+def socket(node, name, is_input=True):
+    return next(s for s in node.sockets if s.port.name == name and s.port.is_input == is_input)
+
+
+def test_nearest_compatible_socket():
+    scene, nodes = build_scene()
+    dragged = socket(nodes['Text Value'], 'string', False)
+    text = socket(nodes['Print'], 'text')
+    a, b = socket(nodes['Equals'], 'a'), socket(nodes['Equals'], 'b')
+    assert len(SocketIndex.for_scene(scene)) == 9
+
+    # the exec input under the cursor can't take a string; the text input just below can
+    assert dragged._find_snap_target(socket(nodes['Print'], '').scenePos()) is text
+    assert dragged._find_snap_target(a.scenePos() + QPointF(0, 8)) is a
+    assert dragged._find_snap_target(b.scenePos() - QPointF(0, 8)) is b
+    # outputs don't connect to outputs, and nothing is within reach here
+    assert dragged._find_snap_target(socket(nodes['Equals'], 'result', False).scenePos()) is None
+    assert dragged._find_snap_target(QPointF(1000, 1000)) is None
+
+    # no direct match: a socket reachable through a cast node
+    value = socket(nodes['Not'], 'value')
+    assert dragged._find_snap_target(value.scenePos()) is value
+    assert dragged.cast_to(value) == 'Cast to Bool'
+
+    # the index follows nodes that move or leave the scene
+    old = text.scenePos()
+    nodes['Print'].setPos(nodes['Print'].pos() + QPointF(0, 1000))
+    assert dragged._find_snap_target(old) is None
+    assert dragged._find_snap_target(text.scenePos()) is text
+    scene.removeItem(nodes['Equals'])
+    assert dragged._find_snap_target(a.scenePos()) is None
+
+
+if __name__ == '__main__':
+    test_nearest_compatible_socket()
+    print('OK')
@@ -0,0 +1,34 @@
+from types_classes.graph_model import GraphModel
+from types_classes.type_registry import TYPES, type_id, compatible, cast_node, compatible_ids, cast_ids
+from types_classes.vispyDataTypes import types
+
+
+def test_table():
+    assert [type_id(t) for t in TYPES] == list(range(len(TYPES)))
+    integer, string, any_, exec_ = (type_id(t) for t in (types.integer, types.string, types.any, types.exec))
+    assert compatible(integer, integer) and compatible(integer, any_) and compatible(any_, string)
+    assert not compatible(integer, string) and not compatible(exec_, any_)
+    assert cast_node(integer, string) == 'Cast to String'
+    assert cast_node(any_, string) is None and cast_node(exec_, string) is None
+    assert integer in cast_ids(string, True) and string in cast_ids(integer, False)
+    assert type_id(types.text) not in compatible_ids(type_id(types.text))
+
+
+def test_load_drops_incompatible_edges():
+    model = GraphModel()
+    text = model.add_node('Text Value')
+    add = model.add_node('Add')
+    cast = model.add_node('Cast to Float')
+    model.connect(text.id, 1, add.id, 0)
+    model.connect(text.id, 1, cast.id, 0)
+    model.connect(cast.id, 1, add.id, 1)
+    loaded = GraphModel.from_data(model.to_data())
+    # String -> Float needs a cast; String -> Any and Float -> Float don't
+    assert len(loaded.connections) == 2
+    assert not loaded.is_connected(add.id, 0)
+
+
+if __name__ == '__main__':
+    test_table()
+    test_load_drops_incompatible_edges()
+    print('OK')
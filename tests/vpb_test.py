@@ -0,0 +1,130 @@
+import io
+import json
+import os
+import tempfile
+
+import savesystem
+import vpb
+from types_classes.graph_model import GraphModel
+
+
+def build_model():
+    model = GraphModel()
+    start = model.add_node('Start', x=-200, y=0)
+    text = model.add_node('Text Value', title='grüße', x=0, y=0)
+    text.ports[0].value = 'hello'
+    printer = model.add_node('Print', x=200, y=0.5)
+    model.connect(start.id, 0, printer.id, 0, 'Exec')
+    model.connect(text.id, 1, printer.id, 1, 'String')
+    return model
+
+
+def build_grid(columns, rows, spacing=1000):
+    """Text Value -> Print pairs on a grid, each Print also fed by the pair to its left."""
+    model = GraphModel()
+    texts = {}
+    for i in range(columns):
+        for j in range(rows):
+            text = texts[i, j] = model.add_node('Text Value', x=i * spacing, y=j * spacing)
+            text.ports[0].value = '%d,%d' % (i, j)
+            printer = model.add_node('Print', x=i * spacing + 300, y=j * spacing)
+            model.connect(text.id, 1, printer.id, 1)
+            if i:
+                model.connect(texts[i - 1, j].id, 1, printer.id, 1)
+    return model
+
+
+def canonical(data):
+    # files list nodes tile by tile, so compare regardless of order
+    key = lambda item: json.dumps(item, sort_keys=True)
+    return sorted(data['nodes'], key=key), sorted(data['edges'], key=key)
+
+
+def to_bytes(model, tile_size=vpb.TILE_SIZE):
+    f = io.BytesIO()
+    vpb.write_model(model, f, tile_size)
+    return f.getvalue()
+
+
+def test_round_trip():
+    model = build_model()
+    graph = vpb.BinaryGraph(to_bytes(model))
+    assert graph.n_tiles == 2 and graph.n_cross == 1
+    assert canonical(graph.to_data()) == canonical(model.to_data())
+    assert canonical(graph.to_model().to_data()) == canonical(model.to_data())
+    # each distinct string is stored once
+    strings = [graph.string(sid) for sid in range(graph.n_strings)]
+    assert len(set(strings)) == len(strings)
+
+
+def test_unknown_node_type():
+    data = build_model().to_data()
+    data['nodes'][0]['type'] = 'Plugin Node'
+    f = io.BytesIO()
+    vpb.write_data(data, f)
+    loaded = vpb.BinaryGraph(f.getvalue()).to_model()
+    assert canonical(loaded.to_data()) == canonical(GraphModel.from_data(json.loads(json.dumps(data))).to_data())
+
+
+def test_partial_loading():
+    model = build_grid(8, 8)
+    graph = vpb.BinaryGraph(to_bytes(model, tile_size=2000))
+    assert graph.n_tiles == 16
+    partial = GraphModel()
+    loader = vpb.TileLoader(graph, partial)
+
+    found = list(partial.nodes_in_rect(0, 0, 1500, 1500))
+    assert len(found) == 8 and len(loader) == 15
+    # 4 pairs and 2 links between columns
+    assert len(partial.connections) == 6
+    # the links from the first tile connect once the tile to its right loads
+    list(partial.nodes_in_rect(2000, 0, 3500, 1500))
+    assert len(partial.connections) == 6 + 6 + 2
+
+    deleted = next(r for r in partial.nodes.values() if r.x == 3000 and r.y == 0 and r.node_type == 'Text Value')
+    partial.remove_node(deleted.id)
+    partial.load_all()
+    assert partial.loader is None and len(loader) == 0
+    assert len(partial) == len(model) - 1
+    # the deleted node's edge to the next column isn't restored
+    assert len(partial.connections) == len(model.connections) - 2
+
+
+def test_save_and_load_file():
+    model = build_model()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'graph.vpb')
+        savesystem.save_model_to_file(model, path)
+        with open(path, 'rb') as f:
+            assert f.read(4) == vpb.MAGIC
+        assert canonical(savesystem.load_model_from_file(path).to_data()) == canonical(model.to_data())
+
+        opened = vpb.open_model(path)
+        assert len(opened) == 0 and vpb.node_count(path) == 3
+        # saving a partially loaded model saves all of it
+        copy = os.path.join(directory, 'copy.vpb')
+        savesystem.save_model_to_file(opened, copy)
+        assert canonical(savesystem.load_model_from_file(copy).to_data()) == canonical(model.to_data())
+
+        text = os.path.join(directory, 'graph.vp')
+        vpb.convert(path, text)
+        assert canonical(savesystem.load_model_from_file(text).to_data()) == canonical(model.to_data())
+
+
+def test_rejects_other_files():
+    for raw in (b'', b'{"nodes": []}' * 10, vpb.MAGIC + b'\x01\x00' + bytes(100)):
+        try:
+            vpb.BinaryGraph(raw)
+        except vpb.VPBError:
+            pass
+        else:
+            raise AssertionError('accepted %r' % raw)
+
+
+if __name__ == '__main__':
+    test_round_trip()
+    test_unknown_node_type()
+    test_partial_loading()
+    test_save_and_load_file()
+    test_rejects_other_files()
+    print('OK')
@@ -0,0 +1,464 @@
+import logging
+import math
+import uuid
+
+from types_classes.node_registry import node_spec
+from types_classes.type_registry import names_compatible
+
+# Socket layout shared with widgets_elements.vispyNodeLib.Node, so port
+# positions can be computed without creating any Qt items.
+NODE_WIDTH = 160
+SOCKET_Y_OFFSET = 30
+SOCKET_SPACING = 20
+
+# initial value of ports whose sockets are edited in place, by shape
+DEFAULT_VALUES = {"TextInput": "", "EvalInput": "=="}
+
+
+def body_size(n_inputs, n_outputs):
+    """(width, height) of a node with that many input and output sockets."""
+    return NODE_WIDTH, max(80, SOCKET_Y_OFFSET + max(n_inputs, n_outputs) * SOCKET_SPACING + 10)
+
+
+class PortRecord:
+    """One socket of a node: its index (inputs first, then outputs), direction and value."""
+    __slots__ = ("node", "index", "name", "type_name", "shape", "is_input", "value")
+
+    def __init__(self, node, index, name, type_name, shape, is_input, value=None):
+        self.node = node
+        self.index = index
+        self.name = name
+        self.type_name = type_name
+        self.shape = shape
+        self.is_input = is_input
+        self.value = DEFAULT_VALUES.get(shape) if value is None else value
+
+
+class NodeRecord:
+    """One node: persistent uid, type, title, position and ports.
+
+    `id` is None until the record is added to a GraphModel.
+    """
+    __slots__ = ("id", "uid", "node_type", "title", "x", "y", "ports", "n_inputs")
+
+    def __init__(self, uid, node_type, title, x=0.0, y=0.0):
+        self.id = None
+        self.uid = uid
+        self.node_type = node_type
+        self.title = title
+        self.x = x
+        self.y = y
+        self.ports = []
+        self.n_inputs = 0
+
+    def add_port(self, name, type_name, shape, is_input, value=None):
+        port = PortRecord(self, len(self.ports), name, type_name, shape, is_input, value)
+        self.ports.append(port)
+        if is_input:
+            self.n_inputs += 1
+        return port
+
+    def inputs(self):
+        return self.ports[:self.n_inputs]
+
+    def outputs(self):
+        return self.ports[self.n_inputs:]
+
+
+def make_node_record(node_data, title=None, x=0.0, y=0.0):
+    """Build a (not yet added) NodeRecord with the ports of a NodeData."""
+    record = NodeRecord(node_data.id, node_data.node_type, node_data.node_type if title is None else title, x, y)
+    for name, t in node_data.inputs.items():
+        record.add_port(name, t.name, t.shape, True)
+    for name, t in node_data.outputs.items():
+        record.add_port(name, t.name, t.shape, False)
+    return record
+
+
+class ConnectionRecord:
+    """One connection between (start_node, start_port) and (end_node, end_port).
+
+    Like saved edges, start is the socket the connection was dragged from,
+    which may be either an input or an output.
+    """
+    __slots__ = ("id", "start_node", "start_port", "end_node", "end_port", "type_name")
+
+    def __init__(self, id, start_node, start_port, end_node, end_port, type_name):
+        self.id = id
+        self.start_node = start_node
+        self.start_port = start_port
+        self.end_node = end_node
+        self.end_port = end_port
+        self.type_name = type_name
+
+
+class GraphModel:
+    """Qt-free store of a graph's nodes, ports and connections.
+
+    This is the graph itself; Node, Socket and Edge items are views of
+    its records. Nodes and connections get small integer ids; the string
+    uid of a node is only kept for persistence. Nodes are also bucketed
+    into a coarse spatial grid so the ones inside a rectangle can be found
+    without scanning the whole graph.
+
+    Objects in `listeners` are told about edits: node_added(record),
+    node_moved(record), value_changed(port), connected(connection),
+    disconnected(connection), node_removed(record) and cleared(). Port
+    values edited through set_value() are reported; assigning
+    port.value directly is not. Loading the tiles of a chunked file isn't
+    an edit and is not reported.
+
+    A model opened from a chunked file may not hold the whole graph yet;
+    its `loader` then adds the nodes of a region when nodes_in_rect()
+    asks for it, and load_all() adds everything else. Code that needs the
+    whole graph (saving, compiling, evaluating) calls load_all() first.
+    """
+
+    cell_size = 1000.0
+
+    def __init__(self):
+        self.nodes = {}
+        self.connections = {}
+        self._next_node_id = 1
+        self._next_connection_id = 1
+        # node id -> set of connection ids touching it
+        self._node_connections = {}
+        # (node id, port index) -> set of connection ids at that port
+        self._port_connections = {}
+        # (cx, cy) -> set of node ids
+        self._cells = {}
+        self.listeners = []
+        # object adding the rest of a partially loaded file (vpb.TileLoader),
+        # or None once the model holds the whole graph
+        self.loader = None
+        # edges of the loaded file left out because they can't be connected,
+        # see drop_edge()
+        self.dropped_edges = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _key(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def clear(self):
+        if self.loader is not None:
+            self.loader.close()
+        self.nodes.clear()
+        self.connections.clear()
+        self._node_connections.clear()
+        self._port_connections.clear()
+        self._cells.clear()
+        for listener in self.listeners:
+            listener.cleared()
+
+    # nodes
+
+    def contains(self, record):
+        return record.id is not None and self.nodes.get(record.id) is record
+
+    def add_node(self, node_type, title=None, x=0.0, y=0.0, uid=None):
+        """Create a node of `node_type` with the ports its maker defines."""
+        spec = node_spec(node_type)
+        if spec is not None:
+            record = make_node_record(spec, title, x, y)
+            record.uid = uid or str(uuid.uuid4())
+        else:
+            record = NodeRecord(uid or str(uuid.uuid4()), node_type, node_type if title is None else title, x, y)
+        return self.adopt(record)
+
+    def adopt(self, record):
+        """Add a record built outside the model (e.g. by a new Node item) and give it an id."""
+        record.id = self._next_node_id
+        record.x = float(record.x)
+        record.y = float(record.y)
+        self._next_node_id += 1
+        self.nodes[record.id] = record
+        self._node_connections[record.id] = set()
+        self._cells.setdefault(self._key(record.x, record.y), set()).add(record.id)
+        for listener in self.listeners:
+            listener.node_added(record)
+        return record
+
+    def remove_node(self, node_id):
+        """Remove a node and every connection touching it."""
+        record = self.nodes.pop(node_id, None)
+        if record is None:
+            return None
+        self.disconnect_many(list(self._node_connections.pop(node_id, ())))
+        cell = self._cells.get(self._key(record.x, record.y))
+        if cell is not None:
+            cell.discard(node_id)
+            if not cell:
+                del self._cells[self._key(record.x, record.y)]
+        for listener in self.listeners:
+            listener.node_removed(record)
+        return record
+
+    def remove_nodes(self, node_ids):
+        """Remove several nodes and their connections; returns the removed records."""
+        removed = []
+        for node_id in node_ids:
+            record = self.remove_node(node_id)
+            if record is not None:
+                removed.append(record)
+        return removed
+
+    def move_node(self, node_id, x, y):
+        record = self.nodes[node_id]
+        if (record.x, record.y) == (x, y):
+            return
+        old_key = self._key(record.x, record.y)
+        record.x = float(x)
+        record.y = float(y)
+        for listener in self.listeners:
+            listener.node_moved(record)
+        new_key = self._key(record.x, record.y)
+        if new_key != old_key:
+            cell = self._cells.get(old_key)
+            if cell is not None:
+                cell.discard(node_id)
+                if not cell:
+                    del self._cells[old_key]
+            self._cells.setdefault(new_key, set()).add(node_id)
+
+    def load_all(self):
+        """Finish loading a partially loaded file, so the model holds the whole graph."""
+        if self.loader is not None:
+            self.loader.load_all()
+
+    def node_size(self, record):
+        return body_size(record.n_inputs, len(record.ports) - record.n_inputs)
+
+    def nodes_in_rect(self, left, top, right, bottom):
+        """Yield records of nodes whose body intersects the rectangle.
+
+        Nodes of a partially loaded file that may lie there are loaded first.
+        """
+        if self.loader is not None:
+            self.loader.load_rect(left, top, right, bottom)
+        # nodes are bucketed by their top-left corner, so widen the search by
+        # one cell up/left to catch nodes reaching into the rectangle
+        cx0, cy0 = self._key(left - self.cell_size, top - self.cell_size)
+        cx1, cy1 = self._key(right, bottom)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for node_id in self._cells.get((cx, cy), ()):
+                    record = self.nodes[node_id]
+                    w, h = self.node_size(record)
+                    if record.x <= right and record.x + w >= left and record.y <= bottom and record.y + h >= top:
+                        yield record
+
+    def port_position(self, record, port):
+        """Scene position of socket `port` (index into inputs then outputs) on a node."""
+        if port < record.n_inputs:
+            return record.x, record.y + SOCKET_Y_OFFSET + port * SOCKET_SPACING
+        return record.x + NODE_WIDTH, record.y + SOCKET_Y_OFFSET + (port - record.n_inputs) * SOCKET_SPACING
+
+    # connections
+
+    def connect(self, start_node, start_port, end_node, end_port, type_name=None):
+        record = ConnectionRecord(self._next_connection_id, start_node, start_port, end_node, end_port, type_name)
+        self._next_connection_id += 1
+        self.connections[record.id] = record
+        self._node_connections[start_node].add(record.id)
+        self._node_connections[end_node].add(record.id)
+        for key in ((start_node, start_port), (end_node, end_port)):
+            conns = self._port_connections.get(key)
+            if conns is None:
+                conns = self._port_connections[key] = set()
+            conns.add(record.id)
+        for listener in self.listeners:
+            listener.connected(record)
+        return record
+
+    def disconnect(self, connection_id):
+        record = self.connections.pop(connection_id, None)
+        if record is None:
+            return None
+        for node_id in (record.start_node, record.end_node):
+            conns = self._node_connections.get(node_id)
+            if conns is not None:
+                conns.discard(connection_id)
+        for key in ((record.start_node, record.start_port), (record.end_node, record.end_port)):
+            conns = self._port_connections.get(key)
+            if conns is not None:
+                conns.discard(connection_id)
+                if not conns:
+                    del self._port_connections[key]
+        for listener in self.listeners:
+            listener.disconnected(record)
+        return record
+
+    def disconnect_many(self, connection_ids):
+        """Remove several connections; each removal is constant time."""
+        return [record for record in map(self.disconnect, connection_ids) if record is not None]
+
+    def node_connections(self, node_id):
+        """Connection records touching a node."""
+        return [self.connections[cid] for cid in self._node_connections.get(node_id, ())]
+
+    def port_connections(self, node_id, port):
+        """Connection records at one port of a node."""
+        return [self.connections[cid] for cid in self._port_connections.get((node_id, port), ())]
+
+    def is_connected(self, node_id, port):
+        return (node_id, port) in self._port_connections
+
+    @staticmethod
+    def can_connect(a, b):
+        """True if port records `a` and `b` may be connected: one input, one output, compatible types."""
+        if a.is_input == b.is_input:
+            return False
+        if a.is_input:
+            a, b = b, a
+        return names_compatible(a.type_name, b.type_name)
+
+    def source(self, node_id, port):
+        """(node record, port record) of the output feeding input `port` of a node, or None."""
+        for cid in self._port_connections.get((node_id, port), ()):
+            conn = self.connections[cid]
+            if conn.start_node == node_id and conn.start_port == port:
+                other, index = conn.end_node, conn.end_port
+            else:
+                other, index = conn.start_node, conn.start_port
+            record = self.nodes[other]
+            if not record.ports[index].is_input:
+                return record, record.ports[index]
+        return None
+
+    def consumers(self, node_id):
+        """Ids of nodes with an input connected to an output of a node."""
+        record = self.nodes[node_id]
+        found = set()
+        for cid in self._node_connections.get(node_id, ()):
+            conn = self.connections[cid]
+            if conn.start_node == node_id and not record.ports[conn.start_port].is_input:
+                found.add(conn.end_node)
+            elif conn.end_node == node_id and not record.ports[conn.end_port].is_input:
+                found.add(conn.start_node)
+        found.discard(node_id)
+        return found
+
+    # values
+
+    def set_value(self, port, value):
+        """Change the value of an input port and tell the listeners."""
+        if value != port.value:
+            port.value = value
+            for listener in self.listeners:
+                listener.value_changed(port)
+
+    # persistence
+
+    def to_data(self):
+        """The saved-file dict for this graph (see savesystem for the format)."""
+        self.load_all()
+        return {
+            'nodes': [self.node_data(record) for record in self.nodes.values()],
+            'edges': [self.connection_data(conn) for conn in self.connections.values()],
+        }
+
+    @staticmethod
+    def node_data(record):
+        """The saved-file entry of one node."""
+        inputs = []
+        outputs = []
+        for port in record.ports:
+            info = {'name': port.name, 'index': port.index, 'type': port.type_name, 'shape': port.shape}
+            if port.is_input:
+                info['value'] = port.value
+                inputs.append(info)
+            else:
+                outputs.append(info)
+        return {
+            'id': record.uid,
+            'type': record.node_type,
+            'title': record.title,
+            'pos': [record.x, record.y],
+            'inputs': inputs,
+            'outputs': outputs
+        }
+
+    def connection_data(self, conn):
+        """The saved-file entry of one connection."""
+        return {
+            'start_node_id': self.nodes[conn.start_node].uid,
+            'start_socket_index': conn.start_port,
+            'end_node_id': self.nodes[conn.end_node].uid,
+            'end_socket_index': conn.end_port,
+            'type': conn.type_name
+        }
+
+    @classmethod
+    def from_data(cls, data):
+        """Build a model from a saved-file dict.
+
+        Nodes get their ports from the node type's maker; types no maker
+        knows keep the ports listed in the file. Saved input values are
+        restored, and edges to missing nodes or ports, or between ports
+        that can't be connected, are dropped (see drop_edge).
+        """
+        model = cls()
+        ids = {}
+        for entry in data.get('nodes', []):
+            record = model.adopt(cls.node_record(entry))
+            ids[record.uid] = record
+        for entry in data.get('edges', []):
+            model.connect_entry(entry, ids)
+        return model
+
+    def drop_edge(self, start_uid, start_port, end_uid, end_port, reason):
+        """Log an edge of a loaded file that is left out, and count it in `dropped_edges`.
+
+        Files written before connections were type checked can hold edges
+        the editor no longer makes (Exec into Any, output to output). They
+        are gone from the file once it is saved again, so they are never
+        dropped without a trace.
+        """
+        self.dropped_edges += 1
+        logging.warning('Dropped edge %s[%s] -> %s[%s] of the loaded file: %s',
+                        start_uid, start_port, end_uid, end_port, reason)
+
+    @staticmethod
+    def node_record(entry):
+        """A new (not yet added) NodeRecord for a saved-file node entry."""
+        node_type = entry.get('type')
+        pos = entry.get('pos') or [0, 0]
+        spec = node_spec(node_type)
+        if spec is not None:
+            record = make_node_record(spec, entry.get('title', node_type), pos[0], pos[1])
+        else:
+            record = NodeRecord(None, node_type, entry.get('title', node_type), pos[0], pos[1])
+            saved = [(info, True) for info in entry.get('inputs', [])]
+            saved += [(info, False) for info in entry.get('outputs', [])]
+            saved.sort(key=lambda item: item[0].get('index') or 0)
+            for info, is_input in saved:
+                record.add_port(info.get('name', ''), info.get('type'), info.get('shape'), is_input)
+        record.uid = entry.get('id') or str(uuid.uuid4())
+        for info in entry.get('inputs', []):
+            idx = info.get('index')
+            value = info.get('value')
+            if value is not None and idx is not None and 0 <= idx < record.n_inputs:
+                record.ports[idx].value = value
+        return record
+
+    def connect_entry(self, entry, ids):
+        """Connect a saved-file edge entry, `ids` mapping node uids to records.
+
+        Returns the new connection, or None when the edge is dropped (see from_data).
+        """
+        start = ids.get(entry.get('start_node_id'))
+        end = ids.get(entry.get('end_node_id'))
+        s_idx = entry.get('start_socket_index')
+        e_idx = entry.get('end_socket_index')
+        if start is None or end is None or s_idx is None or e_idx is None:
+            self.drop_edge(entry.get('start_node_id'), s_idx, entry.get('end_node_id'), e_idx, 'missing node or port')
+            return None
+        if not (0 <= s_idx < len(start.ports) and 0 <= e_idx < len(end.ports)):
+            self.drop_edge(start.uid, s_idx, end.uid, e_idx, 'no such port')
+            return None
+        if not self.can_connect(start.ports[s_idx], end.ports[e_idx]):
+            self.drop_edge(start.uid, s_idx, end.uid, e_idx, "ports can't be connected")
+            return None
+        return self.connect(start.id, s_idx, end.id, e_idx, entry.get('type'))
@@ -27,7 +27,7 @@ def make_add_node():
         outputs={
             "result": types.float
         },
-        python_template="{a} + {b}"
+        python_template="({a} + {b})"
     )
 
 def make_print_node():
@@ -281,7 +281,7 @@ def make_not_node():
         outputs={
             "result": types.boolean
         },
-        python_template="not {value}"
+        python_template="(not {value})"
     )
 
 def make_set_variable_node():
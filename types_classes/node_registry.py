@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from typing import Callable
+
+import types_classes.node_library as nl
+from types_classes.node_data import NodeData
+
+
+@dataclass(frozen=True)
+class NodeType:
+    """A registered node type: its factory and what it looks like."""
+    node_type: str
+    # returns a new NodeData for one node
+    factory: Callable[[], NodeData]
+    category: str
+    # text of the node's entry in the view's context menu
+    label: str
+    # NodeData from one call of the factory, shared; don't modify it
+    spec: NodeData
+
+
+# node_type -> NodeType, in menu order
+_TYPES = {}
+
+
+def _label(factory_name):
+    # make_cast_to_String_node -> "Cast To String Node"
+    words = factory_name[len('make_'):-len('_node')].split('_')
+    return ' '.join(word.capitalize() for word in words) + ' Node'
+
+
+def register(factory, label=None):
+    """Add the node type `factory` creates; returns its NodeType.
+
+    A node type that is already registered keeps its first factory.
+    """
+    spec = factory()
+    entry = _TYPES.get(spec.node_type)
+    if entry is None:
+        entry = NodeType(spec.node_type, factory, spec.category, label or _label(factory.__name__), spec)
+        _TYPES[spec.node_type] = entry
+    return entry
+
+
+def node_type(name):
+    """The NodeType registered as `name`, or None."""
+    return _TYPES.get(name)
+
+
+def node_spec(name):
+    """Return a NodeData describing node type `name`, or None if it isn't registered."""
+    entry = _TYPES.get(name)
+    return None if entry is None else entry.spec
+
+
+def node_types():
+    """Every registered NodeType, in menu order."""
+    return list(_TYPES.values())
+
+
+# the make_*_node functions of node_library, by name like the menu has
+# always listed them
+for _name in sorted(vars(nl)):
+    if _name.startswith('make_') and _name.endswith('_node') and callable(getattr(nl, _name)):
+        register(getattr(nl, _name))
@@ -0,0 +1,101 @@
+from types_classes.vispyDataTypes import TypeProfile, types
+
+# every TypeProfile in vispyDataTypes.types, in declaration order; a
+# type's id is its index here
+TYPES = tuple(profile for profile in vars(types).values() if isinstance(profile, TypeProfile))
+
+_IDS = {profile: tid for tid, profile in enumerate(TYPES)}
+_NAMES = {profile.name: tid for tid, profile in enumerate(TYPES)}
+
+ANY = _IDS[types.any]
+EXEC = _IDS[types.exec]
+
+# shapes of sockets edited in place, which are never connected
+VALUE_SHAPES = ("TextInput", "EvalInput")
+
+# node type that turns any data value into a type, by that type
+CAST_NODES = {
+    types.string: "Cast to String",
+    types.integer: "Cast to Integer",
+    types.float: "Cast to Float",
+    types.boolean: "Cast to Bool",
+}
+
+
+def _connectable(source, target):
+    if source.shape in VALUE_SHAPES or target.shape in VALUE_SHAPES:
+        return False
+    if source == target:
+        return True
+    # Any takes every data type, but control flow only goes to Exec
+    if source == types.exec or target == types.exec:
+        return False
+    return source == types.any or target == types.any
+
+
+def _cast(source, target):
+    if _connectable(source, target) or source.shape in VALUE_SHAPES or source == types.exec:
+        return None
+    return CAST_NODES.get(target)
+
+
+# COMPATIBLE[output id][input id]: an output of the first type may feed an
+# input of the second
+COMPATIBLE = tuple(tuple(_connectable(a, b) for b in TYPES) for a in TYPES)
+
+# CASTS[output id][input id]: node type to put in between when the two
+# aren't compatible but a cast makes them so, else None
+CASTS = tuple(tuple(_cast(a, b) for b in TYPES) for a in TYPES)
+
+# type id -> ids it is compatible with (the table is symmetric)
+_COMPATIBLE_IDS = tuple(frozenset(j for j, ok in enumerate(row) if ok) for row in COMPATIBLE)
+# output type id -> input type ids reachable through a cast, and back
+_CAST_TARGETS = tuple(frozenset(j for j, cast in enumerate(row) if cast) for row in CASTS)
+_CAST_SOURCES = tuple(frozenset(i for i in range(len(TYPES)) if CASTS[i][j]) for j in range(len(TYPES)))
+
+
+def type_id(type_profile):
+    """The integer id of a TypeProfile from vispyDataTypes.types."""
+    return _IDS[type_profile]
+
+
+def name_id(type_name):
+    """The id of the type called `type_name`, or None for an unknown name."""
+    return _NAMES.get(type_name)
+
+
+def type_by_name(type_name):
+    """The TypeProfile called `type_name`, or None."""
+    tid = _NAMES.get(type_name)
+    return None if tid is None else TYPES[tid]
+
+
+def compatible(output_id, input_id):
+    return COMPATIBLE[output_id][input_id]
+
+
+def cast_node(output_id, input_id):
+    """Node type converting output_id to input_id, or None if none is needed or possible."""
+    return CASTS[output_id][input_id]
+
+
+def compatible_ids(tid):
+    """Type ids a socket of type `tid` can connect to directly, in either direction."""
+    return _COMPATIBLE_IDS[tid]
+
+
+def cast_ids(tid, is_input):
+    """Type ids a socket of type `tid` can reach through a cast node.
+
+    For an output these are the input types it can be cast to; for an
+    input, the output types that can be cast to it.
+    """
+    return _CAST_SOURCES[tid] if is_input else _CAST_TARGETS[tid]
+
+
+def names_compatible(output_name, input_name):
+    """compatible() for type names; names not in the registry aren't checked."""
+    a, b = _NAMES.get(output_name), _NAMES.get(input_name)
+    if a is None or b is None:
+        return True
+    return COMPATIBLE[a][b]
@@ -1,6 +1,6 @@
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QGraphicsView, QSplitter,
-    QMenuBar, QMessageBox, QFileDialog
+    QMenuBar, QMessageBox, QFileDialog, QDockWidget
 )
 from PySide6.QtGui import QAction
 from PySide6.QtCore import Qt, qInstallMessageHandler
@@ -38,6 +38,11 @@ import widgets_elements.vispyWindowLib as vwl
 import types_classes.node_library as nl
 
 class NodeEditor(QMainWindow):
+    # seconds a Run may take before it is stopped
+    run_timeout = 300
+    # nodes in a .vpb file above which opening it turns on Virtualize Nodes
+    virtualize_above = 5000
+
     def __init__(self):
         super().__init__()
 
@@ -61,6 +66,18 @@ class NodeEditor(QMainWindow):
         splitter.setSizes([260, 940])
         self.setCentralWidget(splitter)
 
+        # program output of the Run action, shown the first time something runs
+        from widgets_elements.vispyRunConsole import RunConsole
+        self.run_console = RunConsole()
+        self.run_dock = QDockWidget("Output", self)
+        self.run_dock.setObjectName("run_output")
+        self.run_dock.setWidget(self.run_console)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.run_dock)
+        self.run_dock.hide()
+        self._worker_pool = None
+        # Autosave journaling edits of the open file, once it has a path
+        self._autosave = None
+
         # Menubar and placeholder actions (Save/Open/etc.) - implement actual functionality later
         self._create_menus()
 
@@ -106,9 +123,47 @@ class NodeEditor(QMainWindow):
         view_menu = menubar.addMenu("&View")
         view_menu.addAction(QAction("Zoom In", self, shortcut="Ctrl++", triggered=lambda: self.view.scale(1.25, 1.25)))
         view_menu.addAction(QAction("Zoom Out", self, shortcut="Ctrl+-", triggered=lambda: self.view.scale(0.8, 0.8)))
+        view_menu.addSeparator()
+        full_update_act = QAction("Full Viewport Updates", self, checkable=True)
+        full_update_act.setChecked(self.view.update_mode() == 'full')
+        full_update_act.toggled.connect(
+            lambda checked: self.view.set_update_mode('full' if checked else vwl.GraphicsView.default_update_mode)
+        )
+        view_menu.addAction(full_update_act)
+        edge_layer_act = QAction("Batched Edge Layer", self, checkable=True)
+        edge_layer_act.toggled.connect(self.scene.set_edge_layer_enabled)
+        view_menu.addAction(edge_layer_act)
+        node_cache_act = QAction("Cache Node Rendering", self, checkable=True)
+        node_cache_act.toggled.connect(self.scene.set_node_caching)
+        view_menu.addAction(node_cache_act)
+        virtualize_act = QAction("Virtualize Nodes", self, checkable=True)
+        virtualize_act.toggled.connect(lambda checked: self.scene.set_virtualized(checked, self.view))
+        view_menu.addAction(virtualize_act)
+        self._virtualize_act = virtualize_act
+        live_values_act = QAction("Live Values", self, checkable=True)
+        live_values_act.toggled.connect(self.scene.set_live_preview_enabled)
+        view_menu.addAction(live_values_act)
+        view_menu.addSeparator()
+        perf_overlay_act = QAction("Performance Overlay", self, checkable=True)
+        perf_overlay_act.toggled.connect(self.view.set_perf_overlay_enabled)
+        view_menu.addAction(perf_overlay_act)
+
+        # Run menu
+        run_menu = menubar.addMenu("&Run")
+        run_menu.addAction(QAction("&Run", self, shortcut="F5", triggered=self._run_graph))
+        run_menu.addAction(QAction("&Stop", self, shortcut="Shift+F5", triggered=self.run_console.stop))
+        run_menu.addSeparator()
+        run_menu.addAction(self.run_dock.toggleViewAction())
 
         # Tools menu
         tools_menu = menubar.addMenu("&Tools")
+        export_py_act = QAction("&Export Python...", self)
+        export_py_act.triggered.connect(self._export_python)
+        tools_menu.addAction(export_py_act)
+        batch_act = QAction("&Batch Evaluate...", self)
+        batch_act.triggered.connect(self._batch_evaluate)
+        tools_menu.addAction(batch_act)
+        tools_menu.addSeparator()
         prefs_act = QAction("&Preferences...", self)
         prefs_act.triggered.connect(self._show_preferences)
         tools_menu.addAction(prefs_act)
@@ -125,42 +180,164 @@ class NodeEditor(QMainWindow):
         QMessageBox.information(self, "New", "Create new file - not implemented yet")
 
     def _open_file(self):
-        path, _ = QFileDialog.getOpenFileName(self, "Open File", "", "Vispy Files (*.vp *.json);;All Files (*)")
+        import savesystem as ss
+        path, _ = QFileDialog.getOpenFileName(self, "Open File", "", ss.FILE_FILTER)
         if path:
             try:
-                import savesystem as ss
+                self._virtualize_for(path)
+                self._stop_autosave()
                 ss.load_scene_from_file(self.scene, path)
+                self._start_autosave(path)
                 logging.info(f"Open file: {path}")
-                QMessageBox.information(self, "Open", f"Loaded: {path}")
+                dropped = self.scene.model.dropped_edges
+                if dropped:
+                    QMessageBox.warning(self, "Open", f"Loaded: {path}\n\n{dropped} connection(s) in the file "
+                                        "can't be made and were left out; saving will remove them from "
+                                        "the file. See the log for which ones.")
+                else:
+                    QMessageBox.information(self, "Open", f"Loaded: {path}")
             except Exception:
                 logging.exception('Error loading file')
                 QMessageBox.critical(self, "Open Error", "Failed to load file. See logs.")
 
+    def _virtualize_for(self, path):
+        # a large .vpb file only opens quickly in a virtualized scene, which
+        # loads its tiles as the view reaches them
+        import vpb
+        if path.lower().endswith(vpb.EXTENSION) and not self._virtualize_act.isChecked():
+            try:
+                large = vpb.node_count(path) > self.virtualize_above
+            except (OSError, vpb.VPBError):
+                return
+            if large:
+                self._virtualize_act.setChecked(True)
+
+    def _start_autosave(self, path):
+        # from now on edits are journaled next to the file as they happen
+        from autosave import Autosave
+        self._stop_autosave()
+        self._autosave = Autosave(self.scene.model, path).start()
+
+    def _stop_autosave(self):
+        if self._autosave is not None:
+            self._autosave.stop()
+            self._autosave = None
+
     def _save_file(self):
         logging.info("Save action triggered")
         from PySide6.QtWidgets import QFileDialog
-        path, _ = QFileDialog.getSaveFileName(self, "Save File", "", "Vispy Files (*.vp *.json);;All Files (*)")
+        import savesystem as ss
+        autosave = self._autosave
+        if autosave is not None and autosave.model is self.scene.model:
+            # the file is the last snapshot plus the journal; only the
+            # edits since the last autosave write are left to append
+            try:
+                autosave.flush()
+                QMessageBox.information(self, "Save", f"Saved to: {autosave.path}")
+            except Exception:
+                logging.exception('Error saving file')
+                QMessageBox.critical(self, "Save Error", "Failed to save file. See logs.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Save File", "", ss.FILE_FILTER)
         if path:
             try:
-                import savesystem as ss
+                self._stop_autosave()
                 ss.save_scene_to_file(self.scene, path)
+                self._start_autosave(path)
                 QMessageBox.information(self, "Save", f"Saved to: {path}")
             except Exception:
                 logging.exception('Error saving file')
                 QMessageBox.critical(self, "Save Error", "Failed to save file. See logs.")
 
     def _save_file_as(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Save File As", "", "Vispy Files (*.vp *.json);;All Files (*)")
+        import savesystem as ss
+        path, _ = QFileDialog.getSaveFileName(self, "Save File As", "", ss.FILE_FILTER)
         if path:
             try:
-                import savesystem as ss
+                self._stop_autosave()
                 ss.save_scene_to_file(self.scene, path)
+                self._start_autosave(path)
                 logging.info(f"Save as: {path}")
                 QMessageBox.information(self, "Save As", f"Saved to: {path}")
             except Exception:
                 logging.exception('Error saving file as')
                 QMessageBox.critical(self, "Save Error", "Failed to save file. See logs.")
 
+    def _export_python(self):
+        from compiler import Compiler, CompileError
+        # one compiler per window, so re-exporting only rebuilds what changed
+        if getattr(self, '_compiler', None) is None:
+            self._compiler = Compiler()
+        try:
+            source = self._compiler.compile(self.scene.model)
+        except CompileError as e:
+            QMessageBox.critical(self, "Export Error", f"Can't compile graph: {e}")
+            return
+        logging.info(f"Optimizer: {self._compiler.report}")
+        path, _ = QFileDialog.getSaveFileName(self, "Export Python", "", "Python Files (*.py);;All Files (*)")
+        if path:
+            try:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(source)
+                logging.info(f"Exported python: {path}")
+            except Exception:
+                logging.exception('Error exporting python')
+                QMessageBox.critical(self, "Export Error", "Failed to write file. See logs.")
+
+    def _batch_evaluate(self):
+        try:
+            import batch
+        except ImportError:
+            QMessageBox.critical(self, "Batch Evaluate", "Batch evaluation needs NumPy (pip install numpy).")
+            return
+        columns = "Columns (*.csv *.npy *.npz);;All Files (*)"
+        source, _ = QFileDialog.getOpenFileName(self, "Batch Input", "", columns)
+        if not source:
+            return
+        target, _ = QFileDialog.getSaveFileName(self, "Batch Results", "", columns)
+        if not target:
+            return
+        try:
+            results = batch.BatchEvaluator(self.scene.model).evaluate(batch.load_columns(source))
+            batch.save_columns(target, results)
+        except batch.BatchError as e:
+            QMessageBox.critical(self, "Batch Evaluate", f"Can't evaluate: {e}")
+            return
+        except Exception:
+            logging.exception('Error in batch evaluation')
+            QMessageBox.critical(self, "Batch Evaluate", "Batch evaluation failed. See logs.")
+            return
+        logging.info(f"Batch evaluated {source} -> {target}: {', '.join(results)}")
+
+    def _run_graph(self):
+        from compiler import Compiler, CompileError
+        from compile_cache import CompileCache
+        from runner import WorkerPool
+        if self.run_console.running():
+            QMessageBox.information(self, "Run", "A program is already running. Stop it first.")
+            return
+        if getattr(self, '_compiler', None) is None:
+            self._compiler = Compiler()
+        self.run_dock.show()
+        if getattr(self, '_compile_cache', None) is None:
+            self._compile_cache = CompileCache()
+        try:
+            source, code = self._compile_cache.compile(self.scene.model, self._compiler)
+        except CompileError as e:
+            self.run_console.note(f"[Can't compile graph: {e}]")
+            return
+        if self._worker_pool is None:
+            self._worker_pool = WorkerPool(size=1, parent=self)
+        self.run_console.note("[Running]")
+        self.run_console.attach(self._worker_pool.run(source, timeout=self.run_timeout, code=code))
+
+    def closeEvent(self, event):
+        if self._worker_pool is not None:
+            self.run_console.stop()
+            self._worker_pool.shutdown()
+        self._stop_autosave()
+        super().closeEvent(event)
+
     def _show_preferences(self):
         QMessageBox.information(self, "Preferences", "Preferences dialog - implement settings here")
 
@@ -0,0 +1,537 @@
+"""Binary project files (.vpb), an alternative to the JSON .vp format.
+
+Layout, all little-endian:
+
+    header    magic, version, section counts, tile size and section
+              offsets (HEADER)
+    nodes     one NODE row per node: uid, type and title as string ids,
+              x, y, index of its first port row within its tile, input
+              and output counts
+    ports     one PORT row per socket, inputs then outputs of each node in
+              node order: name, type and shape as string ids, the port
+              index, and the input value as a (kind, string id) pair
+    edges     one EDGE row per connection: node rows and port indices of
+              both ends, and the type name as a string id. The edges
+              inside each tile come first, tile by tile; the last
+              `n_cross` rows join nodes of different tiles.
+    tiles     one TILE row per tile, the index: grid cell, bounds of its
+              node bodies, and its ranges of node, port and edge rows
+    strings   (offset, length) of each string in the string data
+    data      UTF-8 bytes of every distinct string, stored once
+
+Nodes are grouped into square tiles of `tile_size` scene units by the
+cell of their position, so a region of the graph can be read without
+the rest: TileLoader loads a file into a GraphModel a tile at a time.
+
+String id NONE stands for None. BinaryGraph reads a file through mmap
+and unpacks rows straight from it; strings are decoded on first use.
+Files convert to and from the JSON format without loss, except that
+edges to nodes missing from the file are dropped, as loading does, and
+nodes are listed tile by tile.
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from bisect import bisect_right
+
+from types_classes.graph_model import GraphModel, NodeRecord, body_size, make_node_record
+from types_classes.node_registry import node_spec
+
+MAGIC = b"VPB\x00"
+VERSION = 2
+EXTENSION = ".vpb"
+
+HEADER = struct.Struct("<4sHxxIIIIIIdQQQQQQ")
+NODE = struct.Struct("<IIIddIHH")
+PORT = struct.Struct("<IIIIB3xI")
+EDGE = struct.Struct("<IIIII")
+TILE = struct.Struct("<iiddddIIIIII")
+STRING = struct.Struct("<II")
+
+NONE = 0xFFFFFFFF
+
+# scene units per side of a tile
+TILE_SIZE = 2048.0
+
+# kind of an input value in a PORT row
+VALUE_NONE = 0
+VALUE_STR = 1
+# anything else, stored as its JSON text
+VALUE_JSON = 2
+
+
+class VPBError(Exception):
+    """A file isn't a valid .vpb file."""
+
+
+class _Strings:
+    """Interns strings for a file being written."""
+
+    def __init__(self):
+        self.ids = {}
+        self.data = bytearray()
+        self.index = bytearray()
+
+    def __call__(self, text):
+        if text is None:
+            return NONE
+        sid = self.ids.get(text)
+        if sid is None:
+            raw = text.encode("utf-8", "surrogatepass")
+            sid = self.ids[text] = len(self.ids)
+            self.index += STRING.pack(len(self.data), len(raw))
+            self.data += raw
+        return sid
+
+
+def _value(strings, value):
+    if value is None:
+        return VALUE_NONE, NONE
+    if isinstance(value, str):
+        return VALUE_STR, strings(value)
+    return VALUE_JSON, strings(json.dumps(value))
+
+
+class _Tile:
+    """Rows of one tile of a file being written."""
+
+    def __init__(self, key):
+        self.key = key
+        self.nodes = bytearray()
+        self.ports = bytearray()
+        self.edges = bytearray()
+        self.n_nodes = 0
+        self.n_ports = 0
+        self.bounds = [math.inf, math.inf, -math.inf, -math.inf]
+
+
+def write_entries(f, nodes, edges, tile_size=TILE_SIZE):
+    """Write saved-file node and edge entries (see GraphModel.to_data) to binary file `f`."""
+    strings = _Strings()
+    # tiles in order of their first node, so a graph in one tile keeps its order
+    tiles = {}
+    rows = {}
+    for entry in nodes:
+        uid = entry.get('id')
+        node_type = entry.get('type')
+        pos = entry.get('pos') or [0, 0]
+        x, y = float(pos[0]), float(pos[1])
+        inputs = entry.get('inputs', [])
+        outputs = entry.get('outputs', [])
+        key = (math.floor(x / tile_size), math.floor(y / tile_size))
+        tile = tiles.get(key)
+        if tile is None:
+            tile = tiles[key] = _Tile(key)
+        # edges name nodes by uid; like loading, a repeated uid means the last node
+        rows[uid] = (tile, tile.n_nodes)
+        tile.n_nodes += 1
+        tile.nodes += NODE.pack(strings(uid), strings(node_type), strings(entry.get('title', node_type)),
+                                x, y, tile.n_ports, len(inputs), len(outputs))
+        for info, is_input in [(info, True) for info in inputs] + [(info, False) for info in outputs]:
+            index = info.get('index')
+            kind, value = _value(strings, info.get('value')) if is_input else (VALUE_NONE, NONE)
+            tile.ports += PORT.pack(strings(info.get('name', '')), strings(info.get('type')), strings(info.get('shape')),
+                                    NONE if index is None else index, kind, value)
+        tile.n_ports += len(inputs) + len(outputs)
+        w, h = body_size(len(inputs), len(outputs))
+        bounds = tile.bounds
+        bounds[0] = min(bounds[0], x)
+        bounds[1] = min(bounds[1], y)
+        bounds[2] = max(bounds[2], x + w)
+        bounds[3] = max(bounds[3], y + h)
+
+    # node rows are numbered across the file, tile after tile
+    first_rows = {}
+    n_nodes = 0
+    for tile in tiles.values():
+        first_rows[tile] = n_nodes
+        n_nodes += tile.n_nodes
+
+    cross = bytearray()
+    for entry in edges:
+        start = rows.get(entry.get('start_node_id'))
+        end = rows.get(entry.get('end_node_id'))
+        s_idx = entry.get('start_socket_index')
+        e_idx = entry.get('end_socket_index')
+        if start is None or end is None or s_idx is None or e_idx is None:
+            continue
+        row = EDGE.pack(first_rows[start[0]] + start[1], s_idx, first_rows[end[0]] + end[1], e_idx,
+                        strings(entry.get('type')))
+        if start[0] is end[0]:
+            start[0].edges += row
+        else:
+            cross += row
+
+    node_rows = bytearray()
+    port_rows = bytearray()
+    edge_rows = bytearray()
+    tile_rows = bytearray()
+    for tile in tiles.values():
+        tile_rows += TILE.pack(tile.key[0], tile.key[1], *tile.bounds,
+                               len(node_rows) // NODE.size, tile.n_nodes,
+                               len(port_rows) // PORT.size, tile.n_ports,
+                               len(edge_rows) // EDGE.size, len(tile.edges) // EDGE.size)
+        node_rows += tile.nodes
+        port_rows += tile.ports
+        edge_rows += tile.edges
+    edge_rows += cross
+
+    sections = (node_rows, port_rows, edge_rows, tile_rows, strings.index, strings.data)
+    offset = HEADER.size
+    offsets = []
+    for section in sections:
+        offsets.append(offset)
+        offset += len(section)
+    f.write(HEADER.pack(MAGIC, VERSION, len(strings.ids), n_nodes, len(port_rows) // PORT.size,
+                        len(edge_rows) // EDGE.size, len(tiles), len(cross) // EDGE.size, tile_size, *offsets))
+    for section in sections:
+        f.write(section)
+
+
+def write_model(model, f, tile_size=TILE_SIZE):
+    """Write a GraphModel to binary file `f`."""
+    model.load_all()
+    write_entries(f, map(model.node_data, model.nodes.values()),
+                  map(model.connection_data, model.connections.values()), tile_size)
+
+
+def write_data(data, f, tile_size=TILE_SIZE):
+    """Write a saved-file dict (the JSON format) to binary file `f`."""
+    write_entries(f, data.get('nodes', []), data.get('edges', []), tile_size)
+
+
+class BinaryGraph:
+    """A .vpb file opened for reading, from a path (via mmap) or a bytes-like object.
+
+    Use as a context manager, or call close(), when opened from a path.
+    """
+
+    def __init__(self, source):
+        self._file = None
+        self._map = None
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, "rb")
+            try:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty file; mmap can't map zero bytes
+                self._file.close()
+                raise VPBError("%s: empty file" % source)
+            buffer = self._map
+        else:
+            buffer = source
+        self._buffer = memoryview(buffer)
+        try:
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self):
+        if len(self._buffer) < 6:
+            raise VPBError("file is too short for a .vpb header")
+        magic, version = struct.unpack_from("<4sH", self._buffer)
+        if magic != MAGIC:
+            raise VPBError("not a .vpb file")
+        if version != VERSION:
+            raise VPBError("unsupported .vpb version %d" % version)
+        if len(self._buffer) < HEADER.size:
+            raise VPBError("file is too short for a .vpb header")
+        (_, _, self.n_strings, self.n_nodes, self.n_ports, self.n_edges, self.n_tiles, self.n_cross,
+         self.tile_size, nodes, ports, edges, tiles, strings, data) = HEADER.unpack_from(self._buffer)
+        sections = [
+            (nodes, self.n_nodes * NODE.size),
+            (ports, self.n_ports * PORT.size),
+            (edges, self.n_edges * EDGE.size),
+            (tiles, self.n_tiles * TILE.size),
+            (strings, self.n_strings * STRING.size),
+        ]
+        for offset, size in sections:
+            if offset + size > len(self._buffer):
+                raise VPBError("truncated .vpb file")
+        if self.n_cross > self.n_edges:
+            raise VPBError("bad .vpb edge counts")
+        self._nodes, self._ports, self._edges, self._tiles, self._index = (
+            self._buffer[offset:offset + size] for offset, size in sections)
+        self._data = self._buffer[data:]
+        self._strings = [None] * self.n_strings
+
+    def close(self):
+        # release the views before the map they point into
+        self._buffer = self._nodes = self._ports = self._edges = self._tiles = self._index = self._data = None
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # an iterator over rows is still alive; the map is closed
+                # when it is collected
+                pass
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def string(self, sid):
+        if sid == NONE:
+            return None
+        text = self._strings[sid]
+        if text is None:
+            offset, length = STRING.unpack_from(self._index, sid * STRING.size)
+            text = self._strings[sid] = str(self._data[offset:offset + length], "utf-8", "surrogatepass")
+        return text
+
+    def _value(self, kind, sid):
+        if kind == VALUE_STR:
+            return self.string(sid)
+        if kind == VALUE_JSON:
+            return json.loads(self.string(sid))
+        return None
+
+    def tiles(self):
+        """(column, row, left, top, right, bottom, first node, nodes, first port, ports,
+        first edge, edges) per tile; the bounds enclose the tile's node bodies."""
+        return TILE.iter_unpack(self._tiles)
+
+    def tile_nodes(self, tile):
+        """(uid, type, title, x, y, first port, inputs, outputs) per node of a tile, strings as ids.
+
+        The first port is counted from the tile's first port row.
+        """
+        first, count = tile[6:8]
+        return NODE.iter_unpack(self._nodes[first * NODE.size:(first + count) * NODE.size])
+
+    def tile_ports(self, tile):
+        """(name, type, shape, index, value kind, value) per port of a tile, strings as ids."""
+        first, count = tile[8:10]
+        return PORT.iter_unpack(self._ports[first * PORT.size:(first + count) * PORT.size])
+
+    def tile_edges(self, tile):
+        """(start node row, start port, end node row, end port, type) per edge inside a tile."""
+        first, count = tile[10:12]
+        return EDGE.iter_unpack(self._edges[first * EDGE.size:(first + count) * EDGE.size])
+
+    def cross_edges(self):
+        """Rows like tile_edges() of the edges between nodes of different tiles."""
+        return EDGE.iter_unpack(self._edges[(self.n_edges - self.n_cross) * EDGE.size:])
+
+    def tile_records(self, tile):
+        """New NodeRecords for the nodes of a tile, like GraphModel.from_data builds them."""
+        string = self.string
+        ports = list(self.tile_ports(tile))
+        for uid, node_type, title, x, y, first, n_inputs, n_outputs in self.tile_nodes(tile):
+            node_type = string(node_type)
+            title = string(title)
+            rows = ports[first:first + n_inputs + n_outputs]
+            spec = node_spec(node_type)
+            if spec is not None:
+                record = make_node_record(spec, title, x, y)
+            else:
+                record = NodeRecord(None, node_type, title, x, y)
+                saved = sorted(enumerate(rows), key=lambda item: 0 if item[1][3] == NONE else item[1][3])
+                for i, row in saved:
+                    record.add_port(string(row[0]), string(row[1]), string(row[2]), i < n_inputs)
+            record.uid = string(uid)
+            for name, _, _, index, kind, value in rows[:n_inputs]:
+                if kind != VALUE_NONE and index != NONE and index < record.n_inputs:
+                    record.ports[index].value = self._value(kind, value)
+            yield record
+
+    def to_model(self):
+        """Build a GraphModel, like GraphModel.from_data does for the JSON format."""
+        model = GraphModel()
+        TileLoader(self, model).load_all()
+        return model
+
+    def to_data(self):
+        """The saved-file dict (the JSON format) for this file."""
+        string = self.string
+        nodes = []
+        uids = []
+        for tile in self.tiles():
+            ports = list(self.tile_ports(tile))
+            for uid, node_type, title, x, y, first, n_inputs, n_outputs in self.tile_nodes(tile):
+                inputs = []
+                outputs = []
+                for i, (name, type_name, shape, index, kind, value) in enumerate(ports[first:first + n_inputs + n_outputs]):
+                    info = {'name': string(name), 'index': None if index == NONE else index,
+                            'type': string(type_name), 'shape': string(shape)}
+                    if i < n_inputs:
+                        info['value'] = self._value(kind, value)
+                        inputs.append(info)
+                    else:
+                        outputs.append(info)
+                uids.append(string(uid))
+                nodes.append({
+                    'id': uids[-1],
+                    'type': string(node_type),
+                    'title': string(title),
+                    'pos': [x, y],
+                    'inputs': inputs,
+                    'outputs': outputs
+                })
+        edges = []
+        for start, s_idx, end, e_idx, type_name in EDGE.iter_unpack(self._edges):
+            edges.append({
+                'start_node_id': uids[start],
+                'start_socket_index': s_idx,
+                'end_node_id': uids[end],
+                'end_socket_index': e_idx,
+                'type': string(type_name)
+            })
+        return {'nodes': nodes, 'edges': edges}
+
+
+class TileLoader:
+    """Load a .vpb file into a GraphModel one tile at a time.
+
+    The loader is the model's `loader` until every tile is loaded: the
+    model asks it for the tiles overlapping a rectangle from
+    nodes_in_rect(), which the Virtualizer calls for the area around the
+    view, and for the rest from load_all(). An edge inside a tile is
+    connected with its tile, an edge between tiles when the second of
+    its tiles is loaded, unless an end was deleted in the meantime.
+    """
+
+    def __init__(self, graph, model, close_graph=False):
+        self.graph = graph
+        self.model = model
+        # close the graph once everything is loaded
+        self._close_graph = close_graph
+        self._tiles = list(graph.tiles())
+        self._pending = set(range(len(self._tiles)))
+        # node row -> its record, for loaded nodes
+        self._records = {}
+        # tile index -> cross-tile edges with an end in that tile
+        self._cross = {}
+        first_rows = [tile[6] for tile in self._tiles]
+        for edge in graph.cross_edges():
+            for tile in {bisect_right(first_rows, edge[0]) - 1, bisect_right(first_rows, edge[2]) - 1}:
+                self._cross.setdefault(tile, []).append(edge)
+        model.loader = self
+        if not self._pending:
+            self.close()
+
+    def __len__(self):
+        """Number of tiles not loaded yet."""
+        return len(self._pending)
+
+    def load_rect(self, left, top, right, bottom):
+        """Load the tiles whose nodes may intersect the rectangle."""
+        for i in sorted(self._pending):
+            tile = self._tiles[i]
+            if tile[2] <= right and tile[4] >= left and tile[3] <= bottom and tile[5] >= top:
+                self._load(i)
+        if not self._pending:
+            self.close()
+
+    def load_all(self):
+        for i in sorted(self._pending):
+            self._load(i)
+        self.close()
+
+    def close(self):
+        """Stop loading; the model keeps what it has."""
+        if self.model.loader is self:
+            self.model.loader = None
+        self._pending.clear()
+        self._records.clear()
+        self._cross.clear()
+        if self._close_graph:
+            self.graph.close()
+
+    def _load(self, i):
+        self._pending.discard(i)
+        tile = self._tiles[i]
+        model = self.model
+        records = self._records
+        # loading isn't an edit, so the model's listeners don't hear about it
+        listeners, model.listeners = model.listeners, []
+        try:
+            for row, record in enumerate(self.graph.tile_records(tile), tile[6]):
+                records[row] = model.adopt(record)
+            for edge in self.graph.tile_edges(tile):
+                self._connect(*edge)
+            for edge in self._cross.pop(i, ()):
+                self._connect(*edge)
+        finally:
+            model.listeners = listeners
+
+    def _connect(self, start, s_idx, end, e_idx, type_name):
+        model = self.model
+        start = self._records.get(start)
+        end = self._records.get(end)
+        # the other end's tile isn't loaded yet, or a node was deleted since
+        if start is None or end is None or not (model.contains(start) and model.contains(end)):
+            return
+        if not (s_idx < len(start.ports) and e_idx < len(end.ports)):
+            model.drop_edge(start.uid, s_idx, end.uid, e_idx, 'no such port')
+            return
+        if not model.can_connect(start.ports[s_idx], end.ports[e_idx]):
+            model.drop_edge(start.uid, s_idx, end.uid, e_idx, "ports can't be connected")
+            return
+        model.connect(start.id, s_idx, end.id, e_idx, self.graph.string(type_name))
+
+
+def node_count(path):
+    """Number of nodes in a .vpb file, from its header."""
+    with BinaryGraph(path) as graph:
+        return graph.n_nodes
+
+
+def open_model(path):
+    """A GraphModel for a .vpb file that loads its tiles on demand (see TileLoader).
+
+    The file stays open until every tile is loaded or the model is cleared.
+    """
+    model = GraphModel()
+    TileLoader(BinaryGraph(path), model, close_graph=True)
+    return model
+
+
+def load_model(path):
+    """Read a .vpb file into a GraphModel."""
+    with BinaryGraph(path) as graph:
+        return graph.to_model()
+
+
+def convert(source, target):
+    """Convert between the JSON (.vp/.json) and binary (.vpb) formats, by file extension."""
+    if source.lower().endswith(EXTENSION):
+        with BinaryGraph(source) as graph:
+            data = graph.to_data()
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    if target.lower().endswith(EXTENSION):
+        with open(target, "wb") as f:
+            write_data(data, f)
+    else:
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(',', ':'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert vispy graphs between JSON (.vp) and binary (.vpb) files.")
+    parser.add_argument("source")
+    parser.add_argument("target")
+    args = parser.parse_args(argv)
+    try:
+        convert(args.source, args.target)
+    except (OSError, ValueError, VPBError) as e:
+        print("error: %s" % e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+from PySide6.QtCore import QTimer
+
+from evaluator import LiveEvaluator, EvalError, Unavailable
+from widgets_elements.vispyNodeLib import Node, LOD_THRESHOLDS
+
+
+def format_value(value):
+    """Preview text for a LiveEvaluator value, or None if there is nothing to show."""
+    if isinstance(value, Unavailable):
+        return None
+    if isinstance(value, EvalError):
+        return "error: %s" % value.message
+    if isinstance(value, str):
+        return repr(value)
+    return str(value)
+
+
+class LivePreview:
+    """Show the current value of every visible output socket of a scene.
+
+    A LiveEvaluator on the scene's model keeps the values; this class only
+    decides when to ask for them. Model edits and scrolling start a short
+    timer, so a burst of keystrokes in a socket editor costs one refresh,
+    and a refresh only evaluates the nodes whose items are inside a view.
+    Below the socket label level of detail nothing is shown, so zoomed-out
+    overviews don't evaluate anything.
+    """
+
+    # ms of quiet after the last edit or scroll before values are refreshed
+    delay = 120
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.evaluator = None
+
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.delay)
+        self._timer.timeout.connect(self.refresh)
+        self._views = []
+
+    def install(self):
+        self.scene.live_preview = self
+        for view in self.scene.views():
+            self._views.append(view)
+            for signal in self._signals(view):
+                signal.connect(self.schedule_refresh)
+        self._attach()
+        self.refresh()
+
+    def uninstall(self):
+        """Stop updating and hide every preview."""
+        self._timer.stop()
+        for view in self._views:
+            for signal in self._signals(view):
+                try:
+                    signal.disconnect(self.schedule_refresh)
+                except (RuntimeError, TypeError):
+                    pass
+        self._views.clear()
+        self._detach()
+        for item in self.scene.items():
+            if isinstance(item, Node):
+                for sock in item.sockets:
+                    sock.set_preview(None)
+        self.scene.live_preview = None
+
+    @staticmethod
+    def _signals(view):
+        signals = [view.horizontalScrollBar().valueChanged, view.verticalScrollBar().valueChanged]
+        if hasattr(view, 'viewport_changed'):
+            signals.append(view.viewport_changed)
+        return signals
+
+    def _attach(self):
+        # follow the scene to a new model (File > Open replaces it)
+        model = self.scene.model
+        if self.evaluator is not None and self.evaluator.model is model:
+            return
+        self._detach()
+        self.evaluator = LiveEvaluator(model)
+        model.listeners.append(self)
+
+    def _detach(self):
+        if self.evaluator is None:
+            return
+        model = self.evaluator.model
+        self.evaluator.detach()
+        if self in model.listeners:
+            model.listeners.remove(self)
+        self.evaluator = None
+
+    def schedule_refresh(self, *args):
+        self._timer.start()
+
+    # GraphModel listener: the evaluator has already marked what is dirty
+
+    def node_added(self, record):
+        self.schedule_refresh()
+
+    def node_moved(self, record):
+        pass
+
+    def value_changed(self, port):
+        self.schedule_refresh()
+
+    def connected(self, connection):
+        self.schedule_refresh()
+
+    def disconnected(self, connection):
+        self.schedule_refresh()
+
+    def node_removed(self, record):
+        self.schedule_refresh()
+
+    def cleared(self):
+        self.schedule_refresh()
+
+    def refresh(self):
+        """Update the previews of the nodes visible in the scene's views."""
+        self._attach()
+        seen = set()
+        for view in self.scene.views():
+            if view.transform().m11() < LOD_THRESHOLDS["socket_labels"]:
+                continue
+            rect = view.mapToScene(view.viewport().rect()).boundingRect()
+            for item in self.scene.items(rect):
+                if isinstance(item, Node) and item not in seen:
+                    seen.add(item)
+                    self._show(item)
+
+    def _show(self, node):
+        record = node.record
+        evaluator = self.evaluator
+        if evaluator.model.nodes.get(record.id) is not record:
+            return
+        for sock in node.sockets:
+            if not sock.port.is_input and not sock.is_value_socket():
+                sock.set_preview(format_value(evaluator.value(record.id, sock.port.index)))
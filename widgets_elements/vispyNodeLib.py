@@ -1,95 +1,247 @@
+import math
+from dataclasses import replace
+
 from PySide6.QtWidgets import (
     QGraphicsItem,
     QGraphicsPathItem,
     QStyle,
     QGraphicsTextItem,
-    QGraphicsProxyWidget,
     QLineEdit,
-    QComboBox
+    QComboBox,
+    QMenu
 )
-from PySide6.QtGui import QPen, QColor, QPainterPath, QFont
-from PySide6.QtCore import QRectF, Qt, QPointF
+from PySide6.QtGui import QPen, QColor, QPainterPath, QPainterPathStroker
+from PySide6.QtCore import QRectF, Qt, QPointF, QLineF, QTimer, Signal
 
 import types_classes.vispyDataTypes as vdt
 import types_classes.node_library as nl
-
-# Category to color mapping for node headers
-CATEGORY_COLORS = {
-    "Logic Flow": QColor(100, 150, 200),
-    "Math": QColor(200, 150, 100),
-    "I/O": QColor(150, 200, 100),
-    "Data Manipulation": QColor(200, 100, 150),
-    "Selection": QColor(180, 130, 200),
-    "Flow": QColor(130, 200, 180),
-    "Logic": QColor(200, 180, 100),
-    "Variables": QColor(150, 150, 200),
-    "Values": QColor(200, 200, 100),
+from types_classes.node_data import NodeData
+from types_classes.graph_model import PortRecord, make_node_record
+from types_classes.node_registry import node_spec
+from types_classes.type_registry import type_id, compatible_ids, cast_ids, cast_node
+from widgets_elements.vispyTheme import CATEGORY_COLORS, theme
+from widgets_elements.vispySocketIndex import SocketIndex
+
+# Level-of-detail thresholds, compared against the painter's level of detail
+# (1.0 == 100% zoom). Below a threshold the matching detail is dropped so
+# zoomed-out overviews of large graphs stay cheap to paint.
+LOD_THRESHOLDS = {
+    "node_detail": 0.55,    # below: nodes are flat colored blocks without titles
+    "socket_labels": 0.7,   # below: socket labels are skipped
+    "editors": 0.7,         # below: value boxes are drawn without their text
+    "edge_curves": 0.55,    # below: edges are drawn as straight lines
 }
 
+
+def set_lod_thresholds(**thresholds):
+    """Override one or more entries of LOD_THRESHOLDS."""
+    for key, value in thresholds.items():
+        if key not in LOD_THRESHOLDS:
+            raise KeyError(f"Unknown LOD threshold: {key!r}")
+        LOD_THRESHOLDS[key] = float(value)
+
+
+def _lod(painter, option):
+    return option.levelOfDetailFromTransform(painter.worldTransform())
+
+
+# choices offered by EvalInput sockets
+EVAL_OPERATORS = ["==", ">=", "<=", "!="]
+
+
+def _graph_observer(scene):
+    """The object a scene reports user edits to (its Virtualizer), if any."""
+    if scene is None:
+        return None
+    return getattr(scene, 'graph_observer', None)
+
+
+def _scene_model(scene):
+    """The GraphModel a scene's items are views of, if it has one."""
+    if scene is None:
+        return None
+    return getattr(scene, 'model', None)
+
+
+# QGraphicsItem enum members compared in itemChange(); looking them up on
+# the class each time costs more than the comparison itself
+_POSITION_CHANGE = QGraphicsItem.ItemPositionChange
+_POSITION_HAS_CHANGED = QGraphicsItem.ItemPositionHasChanged
+_SCENE_CHANGE = QGraphicsItem.ItemSceneChange
+_SCENE_HAS_CHANGED = QGraphicsItem.ItemSceneHasChanged
+_NODE_CHANGES = frozenset((_POSITION_CHANGE, _POSITION_HAS_CHANGED, _SCENE_CHANGE, _SCENE_HAS_CHANGED))
+
+
+def _node_cache_mode(scene):
+    """Cache mode a scene's nodes use (GraphicsScene.set_node_caching)."""
+    if scene is None:
+        return QGraphicsItem.NoCache
+    return getattr(scene, 'node_cache_mode', QGraphicsItem.NoCache)
+
+
+def _populating(scene):
+    """True while `scene` is inside GraphicsScene.bulk_update()."""
+    return scene is not None and getattr(scene, 'populating', False)
+
 class Node(QGraphicsItem):
-    def __init__(self, node_data):
+    # half of the widest outline pen (selected: 3px)
+    outline_margin = 1.5
+
+    item_flags = (
+        QGraphicsItem.ItemIsMovable |
+        QGraphicsItem.ItemIsSelectable |
+        QGraphicsItem.ItemSendsGeometryChanges
+    )
+
+    def __init__(self, node_data, record=None):
         super().__init__()
 
         self.data = node_data
-        self.title = node_data.node_type
+        # the NodeRecord this item shows; title, position and socket values
+        # live there. A new node gets its own record, which the scene's
+        # model adopts when the node is added to it.
+        if record is None:
+            record = make_node_record(node_data)
+        self.record = record
+        # elided title text, recomputed only when the title or theme changes
+        self._title_text = None
+        self._theme_generation = theme().generation
 
         self.width = 160
         self.sockets = []
 
-        self.setFlags(
-            QGraphicsItem.ItemIsMovable |
-            QGraphicsItem.ItemIsSelectable |
-            QGraphicsItem.ItemSendsGeometryChanges
-        )
+        self.setFlags(self.item_flags)
 
         y_offset = 30
         spacing = 20
 
+        ports = record.ports
+        n_inputs = len(node_data.inputs)
+
         # input sockets
         for i, (name, t) in enumerate(node_data.inputs.items()):
-            sock = Socket(self, 0, y_offset + i * spacing, t, name)
+            sock = Socket(self, 0, y_offset + i * spacing, t, name, ports[i])
             self.sockets.append(sock)
 
         # output sockets
         for i, (name, t) in enumerate(node_data.outputs.items()):
-            sock = Socket(self, self.width, y_offset + i * spacing, t, name)
+            sock = Socket(self, self.width, y_offset + i * spacing, t, name, ports[n_inputs + i])
             self.sockets.append(sock)
 
         # calculate height based on number of sockets
         max_sockets = max(len(node_data.inputs), len(node_data.outputs))
         self.height = max(80, 30 + max_sockets * spacing + 10)
 
+        # the cache mode is the scene's, set once the node is added to one
+        self.setPos(record.x, record.y)
+
+    @classmethod
+    def for_record(cls, record):
+        """Create a view of an existing NodeRecord."""
+        spec = node_spec(record.node_type)
+        # each item needs its own NodeData; the socket dicts can be shared
+        data = replace(spec, id=record.uid) if spec is not None else NodeData(id=record.uid, node_type=record.node_type)
+        return cls(data, record)
+
+    def bind(self, record):
+        """Show another record of the same node type (used to recycle items)."""
+        self.record = record
+        self.data.id = record.uid
+        self._title_text = None
+        if self._theme_generation != theme().generation:
+            # the theme changed while the item was out of the scene
+            self.theme_changed()
+        for sock, port in zip(self.sockets, record.ports):
+            sock.port = port
+            sock._value_text = None
+            sock.set_preview(None)
+            sock.update()
+        self.set_cache_mode(_node_cache_mode(self.scene()))
+        self.setPos(record.x, record.y)
+        self.update()
+
+    def theme_changed(self):
+        """Drop text measured with the old theme and repaint (see Theme.invalidate)."""
+        self._theme_generation = theme().generation
+        self._title_text = None
+        for sock in self.sockets:
+            sock.theme_changed()
+        # also discards the cached pixmap of a cached node
+        self.update()
+
+    def set_cache_mode(self, mode):
+        """Apply a QGraphicsItem cache mode to the node and its sockets."""
+        if self.cacheMode() == mode:
+            return
+        self.setCacheMode(mode)
+        for sock in self.sockets:
+            sock.setCacheMode(mode)
+
+    @property
+    def title(self):
+        return self.record.title
+
+    @title.setter
+    def title(self, value):
+        if value != self.record.title:
+            self.record.title = value
+            self._title_text = None
+            self.update()
+
     def boundingRect(self):
-        return QRectF(0, 0, self.width, self.height)
+        # the selection outline is 3px wide and centred on the node edge, so
+        # half of it falls outside the body; include it so partial viewport
+        # updates don't leave traces behind
+        m = self.outline_margin
+        return QRectF(-m, -m, self.width + 2 * m, self.height + 2 * m)
 
     def paint(self, painter, option, widget=None):
+        th = theme()
 
         if option.state & QStyle.State_Selected:
-            pen = QPen(QColor(0, 170, 255), 3)
+            pen = th.node_selected_pen
         else:
-            pen = QPen(Qt.black, 2)
+            pen = th.node_pen
+
+        header = th.category_style(self.data.category)
+
+        if _lod(painter, option) < LOD_THRESHOLDS["node_detail"]:
+            # zoomed out: a flat block in the category color is enough
+            painter.setPen(pen)
+            painter.setBrush(header.brush)
+            painter.drawRect(0, 0, self.width, self.height)
+            return
 
         painter.setPen(pen)
-        painter.setBrush(QColor(45, 45, 45))
+        painter.setBrush(th.node_body_brush)
 
         painter.drawRoundedRect(
             0, 0, self.width, self.height, 6, 6
         )
 
         # draw colored header based on category
-        header_color = CATEGORY_COLORS.get(self.data.category, QColor(80, 80, 80))
-        painter.setBrush(header_color)
+        painter.setBrush(header.brush)
         painter.setPen(Qt.NoPen)
         painter.drawRoundedRect(
             0, 0, self.width, 25, 6, 6
         )
 
-        painter.setPen(Qt.white)
-        painter.drawText(10, 20, self.title)
+        # keep the title inside the header so it never paints past the node
+        title_rect = QRectF(10, 0, self.width - 20, 25)
+        if self._title_text is None:
+            self._title_text = th.elided(self.title, title_rect.width())
+        painter.setFont(th.font)
+        painter.setPen(th.title_pen)
+        painter.drawText(title_rect, Qt.AlignVCenter | Qt.AlignLeft, self._title_text)
 
     def itemChange(self, change, value):
+        # called for every change of every node (about a dozen while one is
+        # created), so skip the rest quickly
+        if change not in _NODE_CHANGES:
+            return super().itemChange(change, value)
+
         # Intercept the proposed position so we can snap it to the grid.
-        if change == QGraphicsItem.ItemPositionChange:
+        if change == _POSITION_CHANGE:
             grid = 20
             # `value` is the proposed new position (QPointF)
             try:
@@ -101,62 +253,226 @@ class Node(QGraphicsItem):
                 return value
 
         # After the position has changed, update connected edges' geometry.
-        if change == QGraphicsItem.ItemPositionHasChanged:
-            for socket in self.sockets:
-                for edge in socket.edges:
-                    edge.update_path()
+        # Updates are queued so an edge shared by several moving nodes is
+        # only recomputed once per frame.
+        if change == _POSITION_HAS_CHANGED:
+            scene = self.scene()
+            model = _scene_model(scene)
+            if model is not None and model.contains(self.record):
+                model.move_node(self.record.id, value.x(), value.y())
+            elif self.record.id is None:
+                self.record.x = value.x()
+                self.record.y = value.y()
+            if scene is None:
+                for socket in self.sockets:
+                    for edge in socket.edges:
+                        edge.update_path()
+            else:
+                queue = EdgeUpdateQueue.for_scene(scene)
+                for socket in self.sockets:
+                    queue.add(socket.edges)
+                SocketIndex.for_scene(scene).update_node(self)
+
+        # keep the scene's socket index in step with the node's membership,
+        # and add new nodes to the scene's model
+        if change == _SCENE_CHANGE:
+            old_scene = self.scene()
+            if old_scene is not None:
+                SocketIndex.for_scene(old_scene).remove_node(self)
+        elif change == _SCENE_HAS_CHANGED:
+            if value is not None:
+                self.set_cache_mode(_node_cache_mode(value))
+                SocketIndex.for_scene(value).update_node(self)
+                model = _scene_model(value)
+                if model is not None:
+                    if not model.contains(self.record):
+                        model.adopt(self.record)
+                    pos = self.pos()
+                    if (pos.x(), pos.y()) != (self.record.x, self.record.y):
+                        # snapped to the grid while outside the scene
+                        model.move_node(self.record.id, pos.x(), pos.y())
+                observer = _graph_observer(value)
+                if observer is not None:
+                    observer.node_added(self)
 
         return super().itemChange(change, value)
 
     def mousePressEvent(self, event):
         # Ctrl+LeftClick deletes the node and any connected edges
         if event.button() == Qt.LeftButton and (event.modifiers() & Qt.ControlModifier):
-            scene = self.scene()
+            delete_nodes(self.scene(), [self])
+            event.accept()
+        else:
+            super().mousePressEvent(event)
 
-            # collect unique edges connected to any socket
-            edges_to_remove = set()
-            for sock in self.sockets:
-                for e in list(sock.edges):
-                    edges_to_remove.add(e)
 
-            for e in edges_to_remove:
-                # remove from start socket list
-                try:
-                    if hasattr(e.start, 'edges') and e in e.start.edges:
-                        e.start.edges.remove(e)
-                except Exception:
-                    pass
+class EdgeUpdateQueue:
+    """Per-scene set of edges whose endpoints moved, recomputed once per flush.
+
+    The queue flushes itself on the next event-loop pass; GraphicsScene also
+    flushes it at the end of each mouse move so dragged edges never lag a
+    frame behind their nodes.
+    """
+
+    def __init__(self, scene):
+        # dict as an insertion-ordered set
+        self._dirty = {}
+        self._timer = QTimer(scene)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+
+    @classmethod
+    def for_scene(cls, scene):
+        queue = getattr(scene, '_edge_update_queue', None)
+        if queue is None:
+            queue = cls(scene)
+            scene._edge_update_queue = queue
+        return queue
+
+    @classmethod
+    def flush_scene(cls, scene):
+        queue = getattr(scene, '_edge_update_queue', None)
+        if queue is not None:
+            queue.flush()
+
+    def add(self, edges):
+        for edge in edges:
+            self._dirty[edge] = None
+        if self._dirty and not self._timer.isActive():
+            self._timer.start()
+
+    def discard(self):
+        """Forget pending updates, e.g. after the edges were deleted."""
+        self._dirty.clear()
+        self._timer.stop()
+
+    def flush(self):
+        if not self._dirty:
+            return
+        self._timer.stop()
+        dirty, self._dirty = self._dirty, {}
+        for edge in dirty:
+            # skip edges deleted since they were queued
+            if edge._layer is None and edge.scene() is None:
+                continue
+            edge.update_path()
 
-                # remove from end socket list if it's a socket
-                try:
-                    if isinstance(e.end, QGraphicsItem) and hasattr(e.end, 'edges') and e in e.end.edges:
-                        e.end.edges.remove(e)
-                except Exception:
-                    pass
 
-                # remove the edge graphics item from the scene
-                try:
-                    scene.removeItem(e)
-                except Exception:
-                    pass
+class _PopupComboBox(QComboBox):
+    """Combo box that reports when its popup closes, chosen or not."""
+    popupHidden = Signal()
 
-            # finally remove the node itself
-            try:
-                scene.removeItem(self)
-            except Exception:
-                pass
+    def hidePopup(self):
+        super().hidePopup()
+        self.popupHidden.emit()
 
-            event.accept()
+
+class SocketEditor:
+    """The scene's one line edit and one combo box for editing socket values.
+
+    Value sockets paint their own value; only the socket being edited gets
+    a real widget, which is moved onto it and hidden again afterwards.
+    """
+
+    def __init__(self, scene):
+        self._socket = None
+
+        self._line_edit = QLineEdit()
+        self._line_edit.setFixedSize(60, 18)
+        self._line_edit.setStyleSheet(
+            "QLineEdit { background-color: #3c3c3c; color: white; border: 1px solid white; padding: 2px; margin: 0px; }"
+        )
+        self._line_edit.textEdited.connect(self._on_text_edited)
+        self._line_edit.editingFinished.connect(self.finish)
+
+        self._combo_box = _PopupComboBox()
+        self._combo_box.addItems(EVAL_OPERATORS)
+        self._combo_box.setFixedSize(55, 18)
+        self._combo_box.setStyleSheet(
+            "QComboBox { background-color: #3c3c3c; color: white; border: 1px solid white; padding: 2px; margin: 0px; }"
+            "QComboBox::drop-down { border: none; }"
+            "QComboBox QAbstractItemView { background-color: #3c3c3c; color: white; selection-background-color: #0066cc; }"
+        )
+        self._combo_box.activated.connect(self._on_eval_chosen)
+        self._combo_box.popupHidden.connect(self.finish)
+
+        self._line_proxy = scene.addWidget(self._line_edit)
+        self._combo_proxy = scene.addWidget(self._combo_box)
+        for proxy in (self._line_proxy, self._combo_proxy):
+            proxy.setZValue(1000)
+            proxy.hide()
+
+    @classmethod
+    def for_scene(cls, scene):
+        """Return the scene's editor, creating it on first use."""
+        editor = getattr(scene, '_socket_editor', None)
+        if editor is None or not editor._alive(scene):
+            editor = cls(scene)
+            scene._socket_editor = editor
+        return editor
+
+    def _alive(self, scene):
+        # the proxies go away with scene.clear(); start over if they did
+        try:
+            return self._line_proxy.scene() is scene and self._combo_proxy.scene() is scene
+        except RuntimeError:
+            return False
+
+    def editing(self):
+        return self._socket
+
+    def begin(self, socket):
+        """Move the matching editor onto `socket` and give it focus."""
+        self.finish()
+        self._socket = socket
+        pos = socket.mapToScene(socket._value_rect().topLeft())
+        if socket.type.shape == "TextInput":
+            self._line_edit.setPlaceholderText(socket.name)
+            self._line_edit.setText(socket.get_text_value() or "")
+            self._line_proxy.setPos(pos)
+            self._line_proxy.show()
+            self._line_proxy.setFocus()
+            self._line_edit.setFocus()
+            self._line_edit.selectAll()
         else:
-            super().mousePressEvent(event)
+            self._combo_box.setCurrentText(socket.get_eval_value() or EVAL_OPERATORS[0])
+            self._combo_proxy.setPos(pos)
+            self._combo_proxy.show()
+            self._combo_box.showPopup()
+
+    def finish(self):
+        """Hide the editor; values are written to the socket as they change."""
+        if self._socket is None:
+            return
+        self._socket = None
+        self._line_proxy.hide()
+        self._combo_proxy.hide()
+
+    def _on_text_edited(self, text):
+        if self._socket is not None:
+            self._socket.set_text_value(text)
+
+    def _on_eval_chosen(self, index):
+        if self._socket is not None:
+            self._socket.set_eval_value(self._combo_box.itemText(index))
 
 
 class Socket(QGraphicsItem):
-    def __init__(self, parent, x, y, type, name=""):
+    # how far (scene units) a dragged edge reaches for a compatible socket
+    snap_radius = 24.0
+    # room around the socket for the snap highlight ring
+    highlight_margin = 3.0
+    # widest live value painted beside an output socket
+    preview_width = 120.0
+
+    def __init__(self, parent, x, y, type, name="", port=None):
         super().__init__(parent)
 
         self.radius = 6
-        self.edges = []
+        # Edge views ending here (connected, dragged or stubs); a set so
+        # adding and removing one is constant time
+        self.edges = set()
 
         self.setPos(x, y)
         # allow the socket to handle mouse interactions
@@ -166,116 +482,230 @@ class Socket(QGraphicsItem):
         # transient fields used during drag
         self._dragging = False
         self._drag_edge = None
+        # compatible socket the drag is currently snapped to
+        self._snap_target = None
+        # drawn with a ring while it is the snap target of a drag
+        self._highlighted = False
 
         # store the socket data type and name on the instance
         self.type = type
         self.name = name
+        # the PortRecord this socket shows; it holds direction and value
+        if port is None:
+            port = PortRecord(None, 0, name, type.name, type.shape, x <= 0)
+        self.port = port
+
+        # the label is painted beside the socket, so its rect is part of the
+        # socket's bounds; measure it once instead of on every paint
+        self._label_rect = self._compute_label_rect(x <= 0)
         
-        # create input widget if needed (TextInput or EvalInput)
-        self._text_input = None
-        self._combo_box = None
-        self._proxy = None
-        if self.type.shape == "TextInput":
-            self._setup_text_input()
-        elif self.type.shape == "EvalInput":
-            self._setup_eval_input()
-
-    def _setup_text_input(self):
-        """Create and set up the text input widget"""
-        self._text_input = QLineEdit()
-        self._text_input.setPlaceholderText(self.name)
-        self._text_input.setFixedSize(60, 18)
-        self._text_input.setStyleSheet(
-            "QLineEdit { background-color: #3c3c3c; color: white; border: 1px solid white; padding: 2px; margin: 0px; }"
+        # value sockets (TextInput or EvalInput) paint their port's value
+        # themselves; the scene's shared SocketEditor is only moved onto them
+        # while editing. Elided text painted in the value box, recomputed
+        # when the value changes:
+        self._value_text = None
+
+        # live value of an output socket (see LivePreview), elided, and
+        # the rect it is painted in beside the socket; empty when hidden
+        self._preview = None
+        self._preview_rect = QRectF()
+        # boundingRect(), asked for often while the scene index is built
+        self._bounds = None
+
+    @property
+    def _value(self):
+        return self.port.value
+
+    def is_value_socket(self):
+        return self.type.shape == "TextInput" or self.type.shape == "EvalInput"
+
+    def _value_rect(self):
+        # to the right of the socket, inside the node
+        if self.type.shape == "EvalInput":
+            return QRectF(8, -9, 55, 18)
+        return QRectF(8, -9, 60, 18)
+
+    def theme_changed(self):
+        """Measure the label and value text again with the current theme."""
+        self.prepareGeometryChange()
+        self._label_rect = self._compute_label_rect(self.port.is_input)
+        self._value_text = None
+        self._bounds = None
+        self.update()
+
+    def _compute_label_rect(self, is_input):
+        if not self.name or self.type.shape in ("TextInput", "EvalInput"):
+            return QRectF()
+        th = theme()
+        text_w = th.label_width(self.name)
+        # tall enough for the glyphs so nothing is painted outside the bounds
+        text_h = max(self.radius * 2, th.metrics.height())
+        if is_input:
+            # input socket: label to the right
+            return QRectF(self.radius + 6, -text_h / 2, text_w, text_h)
+        # output socket: label to the left (inside node)
+        return QRectF(-text_w - self.radius - 6, -text_h / 2, text_w, text_h)
+
+    def _shape_rect(self):
+        return QRectF(
+            -self.radius,
+            -self.radius,
+            self.radius * 2,
+            self.radius * 2
         )
-        
-        # Create proxy widget to embed QLineEdit in the graphics scene
-        self._proxy = QGraphicsProxyWidget(self)
-        self._proxy.setWidget(self._text_input)
-        # Position the proxy to the right of the socket, inside the node
-        self._proxy.setPos(8, -9)
-
-    def _setup_eval_input(self):
-        """Create and set up the evaluation dropdown widget"""
-        self._combo_box = QComboBox()
-        self._combo_box.addItems(["==", ">=", "<=", "!="])
-        self._combo_box.setFixedSize(55, 18)
-        self._combo_box.setStyleSheet(
-            "QComboBox { background-color: #3c3c3c; color: white; border: 1px solid white; padding: 2px; margin: 0px; }"
-            "QComboBox::drop-down { border: none; }"
-            "QComboBox QAbstractItemView { background-color: #3c3c3c; color: white; selection-background-color: #0066cc; }"
-        )
-        
-        # Create proxy widget to embed QComboBox in the graphics scene
-        self._proxy = QGraphicsProxyWidget(self)
-        self._proxy.setWidget(self._combo_box)
-        # Position the proxy to the right of the socket, inside the node
-        self._proxy.setPos(8, -9)
 
     def boundingRect(self):
+        if self._bounds is None:
+            if self.type.shape == "TextInput" or self.type.shape == "EvalInput":
+                # Return bounding rect for input widgets
+                self._bounds = QRectF(8, -9, 60, 18)
+            else:
+                # leave room for the snap highlight ring
+                m = self.highlight_margin
+                self._bounds = self._shape_rect().adjusted(-m, -m, m, m).united(self._label_rect).united(self._preview_rect)
+        return self._bounds
+
+    def set_highlighted(self, highlighted):
+        if highlighted != self._highlighted:
+            self._highlighted = highlighted
+            self.update()
+
+    def shape(self):
+        # only the socket itself is interactive, not its label
+        path = QPainterPath()
         if self.type.shape == "TextInput" or self.type.shape == "EvalInput":
-            # Return bounding rect for input widgets
-            return QRectF(8, -9, 60, 18)
+            path.addRect(self.boundingRect())
         else:
-            return QRectF(
-                -self.radius,
-                -self.radius,
-                self.radius * 2,
-                self.radius * 2
-            )
+            path.addRect(self._shape_rect())
+        return path
 
     def paint(self, painter, option, widget=None):
         if self.type.shape == "TextInput" or self.type.shape == "EvalInput":
-            # Don't paint anything here; the widgets are handled by proxy
+            self._paint_value(painter, option)
             return
         
-        painter.setBrush(QColor(self.type.color))
+        th = theme()
+        painter.setBrush(th.type_style(self.type).brush)
         painter.setPen(Qt.NoPen)
         
         if self.type.shape == "Rect":
-            painter.drawRect(self.boundingRect())
+            painter.drawRect(self._shape_rect())
         else:
-            painter.drawEllipse(self.boundingRect())
+            painter.drawEllipse(self._shape_rect())
+
+        if self._highlighted:
+            painter.setPen(th.snap_pen)
+            painter.setBrush(Qt.NoBrush)
+            painter.drawEllipse(self._shape_rect().adjusted(-2, -2, 2, 2))
 
         # draw the socket label next to the socket
-        if getattr(self, 'name', ''):
-            painter.setPen(Qt.white)
-            metrics = painter.fontMetrics()
-            text_w = metrics.horizontalAdvance(self.name)
+        if not self._label_rect.isEmpty() and _lod(painter, option) >= LOD_THRESHOLDS["socket_labels"]:
+            painter.setFont(th.font)
+            painter.setPen(th.label_pen)
             if self.pos().x() <= 0:
-                # input socket: label to the right
-                rect = QRectF(self.radius + 6, -self.radius, text_w, self.radius * 2)
-                painter.drawText(rect, Qt.AlignVCenter | Qt.AlignLeft, self.name)
+                painter.drawText(self._label_rect, Qt.AlignVCenter | Qt.AlignLeft, self.name)
             else:
-                # output socket: label to the left (inside node)
-                rect = QRectF(-text_w - self.radius - 6, -self.radius, text_w, self.radius * 2)
-                painter.drawText(rect, Qt.AlignVCenter | Qt.AlignRight, self.name)
+                painter.drawText(self._label_rect, Qt.AlignVCenter | Qt.AlignRight, self.name)
+
+        if self._preview is not None and _lod(painter, option) >= LOD_THRESHOLDS["socket_labels"]:
+            painter.setFont(th.font)
+            painter.setPen(th.placeholder_pen)
+            painter.drawText(self._preview_rect, Qt.AlignVCenter | Qt.AlignLeft, self._preview)
+
+    def set_preview(self, text):
+        """Show `text` beside the socket, outside the node; None hides it."""
+        if text is not None:
+            text = theme().elided(text, self.preview_width)
+        if text == self._preview:
+            return
+        self.prepareGeometryChange()
+        self._preview = text
+        self._bounds = None
+        if text is None:
+            self._preview_rect = QRectF()
+        else:
+            th = theme()
+            # not label_width(): values change too often to be worth caching
+            text_h = max(self.radius * 2, th.metrics.height())
+            self._preview_rect = QRectF(self.radius + 6, -text_h / 2, th.metrics.horizontalAdvance(text), text_h)
+        self.update()
+
+    def _paint_value(self, painter, option):
+        th = theme()
+        rect = self._value_rect()
+        painter.setPen(th.value_box_pen)
+        painter.setBrush(th.value_box_brush)
+        painter.drawRect(rect)
+
+        if _lod(painter, option) < LOD_THRESHOLDS["editors"]:
+            return
+
+        text_rect = rect.adjusted(3, 0, -3, 0)
+        if self.type.shape == "EvalInput":
+            # leave room for the drop-down arrow
+            arrow_x = text_rect.right() - 4
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(th.value_arrow_brush)
+            painter.drawPolygon([
+                QPointF(arrow_x - 3, -1.5), QPointF(arrow_x + 3, -1.5), QPointF(arrow_x, 2.5)
+            ])
+            text_rect.setRight(arrow_x - 5)
+
+        if self._value_text is None:
+            # empty text input: show the socket name as a placeholder
+            self._value_text = th.elided(self._value or self.name, text_rect.width())
+        painter.setFont(th.font)
+        painter.setPen(th.value_text_pen if self._value else th.placeholder_pen)
+        painter.drawText(text_rect, Qt.AlignVCenter | Qt.AlignLeft, self._value_text)
 
     def get_text_value(self):
         """Get the value from the text input if it exists"""
-        if self._text_input is not None:
-            return self._text_input.text()
+        if self.type.shape == "TextInput":
+            return self._value
         return None
 
     def set_text_value(self, value):
         """Set the value of the text input if it exists"""
-        if self._text_input is not None:
-            self._text_input.setText(str(value))
+        if self.type.shape == "TextInput":
+            value = str(value)
+            if value != self.port.value:
+                self._set_port_value(value)
+                self._value_text = None
+                self.update()
 
     def get_eval_value(self):
         """Get the selected value from the eval dropdown if it exists"""
-        if self._combo_box is not None:
-            return self._combo_box.currentText()
+        if self.type.shape == "EvalInput":
+            return self._value
         return None
 
     def set_eval_value(self, value):
         """Set the value of the eval dropdown if it exists"""
-        if self._combo_box is not None:
-            index = self._combo_box.findText(str(value))
-            if index >= 0:
-                self._combo_box.setCurrentIndex(index)
+        if self.type.shape == "EvalInput":
+            value = str(value)
+            if value in EVAL_OPERATORS and value != self.port.value:
+                self._set_port_value(value)
+                self._value_text = None
+                self.update()
+
+    def _set_port_value(self, value):
+        # through the model when the port is part of it, so its listeners
+        # (e.g. live previews) hear about the edit
+        model = _scene_model(self.scene())
+        node = self.port.node
+        if model is not None and node is not None and model.nodes.get(node.id) is node:
+            model.set_value(self.port, value)
+        else:
+            self.port.value = value
 
     def mousePressEvent(self, event):
+        # value sockets are edited with the scene's shared editor
+        if event.button() == Qt.LeftButton and self.is_value_socket():
+            scene = self.scene()
+            if scene is not None:
+                SocketEditor.for_scene(scene).begin(self)
+            event.accept()
+            return
         # start a drag to create a temporary edge
         if event.button() == Qt.LeftButton:
             self._dragging = True
@@ -283,17 +713,56 @@ class Socket(QGraphicsItem):
             # create an edge with current mouse position as the end
             self._drag_edge = Edge(self, event.scenePos(), self.type)
             scene.addItem(self._drag_edge)
-            # register edge with self (only once)
-            if self._drag_edge not in self.edges:
-                self.edges.append(self._drag_edge)
+            # register edge with self
+            self.edges.add(self._drag_edge)
             event.accept()
         else:
             super().mousePressEvent(event)
 
+    def _find_snap_target(self, scene_pos):
+        """Nearest socket the drag can connect to, directly or else through a cast node."""
+        scene = self.scene()
+        if scene is None:
+            return None
+        index = SocketIndex.for_scene(scene)
+        tid = type_id(self.type)
+        # inputs connect to outputs only
+        wanted = not self.port.is_input
+        target = index.nearest(scene_pos, compatible_ids(tid), self.snap_radius, exclude=self, is_input=wanted)
+        if target is None:
+            target = index.nearest(scene_pos, cast_ids(tid, self.port.is_input), self.snap_radius,
+                                   exclude=self, is_input=wanted)
+        return target
+
+    def cast_to(self, target):
+        """Node type that has to go between this socket and `target`, or None."""
+        if self.port.is_input:
+            return cast_node(type_id(target.type), type_id(self.type))
+        return cast_node(type_id(self.type), type_id(target.type))
+
+    def offer_cast(self, cast, screen_pos):
+        """Ask whether to connect through a `cast` node; True to insert it."""
+        menu = QMenu()
+        insert = menu.addAction("Insert %s" % cast)
+        menu.addAction("Cancel")
+        return menu.exec(screen_pos) is insert
+
+    def _set_snap_target(self, target):
+        if target is not self._snap_target:
+            if self._snap_target is not None:
+                self._snap_target.set_highlighted(False)
+            if target is not None:
+                target.set_highlighted(True)
+            self._snap_target = target
+
     def mouseMoveEvent(self, event):
         if self._dragging and self._drag_edge is not None:
-            # update temporary edge to follow cursor
-            self._drag_edge.set_end_point(event.scenePos())
+            # update temporary edge to follow cursor, snapping onto the
+            # nearest compatible socket when one is within reach
+            target = self._find_snap_target(event.scenePos())
+            self._set_snap_target(target)
+            end = target.scenePos() if target is not None else event.scenePos()
+            self._drag_edge.set_end_point(end)
             self._drag_edge.update_path()
             event.accept()
         else:
@@ -302,21 +771,22 @@ class Socket(QGraphicsItem):
     def mouseReleaseEvent(self, event):
         if self._dragging and self._drag_edge is not None:
             scene = self.scene()
-            # find a socket under the release position (excluding self)
-            items = scene.items(event.scenePos())
-            target = None
-            for it in items:
-                if isinstance(it, Socket) and it is not self:
-                    target = it
-                    if target.type.name != self.type.name and target.type.name != "Any" :
-                        target = None
-                    break
+            # connect to the snapped socket, or the nearest compatible one
+            # around the release position
+            target = self._snap_target or self._find_snap_target(event.scenePos())
+            self._set_snap_target(None)
+            cast = self.cast_to(target) if target is not None else None
 
-            if target is not None:
+            if target is not None and cast is None:
                 # complete the connection
                 self._drag_edge.set_end_socket(target)
-                if self._drag_edge not in target.edges:
-                    target.edges.append(self._drag_edge)
+                target.edges.add(self._drag_edge)
+                # hand the finished edge to the edge layer if the scene uses one
+                add_edge(scene, self._drag_edge)
+                _register_connection(scene, self._drag_edge)
+                observer = _graph_observer(scene)
+                if observer is not None:
+                    observer.edge_connected(self._drag_edge)
                 # ensure path is updated
                 self._drag_edge.update_path()
             else:
@@ -325,10 +795,12 @@ class Socket(QGraphicsItem):
                     scene.removeItem(self._drag_edge)
                 except Exception:
                     pass
-                try:
-                    self.edges.remove(self._drag_edge)
-                except ValueError:
-                    pass
+                self.edges.discard(self._drag_edge)
+                if cast is not None and self.offer_cast(cast, event.screenPos()):
+                    if self.port.is_input:
+                        insert_cast(scene, target, self, cast)
+                    else:
+                        insert_cast(scene, self, target, cast)
 
             self._drag_edge = None
             self._dragging = False
@@ -346,6 +818,13 @@ class Edge(QGraphicsPathItem):
         self.start = start
         self.end = end
         self._end_point = None
+        # straight start->end segment used for low level-of-detail painting
+        self._line = None
+        # EdgeLayer drawing this edge, if any; the edge is then not a scene item
+        self._layer = None
+        # the ConnectionRecord this edge shows, once it connects two sockets
+        # of nodes in a scene's model
+        self.connection = None
         
         self.type = type
 
@@ -354,19 +833,32 @@ class Edge(QGraphicsPathItem):
             self._end_point = end
         else:
             # if a Socket, ensure this edge is registered on it
-            if hasattr(end, 'edges') and self not in end.edges:
-                end.edges.append(self)
+            if hasattr(end, 'edges'):
+                end.edges.add(self)
 
-        # register on start socket if needed
-        if hasattr(start, 'edges') and self not in start.edges:
-            start.edges.append(self)
+        # register on start socket
+        if hasattr(start, 'edges'):
+            start.edges.add(self)
 
-        self.setPen(QPen(QColor(self.type.color), 2.5))
+        self.setPen(theme().type_style(self.type).edge_pen)
         self.setZValue(-1)
         # ensure edge receives mouse events so it can be deleted
         self.setAcceptedMouseButtons(Qt.LeftButton)
 
-        self.update_path()
+        # a scene being bulk-populated computes every new path in one pass
+        scene = start.scene() if isinstance(start, QGraphicsItem) else None
+        if _populating(scene):
+            EdgeUpdateQueue.for_scene(scene).add((self,))
+        else:
+            self.update_path()
+
+    def paint(self, painter, option, widget=None):
+        if _lod(painter, option) < LOD_THRESHOLDS["edge_curves"] and self._line is not None:
+            # zoomed out: the curve's shape isn't readable, a line is cheaper
+            painter.setPen(self.pen())
+            painter.drawLine(self._line)
+            return
+        super().paint(painter, option, widget)
 
     def set_end_point(self, point):
         self._end_point = point
@@ -378,6 +870,18 @@ class Edge(QGraphicsPathItem):
         self._end_point = None
 
     def update_path(self):
+        if self._layer is not None:
+            self._layer.mark_dirty(self)
+            return
+
+        geometry = self.compute_geometry()
+        if geometry is None:
+            return
+        path, self._line = geometry
+        self.setPath(path)
+
+    def compute_geometry(self):
+        """Return the (cubic path, straight line) between the endpoints, or None."""
         path = QPainterPath()
 
         p1 = self.start.scenePos()
@@ -389,7 +893,7 @@ class Edge(QGraphicsPathItem):
             p2 = self._end_point
 
         if p2 is None:
-            return
+            return None
 
         path.moveTo(p1)
 
@@ -401,27 +905,343 @@ class Edge(QGraphicsPathItem):
             p2.x(), p2.y()
         )
 
-        self.setPath(path)
+        return path, QLineF(p1, p2)
+
+    def itemChange(self, change, value):
+        if change == _SCENE_HAS_CHANGED and value is not None:
+            _register_connection(value, self)
+        return super().itemChange(change, value)
+
+    def remove(self):
+        """Delete the edge: drop its connection from the model, then detach it."""
+        remove_edges(self.scene() or (self._layer.scene() if self._layer is not None else None), [self])
+
+    def detach(self):
+        """Disconnect the edge from its sockets and take it out of the scene or edge layer."""
+        # remove from connected sockets
+        if hasattr(self.start, 'edges'):
+            self.start.edges.discard(self)
+        if isinstance(self.end, QGraphicsItem) and hasattr(self.end, 'edges'):
+            self.end.edges.discard(self)
+        if self._layer is not None:
+            self._layer.release(self)
+        scene = self.scene()
+        if scene is not None:
+            scene.removeItem(self)
 
     def mousePressEvent(self, event):
         # Alt+LeftClick deletes the edge
         if event.button() == Qt.LeftButton and (event.modifiers() & Qt.AltModifier):
-            scene = self.scene()
-            # remove from connected sockets lists
-            if hasattr(self.start, 'edges') and self in self.start.edges:
-                try:
-                    self.start.edges.remove(self)
-                except ValueError:
-                    pass
-            if isinstance(self.end, QGraphicsItem) and hasattr(self.end, 'edges') and self in self.end.edges:
-                try:
-                    self.end.edges.remove(self)
-                except ValueError:
-                    pass
             try:
-                scene.removeItem(self)
+                self.remove()
             except Exception:
                 pass
             event.accept()
         else:
             super().mousePressEvent(event)
+
+
+def remove_edges(scene, edges):
+    """Delete several edges of `scene` at once, dropping their connections from its model."""
+    edges = list(edges)
+    observer = _graph_observer(scene)
+    if observer is not None:
+        for edge in edges:
+            observer.edge_removed(edge)
+    model = _scene_model(scene)
+    if model is not None:
+        model.disconnect_many([edge.connection.id for edge in edges if edge.connection is not None])
+    # release layered edges in one go so the layer's bounds are recomputed once
+    layer = getattr(scene, 'edge_layer', None)
+    if layer is not None:
+        layer.release_many([edge for edge in edges if edge._layer is layer])
+    for edge in edges:
+        edge.connection = None
+        edge.detach()
+
+
+def delete_nodes(scene, nodes):
+    """Delete nodes with all their edges from `scene` and its model."""
+    nodes = list(nodes)
+    edges = set()
+    for node in nodes:
+        for sock in node.sockets:
+            edges.update(sock.edges)
+    remove_edges(scene, edges)
+
+    observer = _graph_observer(scene)
+    if observer is not None:
+        for node in nodes:
+            observer.node_deleted(node)
+    model = _scene_model(scene)
+    if model is not None:
+        model.remove_nodes([node.record.id for node in nodes])
+
+    for node in nodes:
+        if node.scene() is not None:
+            node.scene().removeItem(node)
+
+
+def _register_connection(scene, edge):
+    """Give a socket-to-socket edge a connection in the scene's model, if it has none yet."""
+    if edge.connection is not None or not isinstance(edge.start, Socket) or not isinstance(edge.end, Socket):
+        return
+    model = _scene_model(scene)
+    if model is None:
+        return
+    start = edge.start.parentItem().record
+    end = edge.end.parentItem().record
+    if model.contains(start) and model.contains(end):
+        edge.connection = model.connect(start.id, edge.start.port.index, end.id, edge.end.port.index, edge.type.name)
+
+
+def add_edge(scene, edge):
+    """Put a connected edge into `scene`, via the scene's EdgeLayer when it has one."""
+    layer = getattr(scene, 'edge_layer', None)
+    if layer is not None and isinstance(edge.end, Socket):
+        if edge.scene() is not None:
+            edge.scene().removeItem(edge)
+        layer.adopt(edge)
+        _register_connection(scene, edge)
+    elif edge.scene() is not scene:
+        scene.addItem(edge)
+
+
+def connect_sockets(scene, start, end):
+    """Add an Edge between two sockets of nodes in `scene` and register it like a dragged one."""
+    edge = Edge(start, end, start.type)
+    add_edge(scene, edge)
+    observer = _graph_observer(scene)
+    if observer is not None:
+        observer.edge_connected(edge)
+    return edge
+
+
+def insert_cast(scene, source, target, cast):
+    """Connect output `source` to input `target` through a new `cast` node between them; returns the node."""
+    node = Node(node_spec(cast))
+    a, b = source.scenePos(), target.scenePos()
+    node.setPos((a.x() + b.x() - node.width) / 2, (a.y() + b.y()) / 2 - node.sockets[0].y())
+    scene.addItem(node)
+    # cast nodes have one input followed by one output
+    connect_sockets(scene, source, node.sockets[0])
+    connect_sockets(scene, node.sockets[1], target)
+    return node
+
+
+class EdgeLayer(QGraphicsItem):
+    """One scene item that draws every connected edge.
+
+    Edges adopted by the layer are not scene items themselves, so they
+    don't populate the scene index or get painted one by one. The layer
+    keeps each edge's curve, recomputes it only when the edge is marked
+    dirty (one of its endpoints moved), and paints only the curves that
+    cross the exposed rect, setting the pen once per color. Curve bounds
+    are bucketed into square cells of ``cell_size`` scene units, like
+    SocketIndex does with sockets, so painting a small region or finding
+    the edge under the mouse only looks at the edges near it.
+    """
+
+    # distance in scene units within which a click hits an edge
+    hit_tolerance = 5.0
+    cell_size = 200.0
+
+    def __init__(self):
+        super().__init__()
+        self.setZValue(-1)
+        # Alt+LeftClick on an edge deletes it
+        self.setAcceptedMouseButtons(Qt.LeftButton)
+        # paint() only draws what option.exposedRect covers
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+
+        # Edge -> (path, line, bounds), or None until its curve is computed;
+        # bounds are padded for the pen width and the hit tolerance, so a
+        # straight edge's aren't empty
+        self._geometry = {}
+        # (cx, cy) -> set of edges whose bounds overlap the cell
+        self._cells = {}
+        # Edge -> cells it is in
+        self._where = {}
+        # bounds of every curve; they only grow as edges come and move, and
+        # are fitted again once enough edges were released (see release_many)
+        self._bounds = QRectF()
+        self._released = 0
+
+    def edges(self):
+        return list(self._geometry)
+
+    def _keys(self, rect):
+        size = self.cell_size
+        cx0, cy0 = math.floor(rect.left() / size), math.floor(rect.top() / size)
+        cx1, cy1 = math.floor(rect.right() / size), math.floor(rect.bottom() / size)
+        return [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+
+    def _near(self, rect):
+        """Edges in the cells overlapping the scene rect."""
+        found = set()
+        cells = self._cells
+        for key in self._keys(rect):
+            edges = cells.get(key)
+            if edges:
+                found.update(edges)
+        return found
+
+    def _index(self, edge, bounds):
+        self._unindex(edge)
+        keys = self._keys(bounds)
+        for key in keys:
+            edges = self._cells.get(key)
+            if edges is None:
+                edges = self._cells[key] = set()
+            edges.add(edge)
+        self._where[edge] = keys
+
+    def _unindex(self, edge):
+        for key in self._where.pop(edge, ()):
+            edges = self._cells.get(key)
+            if edges is not None:
+                edges.discard(edge)
+                if not edges:
+                    del self._cells[key]
+
+    def edges_in_rect(self, rect):
+        """Edges whose curve's bounding box intersects the scene rect."""
+        geometry = self._geometry
+        return [edge for edge in self._near(rect) if geometry[edge] is not None and geometry[edge][2].intersects(rect)]
+
+    def adopt(self, edge):
+        edge._layer = self
+        self._geometry[edge] = None
+        scene = self.scene()
+        if _populating(scene):
+            EdgeUpdateQueue.for_scene(scene).add((edge,))
+        else:
+            self.mark_dirty(edge)
+
+    def release(self, edge):
+        self.release_many([edge])
+
+    def release_many(self, edges):
+        """Stop drawing several edges.
+
+        The layer's bounds are refitted (a pass over every edge) only once
+        as many edges were released since the last time as are left, so
+        releasing edges one by one costs O(1) per edge on average.
+        """
+        for edge in edges:
+            entry = self._geometry.pop(edge, False)
+            if entry is False:
+                continue
+            edge._layer = None
+            self._unindex(edge)
+            self._released += 1
+            if entry is not None:
+                self.update(entry[2])
+        if self._released > len(self._geometry):
+            self._recompute_bounds()
+
+    def clear(self):
+        for edge in self._geometry:
+            edge._layer = None
+        self._geometry.clear()
+        self._cells.clear()
+        self._where.clear()
+        self._recompute_bounds()
+
+    def mark_dirty(self, edge):
+        """Recompute one edge's curve after an endpoint moved."""
+        geometry = edge.compute_geometry()
+        if geometry is None:
+            return
+        path, line = geometry
+        m = self.hit_tolerance + 2
+        bounds = path.boundingRect().adjusted(-m, -m, m, m)
+        old = self._geometry.get(edge)
+        self._geometry[edge] = (path, line, bounds)
+        self._index(edge, bounds)
+        if not self._bounds.contains(bounds):
+            self.prepareGeometryChange()
+            self._bounds = self._bounds.united(bounds) if not self._bounds.isNull() else bounds
+        # repaint where the curve was and where it is now
+        self.update(bounds)
+        if old is not None:
+            self.update(old[2])
+
+    def _recompute_bounds(self):
+        self._released = 0
+        bounds = QRectF()
+        for entry in self._geometry.values():
+            if entry is not None:
+                bounds = bounds.united(entry[2]) if not bounds.isNull() else entry[2]
+        self.prepareGeometryChange()
+        self._bounds = bounds
+        self.update()
+
+    def boundingRect(self):
+        return self._bounds
+
+    def paint(self, painter, option, widget=None):
+        visible = option.exposedRect if not option.exposedRect.isEmpty() else self.boundingRect()
+        geometry = self._geometry
+        # color -> (pen, entries), so each pen is set once
+        groups = {}
+        for edge in self._near(visible):
+            entry = geometry[edge]
+            if entry is None or not entry[2].intersects(visible):
+                continue
+            pen = edge.pen()
+            group = groups.get(pen.color().rgba())
+            if group is None:
+                group = groups[pen.color().rgba()] = (pen, [])
+            group[1].append(entry)
+
+        straight = _lod(painter, option) < LOD_THRESHOLDS["edge_curves"]
+        painter.setBrush(Qt.NoBrush)
+        for pen, entries in groups.values():
+            painter.setPen(pen)
+            if straight:
+                painter.drawLines([entry[1] for entry in entries])
+            else:
+                for entry in entries:
+                    painter.drawPath(entry[0])
+
+    def edge_at(self, pos):
+        """Return the edge under scene position `pos`, or None."""
+        edges = self._cells.get((math.floor(pos.x() / self.cell_size), math.floor(pos.y() / self.cell_size)))
+        if not edges:
+            return None
+        stroker = None
+        for edge in edges:
+            entry = self._geometry[edge]
+            if entry is None:
+                continue
+            path, line, bounds = entry
+            if not bounds.contains(pos):
+                continue
+            if stroker is None:
+                stroker = QPainterPathStroker()
+                stroker.setWidth(2 * self.hit_tolerance)
+            if stroker.createStroke(path).contains(pos):
+                return edge
+        return None
+
+    def contains(self, point):
+        # only the curves are solid, so clicks elsewhere reach the items below
+        return self.edge_at(point) is not None
+
+    def shape(self):
+        path = QPainterPath()
+        path.addRect(self.boundingRect())
+        return path
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and (event.modifiers() & Qt.AltModifier):
+            edge = self.edge_at(event.scenePos())
+            if edge is not None:
+                try:
+                    edge.remove()
+                except Exception:
+                    pass
+                event.accept()
+                return
+        event.ignore()
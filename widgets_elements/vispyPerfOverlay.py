@@ -0,0 +1,194 @@
+import math
+from collections import deque
+from time import perf_counter, perf_counter_ns
+
+from PySide6.QtWidgets import QGraphicsProxyWidget
+from PySide6.QtGui import QColor, QPen, QBrush, QFont, QFontMetricsF
+from PySide6.QtCore import Qt, QRect, QRectF, QTimer
+
+from widgets_elements.vispyNodeLib import Node, Socket, Edge
+
+
+class PaintTimer:
+    """Cumulative paint time per item class, measured by wrapping paint methods.
+
+    install() swaps each hooked method for a timing wrapper and uninstall()
+    puts the original back, so nothing is measured (or paid for) unless
+    someone is looking at the numbers.
+    """
+
+    def __init__(self):
+        # label -> [total ns, calls]
+        self.totals = {}
+        # (cls, attr) -> method defined on cls before install(), or None
+        self._originals = {}
+        self._users = 0
+
+    def install(self, hooks):
+        """Wrap the methods in `hooks`, a list of (class, method name, label)."""
+        self._users += 1
+        if self._users > 1:
+            return
+        for cls, attr, label in hooks:
+            totals = self.totals.setdefault(label, [0, 0])
+            self._originals[(cls, attr)] = cls.__dict__.get(attr)
+            setattr(cls, attr, self._timed(getattr(cls, attr), totals))
+
+    def uninstall(self):
+        self._users = max(0, self._users - 1)
+        if self._users:
+            return
+        for (cls, attr), original in self._originals.items():
+            if original is None:
+                delattr(cls, attr)
+            else:
+                setattr(cls, attr, original)
+        self._originals.clear()
+
+    def reset(self):
+        for totals in self.totals.values():
+            totals[0] = totals[1] = 0
+
+    @staticmethod
+    def _timed(method, totals):
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                totals[0] += perf_counter_ns() - start
+                totals[1] += 1
+        return timed
+
+
+paint_timer = PaintTimer()
+
+
+def _item_kind(item):
+    if isinstance(item, Socket):
+        return 'Socket'
+    if isinstance(item, Node):
+        return 'Node'
+    if isinstance(item, Edge):
+        return 'Edge'
+    if isinstance(item, QGraphicsProxyWidget):
+        return 'Proxy'
+    return 'Other'
+
+
+class PerfOverlay:
+    """Frame rate, item counts and paint times drawn over a GraphicsView.
+
+    The view calls begin_frame()/end_frame() around each paint and paint()
+    from drawForeground(). Item counts are refreshed on a timer rather than
+    every frame, since walking the scene is the expensive part.
+    """
+
+    kinds = ('Node', 'Socket', 'Edge', 'Proxy', 'Other')
+    refresh_interval = 500
+    margin = 8
+    padding = 6
+
+    def __init__(self, view, hooks):
+        self.view = view
+        self._hooks = hooks
+        # start times of recent frames, for the frame rate
+        self._frames = deque(maxlen=120)
+        self._frame_start = 0.0
+        self.frame_time = 0.0
+        self.visible = {}
+        self.total = {}
+        self._lines = []
+        # viewport area the overlay covers, sized to its text
+        self.rect = QRect()
+
+        self._pen = QPen(Qt.white)
+        self._brush = QBrush(QColor(0, 0, 0, 170))
+        # fixed width so the columns line up
+        self._font = QFont("monospace")
+        self._font.setStyleHint(QFont.Monospace)
+        self._metrics = QFontMetricsF(self._font)
+
+        self._timer = QTimer()
+        self._timer.setInterval(self.refresh_interval)
+        self._timer.timeout.connect(self.refresh)
+
+    def start(self):
+        paint_timer.reset()
+        paint_timer.install(self._hooks)
+        self.refresh()
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+        paint_timer.uninstall()
+        self.view.viewport().update(self.rect)
+
+    def begin_frame(self):
+        self._frame_start = perf_counter()
+
+    def end_frame(self):
+        self.frame_time = perf_counter() - self._frame_start
+        self._frames.append(self._frame_start)
+
+    def fps(self):
+        if len(self._frames) < 2:
+            return 0.0
+        # only frames from the last second count, so an idle view reads 0
+        now = perf_counter()
+        recent = [t for t in self._frames if now - t <= 1.0]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / (recent[-1] - recent[0])
+
+    def _count(self, items):
+        counts = dict.fromkeys(self.kinds, 0)
+        for item in items:
+            counts[_item_kind(item)] += 1
+        return counts
+
+    def refresh(self):
+        """Recount items and repaint the overlay."""
+        view = self.view
+        scene = view.scene()
+        visible_rect = view.mapToScene(view.viewport().rect()).boundingRect()
+        self.visible = self._count(scene.items(visible_rect))
+        self.total = self._count(scene.items())
+        # edges drawn by an EdgeLayer aren't scene items
+        layer = getattr(scene, 'edge_layer', None)
+        if layer is not None:
+            self.total['Edge'] += len(layer.edges())
+            self.visible['Edge'] += len(layer.edges_in_rect(visible_rect))
+
+        lines = [f"{self.fps():5.1f} fps   last frame {self.frame_time * 1000:6.2f} ms"]
+        for kind in self.kinds:
+            lines.append(f"{kind:<7}{self.visible[kind]:>7} visible {self.total[kind]:>8} total")
+        for label, (ns, calls) in paint_timer.totals.items():
+            lines.append(f"{label:<11} paint {ns / 1e6:9.1f} ms {calls:>9} calls")
+        self._lines = lines
+
+        old_rect = self.rect
+        width = max(self._metrics.horizontalAdvance(line) for line in lines) + 2 * self.padding
+        height = len(lines) * self._metrics.height() + 2 * self.padding
+        self.rect = QRect(self.margin, self.margin, math.ceil(width), math.ceil(height))
+        view.viewport().update(self.rect.united(old_rect))
+
+    def paint(self, painter):
+        """Draw the overlay in viewport coordinates."""
+        painter.save()
+        painter.resetTransform()
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self._brush)
+        painter.drawRect(self.rect)
+        painter.setPen(self._pen)
+        painter.setFont(self._font)
+        line_height = self._metrics.height()
+        x = self.rect.left() + self.padding
+        y = self.rect.top() + self.padding
+        for line in self._lines:
+            painter.drawText(
+                QRectF(x, y, self.rect.width() - 2 * self.padding, line_height),
+                Qt.AlignLeft | Qt.AlignVCenter, line
+            )
+            y += line_height
+        painter.restore()
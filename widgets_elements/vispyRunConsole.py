@@ -0,0 +1,98 @@
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QLineEdit, QPushButton, QLabel
+from PySide6.QtGui import QTextCharFormat, QColor, QTextCursor, QFont
+
+
+class RunConsole(QWidget):
+    """Output panel for a runner.Run: streamed stdout/stderr, a line for input() and a Stop button."""
+
+    # lines kept in the output before the oldest are dropped
+    max_lines = 10000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._run = None
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+
+        header = QHBoxLayout()
+        self.status = QLabel("Idle")
+        header.addWidget(self.status, 1)
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.stop)
+        header.addWidget(self.stop_button)
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(lambda: self.output.clear())
+        header.addWidget(clear_button)
+        layout.addLayout(header)
+
+        self.output = QPlainTextEdit()
+        self.output.setReadOnly(True)
+        self.output.setMaximumBlockCount(self.max_lines)
+        self.output.setFont(QFont("monospace"))
+        layout.addWidget(self.output)
+
+        self.input = QLineEdit()
+        self.input.setPlaceholderText("Input for the running program (Enter to send)")
+        self.input.setEnabled(False)
+        self.input.returnPressed.connect(self._send_input)
+        layout.addWidget(self.input)
+
+        self._plain = QTextCharFormat()
+        self._error = QTextCharFormat()
+        self._error.setForeground(QColor(220, 80, 80))
+        self._note = QTextCharFormat()
+        self._note.setForeground(QColor(130, 130, 130))
+
+    def running(self):
+        return self._run is not None and self._run.running()
+
+    def attach(self, run):
+        """Show the output of `run` until it finishes."""
+        self._run = run
+        run.stdout.connect(lambda text: self.append(text, self._plain))
+        run.stderr.connect(lambda text: self.append(text, self._error))
+        run.finished.connect(self._on_finished)
+        self.status.setText("Running...")
+        self.stop_button.setEnabled(True)
+        self.input.setEnabled(True)
+        self.input.setFocus()
+
+    def stop(self):
+        if self.running():
+            self._run.cancel()
+
+    def append(self, text, fmt=None):
+        cursor = self.output.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text, fmt or self._plain)
+        self.output.setTextCursor(cursor)
+        self.output.ensureCursorVisible()
+
+    def note(self, text):
+        """Append an editor message (not program output) on its own line."""
+        if self.output.document().lastBlock().text():
+            self.append("\n")
+        self.append(text + "\n", self._note)
+
+    def _send_input(self):
+        if self.running():
+            text = self.input.text()
+            self.append(text + "\n", self._note)
+            self._run.write_input(text + "\n")
+        self.input.clear()
+
+    def _on_finished(self, code, status):
+        messages = {
+            "ok": "Finished",
+            "error": "Exited with code %d" % code,
+            "cancelled": "Stopped",
+            "timeout": "Stopped: time limit reached",
+            "crashed": "Worker process died",
+        }
+        message = messages.get(status, status)
+        self.note("[%s]" % message)
+        self.status.setText(message)
+        self.stop_button.setEnabled(False)
+        self.input.setEnabled(False)
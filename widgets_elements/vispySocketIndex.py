@@ -0,0 +1,126 @@
+import math
+
+from types_classes.type_registry import type_id
+
+
+class SocketIndex:
+    """Spatial hash of a scene's connectable sockets.
+
+    Sockets are bucketed into square cells of ``cell_size`` scene units and,
+    within a cell, by type id. A nearest-socket query only looks at the
+    cells overlapping the search radius and only at compatible type
+    buckets, so its cost doesn't depend on how many sockets the scene has.
+    Nodes keep their sockets' entries current as they move.
+    """
+
+    cell_size = 40.0
+
+    def __init__(self):
+        # (cx, cy) -> {type id: {socket: (x, y)}}
+        self._cells = {}
+        # socket -> ((cx, cy), type id)
+        self._where = {}
+
+    @classmethod
+    def for_scene(cls, scene):
+        index = getattr(scene, '_socket_index', None)
+        if index is None:
+            index = cls()
+            scene._socket_index = index
+        return index
+
+    @staticmethod
+    def indexable(socket):
+        # value sockets are edited in place and never connected
+        return socket.type.shape not in ("TextInput", "EvalInput")
+
+    def _key(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, socket):
+        return socket in self._where
+
+    def clear(self):
+        self._cells.clear()
+        self._where.clear()
+
+    def update(self, socket):
+        """Insert `socket` or move it to its current scene position."""
+        if not self.indexable(socket):
+            return
+        pos = socket.scenePos()
+        x, y = pos.x(), pos.y()
+        key = self._key(x, y)
+        where = self._where.get(socket)
+        if where is None:
+            tid = type_id(socket.type)
+        else:
+            old_key, tid = where
+            if old_key != key:
+                self._discard(socket, old_key, tid)
+        buckets = self._cells.get(key)
+        if buckets is None:
+            buckets = self._cells[key] = {}
+        bucket = buckets.get(tid)
+        if bucket is None:
+            bucket = buckets[tid] = {}
+        bucket[socket] = (x, y)
+        self._where[socket] = (key, tid)
+
+    def remove(self, socket):
+        where = self._where.pop(socket, None)
+        if where is not None:
+            self._discard(socket, *where)
+
+    def _discard(self, socket, key, tid):
+        buckets = self._cells.get(key)
+        if buckets is None:
+            return
+        bucket = buckets.get(tid)
+        if bucket is not None:
+            bucket.pop(socket, None)
+            if not bucket:
+                del buckets[tid]
+        if not buckets:
+            del self._cells[key]
+
+    def update_node(self, node):
+        for socket in node.sockets:
+            self.update(socket)
+
+    def remove_node(self, node):
+        for socket in node.sockets:
+            self.remove(socket)
+
+    def nearest(self, pos, wanted, radius, exclude=None, is_input=None):
+        """Return the closest socket within `radius` of `pos` whose type id is in `wanted`.
+
+        If `is_input` is given, only inputs (True) or outputs (False) are considered.
+        """
+        x, y = pos.x(), pos.y()
+        cx0, cy0 = self._key(x - radius, y - radius)
+        cx1, cy1 = self._key(x + radius, y + radius)
+        best = None
+        best_d2 = radius * radius
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                buckets = self._cells.get((cx, cy))
+                if buckets is None:
+                    continue
+                for tid in wanted:
+                    bucket = buckets.get(tid)
+                    if bucket is None:
+                        continue
+                    for socket, (sx, sy) in bucket.items():
+                        if socket is exclude:
+                            continue
+                        if is_input is not None and socket.port.is_input != is_input:
+                            continue
+                        d2 = (sx - x) * (sx - x) + (sy - y) * (sy - y)
+                        if d2 <= best_d2:
+                            best = socket
+                            best_d2 = d2
+        return best
@@ -0,0 +1,131 @@
+import weakref
+
+from PySide6.QtGui import QPen, QBrush, QColor, QFont, QFontMetricsF
+from PySide6.QtCore import Qt
+
+# Category to color mapping for node headers
+CATEGORY_COLORS = {
+    "Logic Flow": QColor(100, 150, 200),
+    "Math": QColor(200, 150, 100),
+    "I/O": QColor(150, 200, 100),
+    "Data Manipulation": QColor(200, 100, 150),
+    "Selection": QColor(180, 130, 200),
+    "Flow": QColor(130, 200, 180),
+    "Logic": QColor(200, 180, 100),
+    "Variables": QColor(150, 150, 200),
+    "Values": QColor(200, 200, 100),
+}
+
+# header color for categories missing from CATEGORY_COLORS
+DEFAULT_CATEGORY_COLOR = QColor(80, 80, 80)
+
+
+class TypeStyle:
+    """Paint resources for one TypeProfile (socket fill and edge pen)."""
+    __slots__ = ("color", "brush", "edge_pen")
+
+    def __init__(self, type_profile):
+        self.color = QColor(type_profile.color)
+        self.brush = QBrush(self.color)
+        self.edge_pen = QPen(self.color, 2.5)
+
+
+class CategoryStyle:
+    """Paint resources for one node category (header and zoomed-out block)."""
+    __slots__ = ("color", "brush")
+
+    def __init__(self, color):
+        self.color = QColor(color)
+        self.brush = QBrush(self.color)
+
+
+class Theme:
+    """Pens, brushes, fonts and text metrics shared by every node, socket and edge.
+
+    Everything is built once and handed out by reference, so painting an
+    item doesn't construct Qt paint objects or measure text. Per-type and
+    per-category styles are created on first use; call invalidate() after
+    changing colors or the font so they are rebuilt, and so the items of
+    every watched scene drop what they measured and repaint.
+    """
+
+    def __init__(self):
+        self.font = QFont()
+        self.metrics = QFontMetricsF(self.font)
+
+        self.node_body_brush = QBrush(QColor(45, 45, 45))
+        self.node_pen = QPen(Qt.black, 2)
+        self.node_selected_pen = QPen(QColor(0, 170, 255), 3)
+        self.title_pen = QPen(Qt.white)
+        self.label_pen = QPen(Qt.white)
+        self.snap_pen = QPen(Qt.white, 2)
+
+        self.value_box_pen = QPen(Qt.white, 1)
+        self.value_box_brush = QBrush(QColor(60, 60, 60))
+        self.value_text_pen = QPen(Qt.white)
+        self.placeholder_pen = QPen(QColor(150, 150, 150))
+        self.value_arrow_brush = QBrush(Qt.white)
+
+        self.grid_color = QColor(60, 60, 60)
+
+        self._type_styles = {}
+        self._category_styles = {}
+        self._label_widths = {}
+        # bumped by invalidate(); an item measured with an older generation
+        # measures again before it is shown
+        self.generation = 0
+        # scenes whose items invalidate() refreshes (GraphicsScene.theme_changed)
+        self._scenes = weakref.WeakSet()
+
+    def watch(self, scene):
+        self._scenes.add(scene)
+
+    def type_style(self, type_profile):
+        style = self._type_styles.get(type_profile)
+        if style is None:
+            style = TypeStyle(type_profile)
+            self._type_styles[type_profile] = style
+        return style
+
+    def category_style(self, category):
+        style = self._category_styles.get(category)
+        if style is None:
+            style = CategoryStyle(CATEGORY_COLORS.get(category, DEFAULT_CATEGORY_COLOR))
+            self._category_styles[category] = style
+        return style
+
+    def label_width(self, text):
+        """Width of `text` in the theme font, measured once per distinct string."""
+        width = self._label_widths.get(text)
+        if width is None:
+            width = self.metrics.horizontalAdvance(text)
+            self._label_widths[text] = width
+        return width
+
+    def elided(self, text, width):
+        return self.metrics.elidedText(text, Qt.ElideRight, width)
+
+    def set_category_color(self, category, color):
+        CATEGORY_COLORS[category] = QColor(color)
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop cached styles and metrics so they are rebuilt from current settings."""
+        self.metrics = QFontMetricsF(self.font)
+        self._type_styles.clear()
+        self._category_styles.clear()
+        self._label_widths.clear()
+        self.generation += 1
+        for scene in list(self._scenes):
+            scene.theme_changed()
+
+
+_theme = None
+
+
+def theme():
+    """Return the application-wide Theme, creating it on first use."""
+    global _theme
+    if _theme is None:
+        _theme = Theme()
+    return _theme
@@ -0,0 +1,234 @@
+from PySide6.QtCore import QPointF, QTimer
+
+from widgets_elements.vispyNodeLib import Node, Edge, SocketEditor, add_edge
+
+
+class Virtualizer:
+    """Keep Node items only for the part of a scene's GraphModel near the viewport.
+
+    The model holds every node and connection; this class creates a Node
+    view for each record inside the visible rect (plus ``margin`` scene
+    units) and releases the ones that scroll out of it. Released items go
+    to a per-node-type pool and are rebound to other records instead of
+    being rebuilt. A connection between two materialized nodes is a normal
+    Edge; one with a single materialized end is drawn as a stub Edge
+    ending at the other port's position from the model.
+
+    Views write their changes straight to the model; the scene also
+    reports nodes and edges the user adds or deletes here, so they are
+    tracked like materialized records.
+
+    With a model opened from a chunked file, asking the model for the
+    records in the visible rect loads the tiles under it, so panning
+    streams the rest of the file in.
+    """
+
+    margin = 400.0
+    # released Node items kept per node type for reuse
+    pool_limit = 64
+
+    def __init__(self, scene, view):
+        self.scene = scene
+        self.view = view
+        # record id -> materialized Node
+        self._items = {}
+        # connection id -> (Edge, both ends materialized)
+        self._edges = {}
+        # node type -> released Node items
+        self._pool = {}
+        # True while we add/remove items ourselves, so the observer
+        # callbacks don't mistake them for user edits
+        self._binding = False
+
+        self._timer = QTimer()
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.refresh)
+
+        view.horizontalScrollBar().valueChanged.connect(self.schedule_refresh)
+        view.verticalScrollBar().valueChanged.connect(self.schedule_refresh)
+        view.viewport_changed.connect(self.schedule_refresh)
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def model(self):
+        return self.scene.model
+
+    def install(self):
+        self.scene.virtualizer = self
+        self.scene.graph_observer = self
+        self.refresh()
+
+    def uninstall(self):
+        """Stop tracking the view and detach from the scene; materialized items stay."""
+        self._timer.stop()
+        for signal in (self.view.horizontalScrollBar().valueChanged,
+                       self.view.verticalScrollBar().valueChanged,
+                       self.view.viewport_changed):
+            try:
+                signal.disconnect(self.schedule_refresh)
+            except (RuntimeError, TypeError):
+                pass
+        self._items.clear()
+        self._edges.clear()
+        self.scene.virtualizer = None
+        self.scene.graph_observer = None
+
+    def schedule_refresh(self, *args):
+        self._timer.start()
+
+    def items(self):
+        return self._items.values()
+
+    def visible_rect(self):
+        rect = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        m = self.margin
+        return rect.adjusted(-m, -m, m, m)
+
+    def refresh(self, rect=None):
+        """Materialize the records inside `rect` (default: the visible area) and release the rest."""
+        if rect is None:
+            rect = self.visible_rect()
+        wanted = {
+            record.id: record
+            for record in self.model.nodes_in_rect(rect.left(), rect.top(), rect.right(), rect.bottom())
+        }
+        # keep selected nodes so a selection survives scrolling away and back
+        for record_id, node in self._items.items():
+            if node.isSelected():
+                wanted.setdefault(record_id, node.record)
+
+        for record_id in [rid for rid in self._items if rid not in wanted]:
+            self._release(record_id)
+        for record_id, record in wanted.items():
+            if record_id not in self._items:
+                self._materialize(record)
+        self._sync_edges()
+
+    def materialize_all(self):
+        self.model.load_all()
+        for record in list(self.model.nodes.values()):
+            if record.id not in self._items:
+                self._materialize(record)
+        self._sync_edges()
+
+    def reset(self):
+        """Release every item, e.g. after the scene was given a different model."""
+        for record_id in list(self._items):
+            self._release(record_id)
+        for edge, full in self._edges.values():
+            edge.detach()
+        self._edges.clear()
+        self.refresh()
+
+    def forget(self):
+        """Drop references to items the scene has already deleted (scene.clear())."""
+        self._items.clear()
+        self._edges.clear()
+
+    # binding records to items
+
+    def _materialize(self, record):
+        pool = self._pool.get(record.node_type)
+        self._binding = True
+        try:
+            if pool:
+                node = pool.pop()
+                node.bind(record)
+            else:
+                node = Node.for_record(record)
+            self.scene.addItem(node)
+        finally:
+            self._binding = False
+        self._items[record.id] = node
+        return node
+
+    def _release(self, record_id):
+        node = self._items.pop(record_id)
+        editor = SocketEditor.for_scene(self.scene)
+        if editor.editing() in node.sockets:
+            editor.finish()
+        for conn in self.model.node_connections(record_id):
+            entry = self._edges.pop(conn.id, None)
+            if entry is not None:
+                entry[0].detach()
+        # edges of connections that no longer exist may still hang off the sockets
+        for sock in node.sockets:
+            for edge in list(sock.edges):
+                edge.detach()
+        self._binding = True
+        try:
+            node.setSelected(False)
+            self.scene.removeItem(node)
+        finally:
+            self._binding = False
+        pool = self._pool.setdefault(node.record.node_type, [])
+        if len(pool) < self.pool_limit:
+            pool.append(node)
+
+    def _sync_edges(self):
+        seen = set()
+        for record_id in self._items:
+            for conn in self.model.node_connections(record_id):
+                if conn.id in seen:
+                    continue
+                seen.add(conn.id)
+                full = conn.start_node in self._items and conn.end_node in self._items
+                entry = self._edges.get(conn.id)
+                if entry is not None:
+                    if entry[1] == full:
+                        continue
+                    entry[0].detach()
+                    del self._edges[conn.id]
+                edge = self._make_edge(conn, full)
+                if edge is not None:
+                    self._edges[conn.id] = (edge, full)
+
+    def _make_edge(self, conn, full):
+        # like loading a file, skip connections to ports the node item doesn't have
+        for node_id, port in ((conn.start_node, conn.start_port), (conn.end_node, conn.end_port)):
+            node = self._items.get(node_id)
+            if node is not None and not 0 <= port < len(node.sockets):
+                return None
+        if full:
+            start = self._items[conn.start_node].sockets[conn.start_port]
+            end = self._items[conn.end_node].sockets[conn.end_port]
+            edge = Edge(start, end, start.type)
+            edge.connection = conn
+            add_edge(self.scene, edge)
+        else:
+            if conn.start_node in self._items:
+                sock = self._items[conn.start_node].sockets[conn.start_port]
+                other, port = conn.end_node, conn.end_port
+            else:
+                sock = self._items[conn.end_node].sockets[conn.end_port]
+                other, port = conn.start_node, conn.start_port
+            x, y = self.model.port_position(self.model.nodes[other], port)
+            edge = Edge(sock, QPointF(x, y), sock.type)
+            edge.connection = conn
+            self.scene.addItem(edge)
+        return edge
+
+    # scene observer callbacks
+
+    def node_added(self, node):
+        if not self._binding:
+            self._items[node.record.id] = node
+
+    def node_deleted(self, node):
+        record_id = node.record.id
+        self._items.pop(record_id, None)
+        for conn in self.model.node_connections(record_id):
+            entry = self._edges.pop(conn.id, None)
+            if entry is not None:
+                entry[0].detach()
+
+    def edge_connected(self, edge):
+        if edge.connection is not None:
+            self._edges[edge.connection.id] = (edge, True)
+
+    def edge_removed(self, edge):
+        if edge.connection is not None:
+            self._edges.pop(edge.connection.id, None)
@@ -1,10 +1,11 @@
-from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QMenu, QWidget, QVBoxLayout, QLabel, QPushButton, QListWidget, QListWidgetItem, QHBoxLayout, QComboBox, QLineEdit, QApplication, QSizePolicy, QTreeWidget, QTreeWidgetItem, QStackedWidget
+from PySide6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsItem, QMenu, QWidget, QVBoxLayout, QLabel, QPushButton, QListWidget, QListWidgetItem, QHBoxLayout, QComboBox, QLineEdit, QApplication, QSizePolicy, QTreeWidget, QTreeWidgetItem, QStackedWidget
 from PySide6.QtGui import (
-    QPainter, QMouseEvent, QColor, QPen, QDrag, QCursor
+    QPainter, QMouseEvent, QColor, QPen, QDrag, QCursor, QPixmap
 )
-from PySide6.QtCore import Qt, QEvent, QLineF, QMimeData, QPoint
+from PySide6.QtCore import Qt, QEvent, QLineF, QMimeData, QPoint, QRectF, Signal
 
-import sys, traceback, logging, os
+import sys, traceback, logging, os, math
+from contextlib import contextmanager
 
 # basic file logging for debugging silent crashes
 _log_path = os.path.join(os.path.dirname(__file__), 'vispy_debug.log')
@@ -20,12 +21,33 @@ def _exception_hook(exctype, value, tb):
 sys.excepthook = _exception_hook
 
 import types_classes.node_library as nl
-from widgets_elements.vispyNodeLib import Node
+from widgets_elements.vispyNodeLib import Node, Socket, Edge, EdgeLayer, EdgeUpdateQueue, SocketEditor, add_edge, delete_nodes
+from widgets_elements.vispySocketIndex import SocketIndex
+from widgets_elements.vispyTheme import theme
+from widgets_elements.vispyVirtualizer import Virtualizer
+from widgets_elements.vispyLivePreview import LivePreview
+from types_classes.graph_model import GraphModel
+from types_classes.node_registry import node_types
+from widgets_elements.vispyPerfOverlay import PerfOverlay
 from types_classes.vispyDataTypes import types
 
 
 class GraphicsView(QGraphicsView):
 
+    # viewport update strategies selectable by name; "full" is the fallback
+    # for platforms/drivers that show artifacts with partial updates
+    UPDATE_MODES = {
+        'minimal': QGraphicsView.MinimalViewportUpdate,
+        'bounding': QGraphicsView.BoundingRectViewportUpdate,
+        'smart': QGraphicsView.SmartViewportUpdate,
+        'full': QGraphicsView.FullViewportUpdate,
+    }
+    default_update_mode = 'minimal'
+
+    # emitted when zooming or resizing changes the visible scene area
+    # (scrolling is reported by the scroll bars)
+    viewport_changed = Signal()
+
     def __init__(self, scene):
         super().__init__(scene)
 
@@ -85,6 +107,51 @@ class GraphicsView(QGraphicsView):
         self.scale(factor, factor)
         event.accept()
 
+    def scale(self, sx, sy):
+        super().scale(sx, sy)
+        self.viewport_changed.emit()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.viewport_changed.emit()
+
+    def set_perf_overlay_enabled(self, enabled):
+        """Show or hide the frame rate / item count / paint time overlay."""
+        if enabled and self.perf_overlay is None:
+            self.perf_overlay = PerfOverlay(self, [
+                (Node, 'paint', 'Node'),
+                (Socket, 'paint', 'Socket'),
+                (Edge, 'paint', 'Edge'),
+                (EdgeLayer, 'paint', 'Edge layer'),
+                (GraphicsScene, 'drawBackground', 'Background'),
+            ])
+            self.perf_overlay.start()
+        elif not enabled and self.perf_overlay is not None:
+            overlay = self.perf_overlay
+            self.perf_overlay = None
+            overlay.stop()
+
+    def paintEvent(self, event):
+        overlay = self.perf_overlay
+        if overlay is None:
+            super().paintEvent(event)
+            return
+        overlay.begin_frame()
+        super().paintEvent(event)
+        overlay.end_frame()
+
+    def drawForeground(self, painter, rect):
+        super().drawForeground(painter, rect)
+        if self.perf_overlay is not None:
+            self.perf_overlay.paint(painter)
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        if self.perf_overlay is not None:
+            # partial updates scroll the viewport pixels, overlay included
+            overlay_rect = self.perf_overlay.rect
+            self.viewport().update(overlay_rect.united(overlay_rect.translated(dx, dy)))
+
     def mousePressEvent(self, event):
         if event.button() == Qt.MiddleButton:
             self.setDragMode(QGraphicsView.ScrollHandDrag)
@@ -165,9 +232,11 @@ class GraphicsView(QGraphicsView):
 
         self.setRenderHint(QPainter.Antialiasing)
 
-        self.setViewportUpdateMode(
-            QGraphicsView.FullViewportUpdate
-        )
+        # only repaint what changed; the grid itself is a cached tile (see
+        # GridBackground), so dirty regions redraw it with a pixmap blit.
+        # The view's CacheBackground mode is deliberately not used: it
+        # misaligns the exposed strips when the view scrolls.
+        self.set_update_mode(self.default_update_mode)
 
         self.setTransformationAnchor(
             QGraphicsView.AnchorUnderMouse
@@ -188,37 +257,36 @@ class GraphicsView(QGraphicsView):
         
         # Store last right-click position for node creation
         self._context_menu_pos = None
+
+        # PerfOverlay drawn over the view, or None when it is off
+        self.perf_overlay = None
         
-        # Populate node creators dynamically
-        self._populate_node_types()
+
+    def set_update_mode(self, mode):
+        """Switch the viewport update strategy ('minimal', 'bounding', 'smart' or 'full')."""
+        if mode not in self.UPDATE_MODES:
+            raise ValueError(f"Unknown viewport update mode: {mode!r}")
+        self._update_mode = mode
+        self.setViewportUpdateMode(self.UPDATE_MODES[mode])
+        self.resetCachedContent()
+        self.viewport().update()
+
+    def update_mode(self):
+        return self._update_mode
 
     def contextMenuEvent(self, event):
-        """Show context menu on right-click with dynamically generated node creation options."""
+        """Show context menu on right-click with an entry for each registered node type."""
         self._context_menu_pos = self.mapToScene(event.pos())
         
         menu = QMenu(self)
         
-        # Dynamically add node creation options
-        for display_name, creator_func in self._node_creators.items():
-            action = menu.addAction(display_name)
-            action.triggered.connect(lambda checked, func=creator_func: self._create_node(func))
+        # one entry per registered node type
+        for entry in node_types():
+            action = menu.addAction(entry.label)
+            action.triggered.connect(lambda checked, func=entry.factory: self._create_node(func))
         
         menu.exec(event.globalPos())
     
-    def _populate_node_types(self):
-        """Dynamically generate node creation actions from node_library."""
-        self._node_creators = {}
-        
-        # Find all make_*_node functions in nl module
-        for attr_name in dir(nl):
-            if attr_name.startswith('make_') and attr_name.endswith('_node'):
-                func = getattr(nl, attr_name)
-                if callable(func):
-                    # Convert make_cast_to_string_node to "Cast To String Node"
-                    node_type = attr_name[5:-5]  # Remove 'make_' and '_node'
-                    display_name = ' '.join(word.capitalize() for word in node_type.split('_')) + ' Node'
-                    self._node_creators[display_name] = func
-    
     def _create_node(self, creator_func):
         """Create a node using the provided creator function."""
         if self._context_menu_pos is not None:
@@ -626,23 +694,305 @@ class VariableManagerWidget(QWidget):
                 pass
 
 
-class GraphicsScene(QGraphicsScene):
+class GridBackground:
+    """Tile-cached renderer for the scene's background grid.
+
+    Instead of building a line list for every exposed rect on every repaint,
+    one tile spanning ``major`` grid cells is rendered into a pixmap at the
+    current device scale and tiled across the exposed area. The tile is only
+    rebuilt when the view scale, device pixel ratio or colours change.
+    Minor lines fade out as they get closer together on screen, so zoomed-out
+    views don't end up drawing a solid wall of grey.
+    """
+
+    def __init__(self, grid=20, major=5, color=QColor(60, 60, 60)):
+        self.grid = grid
+        self.major = major
+        self.color = QColor(color)
+
+        # minor lines are fully visible above `_fade_end` screen pixels apart
+        # and invisible below `_fade_start`, with a linear fade in between
+        self._fade_start = 4.0
+        self._fade_end = 12.0
+
+        self._tile = None
+        self._tile_key = None
+
+    @property
+    def tile_size(self):
+        return self.grid * self.major
+
+    def set_color(self, color):
+        """Change the line colour (e.g. on theme change) and drop the cached tile."""
+        self.color = QColor(color)
+        self.invalidate()
+
+    def invalidate(self):
+        self._tile = None
+        self._tile_key = None
+
+    def _minor_alpha(self, spacing_px):
+        if spacing_px >= self._fade_end:
+            return 1.0
+        if spacing_px <= self._fade_start:
+            return 0.0
+        return (spacing_px - self._fade_start) / (self._fade_end - self._fade_start)
+
+    def _build_tile(self, scale):
+        tile = self.tile_size
+        # the pixmap is rendered at device resolution; its device pixel ratio
+        # maps it back to exactly `tile` scene units so it blits ~1:1
+        px = max(1, int(round(tile * scale)))
+        pixmap = QPixmap(px, px)
+        pixmap.fill(Qt.transparent)
+
+        p = QPainter(pixmap)
+        # lines keep the thickness they'd have as scaled scene-space lines
+        width = max(1, int(round(scale)))
+        minor_alpha = self._minor_alpha(self.grid * scale)
+        for i in range(self.major):
+            pos = int(round(i * px / self.major))
+            if i == 0:
+                color = self.color
+            elif minor_alpha > 0.0:
+                color = QColor(self.color)
+                color.setAlphaF(self.color.alphaF() * minor_alpha)
+            else:
+                continue
+            p.setPen(QPen(color, width))
+            # offset by half the width so the line sits fully inside the tile
+            c = pos + width / 2.0
+            p.drawLine(QLineF(c, 0, c, px))
+            p.drawLine(QLineF(0, c, px, c))
+        p.end()
+
+        pixmap.setDevicePixelRatio(px / tile)
+        return pixmap
+
+    def paint(self, painter, rect):
+        transform = painter.worldTransform()
+        scale = transform.m11()
+        if scale <= 0:
+            return
+        device = painter.device()
+        dpr = device.devicePixelRatioF() if device is not None else 1.0
+        scale *= dpr
+
+        # scale is quantised so tiny float drift doesn't thrash the cache
+        key = (round(scale, 4), self.color.rgba())
+        if key != self._tile_key:
+            self._tile = self._build_tile(scale)
+            self._tile_key = key
+
+        # align the painted rect to the tile grid so tiles line up with
+        # scene coordinates regardless of the exposed rect
+        tile = self.tile_size
+        left = math.floor(rect.left() / tile) * tile
+        top = math.floor(rect.top() / tile) * tile
+        right = math.ceil(rect.right() / tile) * tile
+        bottom = math.ceil(rect.bottom() / tile) * tile
+
+        painter.save()
+        painter.setClipRect(rect)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, False)
+        painter.drawTiledPixmap(QRectF(left, top, right - left, bottom - top), self._tile)
+        painter.restore()
 
-    def drawBackground(self, painter, rect):
-        super().drawBackground(painter, rect)
 
-        grid = 20
+class GraphicsScene(QGraphicsScene):
 
-        left = int(rect.left()) - (int(rect.left()) % grid)
-        top = int(rect.top()) - (int(rect.top()) % grid)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.grid_background = GridBackground(color=theme().grid_color)
+        # the graph itself; nodes and edges in the scene are views of its records
+        self.model = GraphModel()
+        # EdgeLayer drawing all connected edges, or None when each Edge is its own item
+        self.edge_layer = None
+        # Virtualizer keeping only nearby nodes as items, and the object
+        # user edits are reported to (the same Virtualizer), when enabled
+        self.virtualizer = None
+        self.graph_observer = None
+        # LivePreview painting output values beside sockets, when enabled
+        self.live_preview = None
+        # True inside bulk_update(); new edges then defer their paths
+        self.populating = False
+        # cache mode of this scene's nodes and their sockets, see set_node_caching()
+        self.node_cache_mode = QGraphicsItem.NoCache
+        theme().watch(self)
+        self._bulk_depth = 0
+
+    def set_edge_layer_enabled(self, enabled):
+        """Switch between one scene item per Edge and a single batched EdgeLayer."""
+        if enabled and self.edge_layer is None:
+            self.edge_layer = EdgeLayer()
+            self.addItem(self.edge_layer)
+            for item in list(self.items()):
+                if isinstance(item, Edge) and isinstance(item.end, Socket):
+                    add_edge(self, item)
+        elif not enabled and self.edge_layer is not None:
+            layer = self.edge_layer
+            self.edge_layer = None
+            edges = layer.edges()
+            layer.clear()
+            self.removeItem(layer)
+            for edge in edges:
+                self.addItem(edge)
+                edge.update_path()
+
+    @contextmanager
+    def bulk_update(self):
+        """Add or remove many items at once.
+
+        Inside the block the scene keeps no item index, its views don't
+        repaint and new edges don't compute their paths. On exit the
+        queued paths are computed in one pass, the index is rebuilt once
+        and the views repaint once. Blocks may be nested.
+        """
+        self._bulk_depth += 1
+        if self._bulk_depth == 1:
+            self.populating = True
+            index_method = self.itemIndexMethod()
+            self.setItemIndexMethod(QGraphicsScene.NoIndex)
+            views = self.views()
+            for view in views:
+                view.setUpdatesEnabled(False)
+        try:
+            yield self
+        finally:
+            self._bulk_depth -= 1
+            if self._bulk_depth == 0:
+                self.populating = False
+                EdgeUpdateQueue.flush_scene(self)
+                self.setItemIndexMethod(index_method)
+                for view in views:
+                    view.setUpdatesEnabled(True)
+                    view.viewport().update()
+
+    def _clear_items(self):
+        """Delete every item in one operation, keeping the model, and reset the per-scene helpers."""
+        layer_enabled = self.edge_layer is not None
+        self.edge_layer = None
+        SocketEditor.for_scene(self).finish()
+        if self.virtualizer is not None:
+            self.virtualizer.forget()
+        super().clear()
+        SocketIndex.for_scene(self).clear()
+        EdgeUpdateQueue.for_scene(self).discard()
+        if layer_enabled:
+            self.set_edge_layer_enabled(True)
+
+    def clear(self):
+        """Remove and delete every item and the whole graph, resetting the per-scene helpers."""
+        self._clear_items()
+        self.model.clear()
+
+    def _remove_views(self):
+        """Take every Node and Edge item out of the scene, leaving the model alone."""
+        SocketEditor.for_scene(self).finish()
+        if self.edge_layer is not None:
+            for edge in self.edge_layer.edges():
+                edge.detach()
+        for item in self.items():
+            if isinstance(item, Edge):
+                item.detach()
+        for item in self.items():
+            if isinstance(item, Node):
+                self.removeItem(item)
+        if self.virtualizer is not None:
+            self.virtualizer.forget()
+
+    def _create_views(self):
+        """Create a Node item for every record of the model and an Edge for every connection."""
+        nodes = {}
+        for record in self.model.nodes.values():
+            node = Node.for_record(record)
+            self.addItem(node)
+            nodes[record.id] = node
+        for conn in self.model.connections.values():
+            try:
+                start = nodes[conn.start_node].sockets[conn.start_port]
+                end = nodes[conn.end_node].sockets[conn.end_port]
+            except (KeyError, IndexError):
+                continue
+            edge = Edge(start, end, start.type)
+            edge.connection = conn
+            add_edge(self, edge)
+
+    def set_model(self, model):
+        """Show a different graph, replacing every item."""
+        with self.bulk_update():
+            self._clear_items()
+            self.model = model
+            if self.virtualizer is not None:
+                self.virtualizer.refresh()
+            else:
+                model.load_all()
+                self._create_views()
+        if self.live_preview is not None:
+            self.live_preview.schedule_refresh()
 
-        lines = []
+    def set_virtualized(self, enabled, view):
+        """Switch between keeping every node as an item and only the ones near `view`'s viewport.
 
-        for x in range(left, int(rect.right()), grid):
-            lines.append(QLineF(x, rect.top(), x, rect.bottom()))
+        Enabling drops the items and lets a Virtualizer materialize the
+        visible part of the model; disabling materializes everything again.
+        """
+        if enabled and self.virtualizer is None:
+            self._remove_views()
+            Virtualizer(self, view).install()
+        elif not enabled and self.virtualizer is not None:
+            virtualizer = self.virtualizer
+            with self.bulk_update():
+                virtualizer.materialize_all()
+            virtualizer.uninstall()
+
+    def set_live_preview_enabled(self, enabled):
+        """Show or hide the live values of output sockets."""
+        if enabled and self.live_preview is None:
+            LivePreview(self).install()
+        elif not enabled and self.live_preview is not None:
+            self.live_preview.uninstall()
+
+    def theme_changed(self):
+        """Refresh nodes and edges after Theme.invalidate()."""
+        th = theme()
+        edges = self.edge_layer.edges() if self.edge_layer is not None else []
+        for item in self.items():
+            if isinstance(item, Node):
+                item.theme_changed()
+            elif isinstance(item, Edge):
+                edges.append(item)
+        for edge in edges:
+            edge.setPen(th.type_style(edge.type).edge_pen)
+        if self.edge_layer is not None:
+            self.edge_layer.update()
+
+    def set_node_caching(self, enabled):
+        """Turn DeviceCoordinateCache on or off for the scene's current and future nodes.
+
+        DeviceCoordinateCache turns steady-state repaints into pixmap blits.
+        """
+        mode = QGraphicsItem.DeviceCoordinateCache if enabled else QGraphicsItem.NoCache
+        self.node_cache_mode = mode
+        for item in self.items():
+            if isinstance(item, Node):
+                item.set_cache_mode(mode)
 
-        for y in range(top, int(rect.bottom()), grid):
-            lines.append(QLineF(rect.left(), y, rect.right(), y))
+    def mouseMoveEvent(self, event):
+        super().mouseMoveEvent(event)
+        # recompute edges of everything the move touched, once each
+        EdgeUpdateQueue.flush_scene(self)
+
+    def keyPressEvent(self, event):
+        # Delete removes the selected nodes, unless a socket editor has focus
+        if event.key() in (Qt.Key_Delete, Qt.Key_Backspace) and self.focusItem() is None:
+            nodes = [item for item in self.selectedItems() if isinstance(item, Node)]
+            if nodes:
+                delete_nodes(self, nodes)
+                event.accept()
+                return
+        super().keyPressEvent(event)
 
-        painter.setPen(QPen(QColor(60, 60, 60), 1))
-        painter.drawLines(lines)
+    def drawBackground(self, painter, rect):
+        super().drawBackground(painter, rect)
+        self.grid_background.paint(painter, rect)